@@ -0,0 +1,73 @@
+"""
+AgentRegistry: Process-wide registry of warm, shared agent instances.
+Agents are built once (at API startup or on first use), their models are warmed up,
+and the same instance is handed to every request.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger("AgentRegistry")
+
+
+class AgentRegistry:
+    """
+    Builds each registered agent once and hands out the shared instance.
+    Factories are zero-argument callables (usually the agent class).
+    """
+    def __init__(self, factories):
+        self.factories = dict(factories)
+        self._agents = {}
+        self._locks = {name: threading.Lock() for name in self.factories}
+        self.warmup_report = {}
+
+    def get(self, name):
+        """
+        Return the shared instance for `name`, building and warming it on first use.
+        """
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        if name not in self.factories:
+            raise KeyError(f"Unknown agent: {name}")
+        with self._locks[name]:
+            agent = self._agents.get(name)
+            if agent is None:
+                agent = self._build(name)
+            return agent
+
+    def _build(self, name):
+        start = time.perf_counter()
+        try:
+            agent = self.factories[name]()
+            agent.warm_up()
+        except Exception as e:
+            self.warmup_report[name] = {"status": "error", "error": str(e), "seconds": time.perf_counter() - start}
+            raise
+        self._agents[name] = agent
+        seconds = time.perf_counter() - start
+        self.warmup_report[name] = {"status": "ok", "seconds": seconds}
+        logger.info(f"Agent {name} ready in {seconds:.2f}s")
+        return agent
+
+    def warm_up(self, names=None):
+        """
+        Build and warm every agent (or just `names`). Failures are logged and recorded
+        in the report; the agent is retried lazily on its next `get`.
+        """
+        for name in names or self.factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"Agent {name} failed to warm up: {e}")
+        return self.warmup_report
+
+    def shutdown(self):
+        """
+        Call every built agent's shutdown hook.
+        """
+        for name, agent in self._agents.items():
+            try:
+                agent.shutdown()
+            except Exception as e:
+                logger.warning(f"Agent {name} failed to shut down: {e}")
@@ -3,7 +3,39 @@ CombinedSentimentAgent: Aggregates StockTwits and news sentiment for each ticker
 """
 from .base_agent import BaseAgent
 from .news_agent import NewsAgent
-import requests
+from .social_ingest import get_social_scheduler
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+def ticker_pattern(tickers):
+    """
+    One compiled matcher for every ticker: upper-case symbols or cashtags in any case, on word
+    boundaries. Longer symbols come first so "BRK.B" wins over "BRK".
+    """
+    symbols = "|".join(re.escape(s) for s in sorted({t.upper() for t in tickers}, key=len, reverse=True))
+    return re.compile(r"(?<![A-Za-z0-9.])(?:\$(?i:(%s))|(%s))(?![A-Za-z0-9])" % (symbols, symbols))
+
+def tag_articles(articles, tickers):
+    """
+    Returns {ticker: [articles mentioning it]} from a single pass over the corpus.
+    """
+    tagged = {ticker: [] for ticker in tickers}
+    if not tickers:
+        return tagged
+    pattern = ticker_pattern(tickers)
+    by_symbol = {}
+    for ticker in tickers:
+        by_symbol.setdefault(ticker.upper(), []).append(ticker)
+    for article in articles:
+        text = f"{article.get('title', '')}\n{article.get('text', '')}"
+        mentioned = {(cashtag or symbol).upper() for cashtag, symbol in pattern.findall(text)}
+        for symbol in mentioned:
+            for ticker in by_symbol[symbol]:
+                tagged[ticker].append(article)
+    return tagged
 
 class CombinedSentimentAgent(BaseAgent):
     """
@@ -12,43 +44,69 @@ class CombinedSentimentAgent(BaseAgent):
     def __init__(self):
         super().__init__()
         self.news_agent = NewsAgent()
+        self.social = get_social_scheduler()
+        # The news corpus is fetched once per source set and shared by every ticker until it expires
+        self.news_ttl = float(os.getenv("COMBINED_NEWS_TTL", "300"))
+        self._corpus = {}
+        self._corpus_lock = threading.Lock()
 
     def fetch_stocktwits_sentiment(self, symbol, limit=10):
-        msgs = []
-        url = f"https://api.stocktwits.com/api/2/streams/symbol/{symbol}.json"
-        try:
-            resp = requests.get(url)
-            if resp.status_code == 200:
-                data = resp.json()
-                for msg in data.get("messages", [])[:limit]:
-                    sentiment = self.news_agent.analyze_sentiment(msg["body"])
-                    msgs.append({
-                        "platform": "StockTwits",
-                        "symbol": symbol,
-                        "body": msg["body"],
-                        "sentiment": sentiment
-                    })
-        except Exception as e:
-            self.log(f"StockTwits fetch failed for {symbol}: {e}", level=30)
-        return msgs
+        return self.fetch_stocktwits_many([symbol], limit=limit)[symbol]
+
+    def fetch_stocktwits_many(self, symbols, limit=10):
+        """
+        Latest buffered StockTwits messages per symbol from the shared ingestion scheduler, after a
+        non-blocking refresh of symbols outside its background watchlist. Returns {symbol: [latest messages]}.
+        """
+        self.social.refresh(symbols)
+        return {symbol: self.social.recent_stocktwits(symbol, limit) for symbol in symbols}
+
+    def news_corpus(self, news_urls=None, rss_urls=None):
+        """
+        Articles for these sources, fetched through NewsAgent at most once per COMBINED_NEWS_TTL seconds.
+        Concurrent requests for the same sources wait for a single fetch; other source sets are
+        not held up by it.
+        """
+        key = (tuple(news_urls or []), tuple(rss_urls or []))
+        now = time.time()
+        with self._corpus_lock:
+            fetched_at, future = self._corpus.get(key, (0, None))
+            owner = future is None or (future.done() and now - fetched_at >= self.news_ttl)
+            if owner:
+                future = Future()
+                self._corpus = {k: v for k, v in self._corpus.items() if not v[1].done() or now - v[0] < self.news_ttl}
+                self._corpus[key] = (now, future)
+        if owner:
+            try:
+                state = {"news_urls": list(key[0]), "rss_urls": list(key[1])}
+                future.set_result(self.news_agent.run(state).get("news_data", []))
+            except Exception as e:
+                with self._corpus_lock:
+                    if self._corpus.get(key, (0, None))[1] is future:
+                        del self._corpus[key]
+                future.set_exception(e)
+            else:
+                with self._corpus_lock:
+                    if self._corpus.get(key, (0, None))[1] is future:
+                        # The TTL runs from when the articles arrived
+                        self._corpus[key] = (time.time(), future)
+        return future.result()
 
     def fetch_news_sentiment(self, symbol, news_urls=None, rss_urls=None):
-        # Use NewsAgent to fetch and analyze news for the ticker
-        state = {"news_urls": news_urls or [], "rss_urls": rss_urls or []}
-        news_data = self.news_agent.run(state).get("news_data", [])
-        # Filter news mentioning the symbol
-        filtered = [n for n in news_data if symbol.upper() in n.get("title", "").upper() or symbol.upper() in n.get("text", "").upper()]
-        return filtered
+        return tag_articles(self.news_corpus(news_urls, rss_urls), [symbol])[symbol]
 
     def run(self, state):
         tickers = state.get("tickers", [])
         results = {}
+        # The shared corpus is fetched while StockTwits streams are requested
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            corpus = pool.submit(self.news_corpus, state.get("news_urls"), state.get("rss_urls"))
+            stocktwits = self.fetch_stocktwits_many(tickers)
+            news = tag_articles(corpus.result(), tickers)
         for ticker in tickers:
-            stocktwits_msgs = self.fetch_stocktwits_sentiment(ticker)
-            news_msgs = self.fetch_news_sentiment(ticker)
             results[ticker] = {
-                "stocktwits": stocktwits_msgs,
-                "news": news_msgs
+                "stocktwits": stocktwits[ticker],
+                "news": news[ticker]
             }
         state["combined_sentiment"] = results
         return state
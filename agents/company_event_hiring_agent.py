@@ -2,7 +2,6 @@
 CompanyEventHiringAgent: Monitors company pressrooms, job boards, and GitHub activity.
 """
 from .base_agent import BaseAgent
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 
@@ -15,32 +14,52 @@ class CompanyEventHiringAgent(BaseAgent):
 
 
     def fetch_pressroom(self, url):
-        resp = requests.get(url)
+        return self.parse_pressroom(self.http.get(url))
+
+    def fetch_job_board(self, url):
+        return self.parse_job_board(self.http.get(url))
+
+    def fetch_github_activity(self, org="apple"):
+        return self.parse_github_activity(self.http.get(self.github_events_url(org)))
+
+    def github_events_url(self, org):
+        return f"https://api.github.com/orgs/{org}/events"
+
+    def parse_pressroom(self, resp):
         soup = BeautifulSoup(resp.content, "html.parser")
         headlines = [h.text for h in soup.find_all('h2')]
         return headlines
 
-    def fetch_job_board(self, url):
-        resp = requests.get(url)
+    def parse_job_board(self, resp):
         soup = BeautifulSoup(resp.content, "html.parser")
         jobs = [j.text for j in soup.find_all('a') if 'job' in j.text.lower()]
         return jobs
 
-    def fetch_github_activity(self, org="apple"):
-        api_url = f"https://api.github.com/orgs/{org}/events"
-        resp = requests.get(api_url)
+    def parse_github_activity(self, resp):
         if resp.status_code == 200:
             events = resp.json()
             return [e['type'] for e in events[:10]]
         return []
 
+    def fetch_all(self, url, job_url, org):
+        """
+        Fetch pressroom, job board and GitHub activity concurrently; a failed source yields [].
+        """
+        responses = self.http.get_many([url, job_url, self.github_events_url(org)])
+        results = []
+        for parse, resp in zip((self.parse_pressroom, self.parse_job_board, self.parse_github_activity), responses):
+            if isinstance(resp, Exception):
+                self.handle_error(resp)
+                results.append([])
+            else:
+                results.append(parse(resp))
+        return results
+
     def run(self, state):
         url = state.get("pressroom_url", "https://www.apple.com/newsroom/")
         job_url = state.get("job_board_url", "https://boards.greenhouse.io/apple")
         org = state.get("github_org", "apple")
-        events = self.fetch_pressroom(url)
-        jobs = self.fetch_job_board(job_url)
-        github_events = self.fetch_github_activity(org)
+        events, jobs, github_events = self.fetch_all(url, job_url, org)
         state["company_events"] = {
             "pressroom": events,
             "jobs": jobs,
@@ -55,7 +74,7 @@ class CompanyEventHiringAgent(BaseAgent):
                     {"role": "system", "content": "You are a company events analyst. Given the following press releases, job postings, and GitHub activity, summarize any key company events or signals relevant to equity investors in 2-3 sentences."},
                     {"role": "user", "content": str({'pressroom': events[:5], 'jobs': jobs[:5], 'github_activity': github_events[:5]})}
                 ]
-                state['company_events_insights'] = openai_chat(summary_prompt, api_key=openai_api_key)
+                state['company_events_insights'] = openai_chat(summary_prompt, api_key=openai_api_key, cache_site='company_events')
             except Exception as e:
                 self.log(f"OpenAI company events insight failed: {e}", level=30)
         return state
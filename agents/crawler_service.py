@@ -0,0 +1,223 @@
+"""
+CrawlerService: Long-lived Scrapy crawler process for NewsAgent.
+One child process boots the Twisted reactor once and runs crawl jobs sent over a queue through a
+CrawlerRunner. Discovered article links are streamed back as they are found, so the caller can
+start downloading articles before the crawl finishes. Each job has its own depth and link limits.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger("CrawlerService")
+
+CRAWLER_SETTINGS = {
+    "LOG_ENABLED": False,
+    "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+    "USER_AGENT": "Mozilla/5.0 (compatible; MarketTrendAgent/1.0)",
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+    "DOWNLOAD_TIMEOUT": 15,
+    "TELNETCONSOLE_ENABLED": False,
+}
+
+
+def crawler_main(jobs, results):
+    """
+    Child process entry point. Jobs are ("crawl", job_id, seeds, max_depth, max_links),
+    ("cancel", job_id) or None to exit. Results are ("link", job_id, url) and ("done", job_id, None).
+    """
+    from scrapy.utils.reactor import install_reactor
+    install_reactor(CRAWLER_SETTINGS["TWISTED_REACTOR"])
+    import scrapy
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.exceptions import CloseSpider
+    from scrapy.linkextractors import LinkExtractor
+    from twisted.internet import reactor
+
+    class LinkSpider(scrapy.Spider):
+        """
+        Emits same-domain links found on the seed pages; pages are followed while depth < max_depth.
+        """
+        name = "news_link_spider"
+
+        def __init__(self, job_id, seeds, max_depth, max_links, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.job_id = job_id
+            self.start_urls = list(seeds)
+            self.max_depth = max_depth
+            self.max_links = max_links
+            self.seen = set(self.start_urls)
+            self.emitted = 0
+            self.link_extractor = LinkExtractor(allow_domains=sorted({urlparse(u).netloc for u in seeds}))
+
+        def parse(self, response):
+            depth = response.meta.get("depth", 0)
+            for link in self.link_extractor.extract_links(response):
+                # Responses already in flight are still parsed after CloseSpider
+                if self.emitted >= self.max_links:
+                    raise CloseSpider("max_links")
+                url = link.url.split("#")[0]
+                if url in self.seen:
+                    continue
+                self.seen.add(url)
+                self.emitted += 1
+                results.put(("link", self.job_id, url))
+                if depth + 1 < self.max_depth:
+                    yield response.follow(url, callback=self.parse)
+
+    runner = CrawlerRunner(settings=CRAWLER_SETTINGS)
+    crawlers = {}
+
+    def start(job_id, seeds, max_depth, max_links):
+        crawler = runner.create_crawler(LinkSpider)
+        crawlers[job_id] = crawler
+        deferred = runner.crawl(crawler, job_id=job_id, seeds=seeds, max_depth=max_depth, max_links=max_links)
+
+        def finished(_):
+            crawlers.pop(job_id, None)
+            results.put(("done", job_id, None))
+        deferred.addBoth(finished)
+
+    def cancel(job_id):
+        crawler = crawlers.get(job_id)
+        if crawler is not None and crawler.engine is not None:
+            crawler.engine.close_spider(crawler.spider, "cancelled")
+
+    def read_jobs():
+        while True:
+            job = jobs.get()
+            if job is None:
+                reactor.callFromThread(reactor.stop)
+                return
+            if job[0] == "crawl":
+                reactor.callFromThread(start, *job[1:])
+            elif job[0] == "cancel":
+                reactor.callFromThread(cancel, job[1])
+
+    threading.Thread(target=read_jobs, daemon=True).start()
+    reactor.run(installSignalHandlers=False)
+
+
+class CrawlerService:
+    """
+    Parent-side handle: starts the crawler process on first use (and again if it died) and
+    routes streamed results to the job that asked for them.
+    """
+    def __init__(self, timeout=None):
+        self.timeout = float(timeout if timeout is not None else os.getenv("NEWS_CRAWL_TIMEOUT", "30"))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._jobs = None
+        self._results = None
+        self._routes = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                return
+            self._jobs = self._ctx.Queue()
+            self._results = self._ctx.Queue()
+            self._process = self._ctx.Process(target=crawler_main, args=(self._jobs, self._results), name="crawler-service", daemon=True)
+            self._process.start()
+            threading.Thread(target=self._dispatch, args=(self._results,), name="crawler-dispatch", daemon=True).start()
+            logger.info(f"Crawler service started (pid {self._process.pid})")
+
+    def _dispatch(self, results):
+        while True:
+            try:
+                message = results.get()
+            except Exception:  # queue closed at shutdown
+                return
+            if message is None:
+                return
+            route = self._routes.get(message[1])
+            if route is not None:
+                route.put(message)
+
+    def crawl(self, seeds, max_depth=1, max_links=200, timeout=None):
+        """
+        Yield discovered links for `seeds` as the crawler finds them. Stops when the crawl
+        finishes, `max_links` links were found, or the caller spent `timeout` seconds waiting on
+        the crawler (the job is then cancelled). Time the caller spends between reads does not
+        count, and links already delivered when the timeout hits are still yielded.
+        """
+        self.start()
+        job_id = next(self._ids)
+        route = queue.Queue()
+        self._routes[job_id] = route
+        budget = timeout if timeout is not None else self.timeout
+        self._jobs.put(("crawl", job_id, list(seeds), max_depth, max_links))
+        finished = False
+        try:
+            while True:
+                try:
+                    kind, _, url = route.get_nowait()
+                except queue.Empty:
+                    if budget <= 0:
+                        logger.warning(f"Crawl job {job_id} timed out")
+                        self._cancel(job_id)
+                        finished = True
+                        yield from self._drain(route)
+                        return
+                    waited = time.monotonic()
+                    try:
+                        kind, _, url = route.get(timeout=min(budget, 1.0))
+                    except queue.Empty:
+                        if not self._process.is_alive():
+                            raise RuntimeError("Crawler service process exited")
+                        continue
+                    finally:
+                        budget -= time.monotonic() - waited
+                if kind == "done":
+                    finished = True
+                    return
+                yield url
+        finally:
+            self._routes.pop(job_id, None)
+            # The caller stopped reading: stop the spider too
+            if not finished:
+                self._cancel(job_id)
+
+    def _cancel(self, job_id):
+        if self._process is not None and self._process.is_alive():
+            self._jobs.put(("cancel", job_id))
+
+    def _drain(self, route):
+        while True:
+            try:
+                kind, _, url = route.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "done":
+                return
+            yield url
+
+    def stop(self):
+        with self._lock:
+            if self._process is None:
+                return
+            self._jobs.put(None)
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._results.put(None)
+            self._process = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_crawler_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = CrawlerService()
+    return _service
@@ -0,0 +1,176 @@
+"""
+Article deduplication for NewsAgent: URL canonicalization plus a SimHash near-duplicate index.
+Fingerprints are 64-bit SimHashes over word 3-gram shingles; two articles within `max_distance`
+bits are the same story. The index splits each fingerprint into bands (LSH buckets) so a lookup
+only compares against articles sharing a band, and holds at most `max_items` articles (LRU).
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import numpy as np
+
+# Only parameters that never select content are dropped everywhere; names like ref, src or cid
+# pick the article on some sites, so they are stripped only for hosts listed in NEWS_TRACKING_PARAMS
+# ("host:param,param;host:param", e.g. "nytimes.com:smid;wsj.com:mod")
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga"}
+HOST_TRACKING_PARAMS = {
+    host.strip().lower().removeprefix("www."): {p.strip().lower() for p in params.split(",") if p.strip()}
+    for host, _, params in (entry.partition(":") for entry in os.getenv("NEWS_TRACKING_PARAMS", "").split(";") if entry.strip())
+}
+WORD_RE = re.compile(r"\w+")
+_SHIFTS = np.arange(64, dtype=np.uint64)
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so copies of the same page compare equal: lower-case scheme and host,
+    no 'www.', default port, fragment, tracking parameters, AMP suffix or trailing slash;
+    remaining query parameters sorted. The scheme is kept as given.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/amp/?$|\.amp$", "", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    host_params = HOST_TRACKING_PARAMS.get(host.split(":")[0], ())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS and k.lower() not in host_params)
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def simhash(text, ngram=3):
+    """
+    64-bit SimHash of `text` over word n-gram shingles (None for empty text).
+    """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    shingles = [" ".join(words[i:i + ngram]) for i in range(max(len(words) - ngram + 1, 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles],
+                      dtype=np.uint64)
+    votes = ((hashes[:, None] >> _SHIFTS) & np.uint64(1)).sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int(np.packbits((votes > 0)[::-1]).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """
+    Bounded LRU index of fingerprints with banded LSH buckets. With `bands` > `max_distance`,
+    any pair within `max_distance` bits shares at least one band exactly. The defaults (8 bands,
+    7 bits) catch wire copies with light edits; unrelated articles sit around 32 bits apart.
+    """
+    def __init__(self, max_items=5000, bands=8, max_distance=7):
+        self.max_items = max_items
+        self.bands = bands
+        self.band_bits = 64 // bands
+        self.max_distance = max_distance
+        self._items = OrderedDict()  # key -> (fingerprint, value)
+        self._buckets = [dict() for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def find(self, fingerprint):
+        """
+        (key, value) of the closest indexed item within max_distance, or None.
+        """
+        with self._lock:
+            best = None
+            for bucket, band in zip(self._buckets, self._band_keys(fingerprint)):
+                for key in bucket.get(band, ()):
+                    distance = hamming(fingerprint, self._items[key][0])
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, key)
+            if best is None:
+                return None
+            self._items.move_to_end(best[1])
+            return best[1], self._items[best[1]][1]
+
+    def add(self, key, fingerprint, value=None):
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (fingerprint, value)
+            for bucket, band in zip(self._buckets, self._band_keys(fingerprint)):
+                bucket.setdefault(band, set()).add(key)
+            while len(self._items) > self.max_items:
+                self._remove(next(iter(self._items)))
+
+    def _remove(self, key):
+        fingerprint, _ = self._items.pop(key)
+        for bucket, band in zip(self._buckets, self._band_keys(fingerprint)):
+            keys = bucket.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[band]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ArticleDeduplicator:
+    """
+    Remembers recently seen articles by canonical URL and by content fingerprint.
+    Stored article dicts are returned for repeats so callers can reuse them instead of
+    downloading, parsing and summarizing the copy again. A URL is reused for `url_ttl` seconds
+    after it was fetched (None: until evicted), so pages that change under the same URL
+    (section fronts, live blogs) are picked up again.
+    """
+    def __init__(self, max_items=5000, max_distance=7, url_ttl=None):
+        self.index = SimHashIndex(max_items=max_items, max_distance=max_distance)
+        self.max_items = max_items
+        self.url_ttl = url_ttl
+        self._by_url = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup_url(self, url):
+        """
+        Stored article for the canonical form of `url`, or None.
+        """
+        canonical = canonicalize_url(url)
+        with self._lock:
+            entry = self._by_url.get(canonical)
+            if entry is None:
+                return None
+            article, added_at = entry
+            if self.url_ttl is not None and time.monotonic() - added_at >= self.url_ttl:
+                del self._by_url[canonical]
+                return None
+            self._by_url.move_to_end(canonical)
+            return article
+
+    def find_duplicate(self, text):
+        """
+        Stored article whose content is a (near-)duplicate of `text`, or None.
+        """
+        fingerprint = simhash(text or "")
+        if fingerprint is None:
+            return None
+        match = self.index.find(fingerprint)
+        return match[1] if match else None
+
+    def add(self, article, text=None):
+        canonical = canonicalize_url(article["url"])
+        with self._lock:
+            self._by_url[canonical] = (article, time.monotonic())
+            self._by_url.move_to_end(canonical)
+            while len(self._by_url) > self.max_items:
+                self._by_url.popitem(last=False)
+        fingerprint = simhash(text if text is not None else article.get("text", ""))
+        if fingerprint is not None:
+            self.index.add(canonical, fingerprint, article)
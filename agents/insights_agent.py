@@ -2,6 +2,7 @@
 InsightsAgent: Aggregates all agent outputs and produces buy recommendations for equities.
 """
 from .base_agent import BaseAgent
+from .signal_index import SignalIndex
 
 class InsightsAgent(BaseAgent):
     def __init__(self):
@@ -9,44 +10,41 @@ class InsightsAgent(BaseAgent):
 
     def run(self, state):
         # Collect outputs from all agents
-        market_data = state.get('market_data', [])
-        news = state.get('news', [])
-        sec_filings = state.get('sec_filings', [])
-        sentiment = state.get('social_mentions', [])
         macro = state.get('macro_data', [])
         events = state.get('company_events', {})
         startup = state.get('startup_signals', {})
         nlp = state.get('extracted_events', [])
         openai_api_key = state.get('openai_api_key')
 
-        # Build a context for each ticker
-        ticker_context = {}
-        for row in market_data:
-            ticker = row.get('ticker')
-            if not ticker:
-                continue
-            ticker_context[ticker] = {
-                'market_data': row,
-                'news': [n for n in news if n.get('ticker', ticker) == ticker],
-                'sec_filings': [f for f in sec_filings if f.get('ticker', ticker) == ticker],
-                'sentiment': [s for s in sentiment if s.get('ticker', ticker) == ticker],
-                'macro': macro,
-                'events': events,
-                'startup': startup,
-                'nlp': nlp,
-            }
+        # Group everything by ticker in one pass; the latest bar per ticker drives the context
+        index = SignalIndex.from_state(state)
+        shared = {'macro': macro, 'events': events, 'startup': startup, 'nlp': nlp}
+        ticker_context = {ticker: index.context(ticker, shared) for ticker in index.tickers}
 
         recommendations = []
+        ai_results = {}
+        if openai_api_key:
+            # One concurrent fan-out for every ticker; results come back in ticker order
+            from .llm_executor import get_llm_executor
+            from .insights_context import ContextBuilder
+            # Global signals are compressed once and shared; each prompt fits the token budget
+            builder = ContextBuilder(budget_tokens=state.get('context_token_budget'))
+            global_text = builder.build_global(macro, events, startup, nlp)
+            prompts = [
+                [
+                    {"role": "system", "content": "You are a Chief Investment Officer AI. Given the following multi-agent signals for a stock, provide a buy/sell/hold recommendation, a confidence score (1-5), and a 2-3 sentence explanation referencing the most important signals. Format: {\"recommendation\":..., \"confidence\":..., \"explanation\":...}"},
+                    {"role": "user", "content": builder.build(ticker, context['market_data'], index.signals(ticker), global_text)}
+                ]
+                for ticker, context in ticker_context.items()
+            ]
+            ai_results = dict(zip(ticker_context, get_llm_executor().chat_many(prompts, api_key=openai_api_key, max_tokens=256, cache_site='insights')))
         for ticker, context in ticker_context.items():
             # Use OpenAI to generate a recommendation and explanation
             if openai_api_key:
                 try:
-                    from .openai_utils import openai_chat
-                    prompt = [
-                        {"role": "system", "content": "You are a Chief Investment Officer AI. Given the following multi-agent signals for a stock, provide a buy/sell/hold recommendation, a confidence score (1-5), and a 2-3 sentence explanation referencing the most important signals. Format: {\"recommendation\":..., \"confidence\":..., \"explanation\":...}"},
-                        {"role": "user", "content": str(context)}
-                    ]
-                    ai_result = openai_chat(prompt, api_key=openai_api_key, max_tokens=256)
+                    ai_result = ai_results[ticker]
+                    if isinstance(ai_result, Exception):
+                        raise ai_result
                     import json
                     try:
                         ai_json = json.loads(ai_result)
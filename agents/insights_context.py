@@ -0,0 +1,172 @@
+"""
+ContextBuilder: Token-budgeted prompt context for InsightsAgent.
+Global signals (macro, company events, startup signals, NLP output) are compressed once per run
+and shared by every ticker's prompt; per-ticker signals (news, filings, social) are ranked by
+relevance and recency and added until the prompt's token budget is spent.
+"""
+import json
+import math
+import os
+import pandas as pd
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character heuristic
+    _encoding = None
+
+# Per-kind weight applied on top of relevance and recency
+KIND_WEIGHTS = {"filing": 1.2, "news": 1.0, "social": 0.8}
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text)[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def compact(value, max_items=5, max_chars=200):
+    """
+    Recursively trim lists to `max_items` and strings to `max_chars`.
+    """
+    if isinstance(value, dict):
+        return {k: compact(v, max_items, max_chars) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(v, max_items, max_chars) for v in list(value)[:max_items]]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "..."
+    if isinstance(value, float):
+        return round(value, 4)
+    return value
+
+
+def summarize_series(series):
+    """
+    Latest observation and change for one FRED series, given as a list of {date, value} records
+    or in the columnar {"dates": [...], "values": [...]} layout.
+    """
+    if not series:
+        return None
+    if isinstance(series, dict):
+        df = pd.DataFrame({"date": series.get("dates", []), "value": series.get("values", [])})
+    else:
+        df = pd.DataFrame(series)
+    if df.shape[1] < 2:
+        return None
+    date_col, value_col = df.columns[0], df.columns[1]
+    values = pd.to_numeric(df[value_col], errors="coerce")
+    valid = values.notna()
+    if not valid.any():
+        return None
+    values, dates = values[valid], df[date_col][valid]
+    summary = {"date": str(dates.iloc[-1]), "latest": round(float(values.iloc[-1]), 4)}
+    if len(values) > 1 and values.iloc[-2] != 0:
+        summary["change_pct"] = round(float((values.iloc[-1] / values.iloc[-2] - 1) * 100), 3)
+    return summary
+
+
+def summarize_macro(macro):
+    if isinstance(macro, dict):
+        summaries = {name: summarize_series(records) for name, records in macro.items()}
+        return {name: s for name, s in summaries.items() if s}
+    return compact(macro)
+
+
+def parse_time(value):
+    if not value:
+        return None
+    ts = pd.to_datetime(value, utc=True, errors="coerce")
+    return None if pd.isna(ts) else ts
+
+
+class ContextBuilder:
+    """
+    Builds the user message for each ticker's recommendation prompt within `budget_tokens`.
+    Output depends only on the inputs and `now`, so identical runs produce identical prompts.
+    """
+    def __init__(self, budget_tokens=None, global_share=0.3, half_life_days=7.0, now=None):
+        self.budget_tokens = int(budget_tokens or os.getenv("INSIGHTS_CONTEXT_TOKENS", "1500"))
+        self.global_share = global_share
+        self.half_life_days = half_life_days
+        self.now = parse_time(now) if now is not None else pd.Timestamp.now(tz="UTC")
+
+    def build_global(self, macro, events, startup, nlp):
+        """
+        Compress the signals shared by every ticker once per run.
+        """
+        blob = {
+            "macro": summarize_macro(macro),
+            "events": compact(events),
+            "startup": compact(startup),
+            "nlp": compact(nlp, max_items=10),
+        }
+        blob = {k: v for k, v in blob.items() if v}
+        text = json.dumps(blob, default=str, separators=(",", ":"))
+        return truncate_to_tokens(text, int(self.budget_tokens * self.global_share))
+
+    def recency(self, when):
+        ts = parse_time(when)
+        if ts is None:
+            return 0.5
+        age_days = max((self.now - ts).total_seconds() / 86400.0, 0.0)
+        return math.pow(0.5, age_days / self.half_life_days)
+
+    def rank(self, ticker, signals):
+        """
+        Order (kind, item) pairs by relevance x recency; ties keep input order.
+        Items tagged with the ticker outrank untagged ones; strong sentiment adds weight.
+        """
+        scored = []
+        for pos, (kind, item) in enumerate(signals):
+            relevance = KIND_WEIGHTS.get(kind, 1.0) * (1.0 if item.get("ticker") == ticker else 0.6)
+            try:
+                relevance *= 1.0 + abs(float(item.get("sentiment") or 0.0))
+            except (TypeError, ValueError):
+                pass
+            when = item.get("publish_date") or item.get("date") or item.get("created_at")
+            scored.append((-relevance * self.recency(when), pos, kind, item))
+        scored.sort(key=lambda s: (s[0], s[1]))
+        return [(kind, item) for _, _, kind, item in scored]
+
+    @staticmethod
+    def render_signal(kind, item):
+        when = item.get("publish_date") or item.get("date") or ""
+        title = item.get("title") or item.get("body") or ""
+        summary = item.get("summary") or (item.get("text") or "")[:300]
+        line = f"- [{kind}{' ' + str(when)[:10] if when else ''}] {title}"
+        if summary and summary != title:
+            line += f" | {summary}"
+        try:
+            line += f" (sentiment {float(item['sentiment']):.2f})"
+        except (KeyError, TypeError, ValueError):
+            pass
+        return line
+
+    def build(self, ticker, market_row, signals, global_text):
+        """
+        Prompt context for one ticker: market row, shared global context, then ranked signals
+        until the budget is full. Signals that do not fit are skipped, smaller ones may still fit.
+        """
+        header = "\n".join([
+            f"TICKER: {ticker}",
+            f"MARKET: {json.dumps(compact(market_row), default=str, separators=(',', ':'))}",
+            f"GLOBAL: {global_text}",
+            "SIGNALS:",
+        ])
+        parts = [header]
+        remaining = self.budget_tokens - count_tokens(header)
+        for kind, item in self.rank(ticker, signals):
+            line = self.render_signal(kind, item)
+            cost = count_tokens(line) + 1
+            if cost <= remaining:
+                parts.append(line)
+                remaining -= cost
+        return "\n".join(parts)
@@ -0,0 +1,129 @@
+"""
+LLMExecutor: Bounded-concurrency fan-out for OpenAI completions.
+Runs many openai_chat / summarize_text calls at once under a concurrency limit and
+requests-per-minute / tokens-per-minute budgets, retries 429s and transient 5xx errors with
+exponential backoff, and returns results in input order.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.rate_limit import TokenBucket
+from . import openai_utils
+
+logger = logging.getLogger("LLMExecutor")
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def estimate_tokens(messages, max_tokens=256):
+    """
+    Rough prompt + completion token count (about 4 characters per token).
+    """
+    return sum(len(m.get("content", "")) for m in messages) // 4 + max_tokens
+
+
+class LLMExecutor:
+    """
+    Thread-pool executor for completions. Failed calls come back as the exception, in place,
+    so callers can fall back per item.
+    """
+    def __init__(self, max_concurrency=8, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=5, backoff_base=1.0, backoff_max=30.0):
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket.per_minute(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+    def _retry_delay(self, err, attempt):
+        response = getattr(err, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return min(self.backoff_base * (2 ** attempt), self.backoff_max) * (0.5 + random.random() / 2)
+
+    def _call(self, fn, args, kwargs, tokens):
+        for attempt in range(self.max_retries + 1):
+            if self.request_bucket:
+                self.request_bucket.acquire(1)
+            if self.token_bucket:
+                self.token_bucket.acquire(tokens)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                response = getattr(e, "response", None)
+                status = getattr(response, "status_code", None)
+                if status not in RETRY_STATUS or attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"LLM call got {status}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+
+    def map(self, calls):
+        """
+        Run (fn, args, kwargs, estimated_tokens) calls concurrently; results in input order.
+        """
+        futures = [self._pool.submit(self._call, fn, args, kwargs, tokens) for fn, args, kwargs, tokens in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def chat_many(self, prompts, api_key=None, model='gpt-3.5-turbo', temperature=0.2, max_tokens=256, cache_site=None):
+        """
+        openai_chat for every prompt (a messages list). Cached completions are returned without
+        touching the rate budgets.
+        """
+        results = [None] * len(prompts)
+        pending = []
+        for i, messages in enumerate(prompts):
+            cached = openai_utils.llm_cache.get(openai_utils.LLMCache.make_key(model, messages, temperature, max_tokens),
+                                                 count_miss=False)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+        calls = [
+            (openai_utils.openai_chat, (prompts[i],),
+             {"api_key": api_key, "model": model, "temperature": temperature, "max_tokens": max_tokens, "cache_site": cache_site},
+             estimate_tokens(prompts[i], max_tokens))
+            for i in pending
+        ]
+        for i, result in zip(pending, self.map(calls)):
+            results[i] = result
+        return results
+
+    def summarize_many(self, texts, api_key=None):
+        return self.chat_many([openai_utils.summary_messages(t) for t in texts], api_key=api_key, cache_site='summary')
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_llm_executor():
+    """
+    Process-wide executor configured from LLM_MAX_CONCURRENCY, LLM_RPM, LLM_TPM and LLM_MAX_RETRIES.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = LLMExecutor(
+                    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                    requests_per_minute=float(os.getenv("LLM_RPM", "0")) or None,
+                    tokens_per_minute=float(os.getenv("LLM_TPM", "0")) or None,
+                    max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+                )
+    return _executor
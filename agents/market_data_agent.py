@@ -4,7 +4,13 @@ Industry-standard: modular, robust, extensible.
 """
 import yfinance as yf
 import pandas as pd
+import os
+import threading
+import time
 from .base_agent import BaseAgent
+from utils import indicators
+from utils.incremental_indicators import IncrementalIndicators, IndicatorStateStore
+from utils.ohlc_store import INTERVAL_SECONDS, OHLCStore, period_start, utc_index
 
 class MarketDataAgent(BaseAgent):
     """
@@ -13,17 +19,155 @@ class MarketDataAgent(BaseAgent):
     """
     def __init__(self):
         super().__init__()
+        # Live indicator state per (ticker, interval); snapshotted when INDICATOR_STATE_DIR is set
+        self.indicator_store = IndicatorStateStore(
+            os.getenv('INDICATOR_STATE_DIR'), save_interval=float(os.getenv('INDICATOR_SNAPSHOT_SECONDS', '300')))
+        # Bars of indicator history kept per state; older bars are computed in batch when requested
+        self.indicator_history = int(os.getenv('INDICATOR_HISTORY_BARS', '5000'))
+        self._indicator_lock = threading.Lock()
+        # Local Parquet bar cache; repeated requests only fetch the missing tail
+        cache_dir = os.getenv('OHLC_CACHE_DIR')
+        self.ohlc_store = OHLCStore(cache_dir) if cache_dir else None
+        self.ohlc_refresh_seconds = float(os.getenv('OHLC_REFRESH_SECONDS', '900'))
 
+    def shutdown(self):
+        self.indicator_store.save()
 
     def fetch_from_yfinance(self, ticker, period, interval):
         data = yf.download(ticker, period=period, interval=interval)
         return data
 
+    def fetch_batch_from_yfinance(self, tickers, period, interval, chunk_size=50):
+        """
+        Download the ticker list in chunked multi-symbol calls and split the result per ticker.
+        Symbols missing from a batch result are retried individually. Returns {ticker: DataFrame}.
+        """
+        frames = {}
+        for i in range(0, len(tickers), chunk_size):
+            chunk = tickers[i:i + chunk_size]
+            self.log(f"Fetching {len(chunk)} tickers from yfinance API in one batch...")
+            try:
+                data = yf.download(chunk, period=period, interval=interval, group_by='column', threads=True, progress=False)
+            except Exception as e:
+                self.handle_error(e)
+                continue
+            for ticker in chunk:
+                frame = self.split_ticker_frame(data, ticker)
+                if frame is not None:
+                    frames[ticker] = frame
+        for ticker in tickers:
+            if ticker not in frames:
+                self.log(f"Batch download missed {ticker}, fetching individually...")
+                try:
+                    frames[ticker] = self.fetch_from_yfinance(ticker, period, interval)
+                except Exception as e:
+                    self.handle_error(e)
+                    frames[ticker] = pd.DataFrame()
+        return frames
+
+    def split_ticker_frame(self, data, ticker):
+        """
+        Select one ticker from a multi-symbol download, keeping the (Price, Ticker) column layout
+        of a single-symbol download. Column selection is lazy under pandas copy-on-write, so no
+        data is copied unless the ticker has rows outside the shared date index to drop.
+        Returns None when the ticker has no data.
+        """
+        if data.empty or not isinstance(data.columns, pd.MultiIndex) or ticker not in data.columns.get_level_values(-1):
+            return None
+        frame = data.xs(ticker, axis=1, level=-1, drop_level=False)
+        close = frame['Close'].iloc[:, 0]
+        mask = close.notna()
+        if not mask.any():
+            return None
+        if not mask.all():
+            # Tickers listed for a shorter window than the rest of the batch get NaN-padded rows
+            frame = frame.loc[mask]
+        return frame
+
+    def fetch_cached(self, tickers, period, interval, chunk_size=50):
+        """
+        Serve bars from the local OHLC store. Tickers with no stored history for the window get
+        a full batched download (for period='max', unless the stored history came from a 'max'
+        download); stale ones get only the tail since their last stored bar; fresh
+        ones (refreshed within one bar interval, capped at OHLC_REFRESH_SECONDS) cost no upstream call.
+        Returns {ticker: DataFrame} in the same layout as a yfinance download.
+        """
+        window_start = period_start(period)
+        refresh = min(INTERVAL_SECONDS.get(interval, 86400), self.ohlc_refresh_seconds)
+        now = time.time()
+        full, tails = [], {}
+        for ticker in tickers:
+            with self.ohlc_store.lock(ticker, interval):
+                meta = self.ohlc_store.meta(ticker, interval)
+            if meta is None or not meta['parts'] or not self._covers(meta, window_start):
+                full.append(ticker)
+            elif now - meta['fetched_at'] >= refresh:
+                tails[ticker] = pd.Timestamp(meta['parts'][-1]['last'])
+        self.log(f"OHLC cache: {len(full)} full, {len(tails)} delta, {len(tickers) - len(full) - len(tails)} fresh")
+        if full:
+            for ticker, frame in self.fetch_batch_from_yfinance(full, period, interval, chunk_size).items():
+                if not frame.empty:
+                    with self.ohlc_store.lock(ticker, interval):
+                        self.ohlc_store.write(ticker, interval, self._flat_frame(frame), covered_from=window_start,
+                                              full_history=window_start is None)
+        if tails:
+            symbols = list(tails)
+            start = min(tails.values()).strftime('%Y-%m-%d')
+            for i in range(0, len(symbols), chunk_size):
+                chunk = symbols[i:i + chunk_size]
+                try:
+                    data = yf.download(chunk, start=start, interval=interval, group_by='column', threads=True, progress=False)
+                except Exception as e:
+                    self.handle_error(e)
+                    continue
+                for ticker in chunk:
+                    frame = self.split_ticker_frame(data, ticker)
+                    if frame is None:
+                        self.log(f"No new bars for {ticker}", level=30)
+                        continue
+                    frame = self._flat_frame(frame)
+                    # The shared start date may reach further back than this ticker's last bar
+                    frame = frame[utc_index(frame.index) >= tails[ticker]]
+                    with self.ohlc_store.lock(ticker, interval):
+                        self.ohlc_store.append(ticker, interval, frame)
+        frames = {}
+        for ticker in tickers:
+            with self.ohlc_store.lock(ticker, interval):
+                df = self.ohlc_store.read(ticker, interval, start=window_start)
+            if not df.empty:
+                df.columns = pd.MultiIndex.from_product([df.columns, [ticker]], names=['Price', 'Ticker'])
+            frames[ticker] = df
+        return frames
+
+    def _covers(self, meta, window_start):
+        # 'max' (no window start) is covered only by a history fetched with period='max'
+        if meta.get('full_history'):
+            return True
+        return window_start is not None and pd.Timestamp(meta['covered_from']) <= window_start
+
+    def _flat_frame(self, frame):
+        return frame.droplevel(-1, axis=1) if isinstance(frame.columns, pd.MultiIndex) else frame
+
+    def fetch_from_alpha_vantage_cached(self, ticker, api_key):
+        """
+        Alpha Vantage daily bars through the OHLC store (interval 'av_1d'), refetched at most
+        every OHLC_REFRESH_SECONDS.
+        """
+        if self.ohlc_store is None:
+            return self.fetch_from_alpha_vantage(ticker, api_key)
+        with self.ohlc_store.lock(ticker, 'av_1d'):
+            meta = self.ohlc_store.meta(ticker, 'av_1d')
+            if meta is None or time.time() - meta['fetched_at'] >= self.ohlc_refresh_seconds:
+                av_data = self.fetch_from_alpha_vantage(ticker, api_key)
+                if av_data.empty:
+                    return av_data
+                self.ohlc_store.append(ticker, 'av_1d', av_data.astype(float).sort_index())
+            return self.ohlc_store.read(ticker, 'av_1d')
+
     def fetch_from_alpha_vantage(self, ticker, api_key):
         # Example: Fetch daily data from Alpha Vantage (free API, limited calls)
-        import requests
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={ticker}&apikey={api_key}&outputsize=compact"
-        resp = requests.get(url)
+        resp = self.http.get(url)
         if resp.status_code == 200:
             json_data = resp.json()
             if "Time Series (Daily)" in json_data:
@@ -38,15 +182,65 @@ class MarketDataAgent(BaseAgent):
         if df.empty:
             return df
         df = df.copy()
-        # If 'Close' is a DataFrame (multi-ticker), apply per column
+        # If 'Close' is a DataFrame (multi-ticker), compute all tickers in one vectorized pass
         if isinstance(df['Close'], pd.DataFrame) or (hasattr(df['Close'], 'columns') and len(df['Close'].columns) > 1):
-            for ticker in df['Close'].columns:
-                df[('SMA_20', ticker)] = df['Close'][ticker].astype(float).rolling(window=20).mean()
-                df[('RSI_14', ticker)] = self.compute_rsi(df['Close'][ticker].astype(float), 14)
+            close = df['Close'].astype(float).to_numpy()
+            sma_20 = indicators.sma(close, 20)
+            rsi_14 = indicators.rsi(close, 14, method="simple")
+            for i, ticker in enumerate(df['Close'].columns):
+                df[('SMA_20', ticker)] = sma_20[:, i]
+                df[('RSI_14', ticker)] = rsi_14[:, i]
         else:
             # Single ticker (Series)
-            df['SMA_20'] = df['Close'].astype(float).rolling(window=20).mean()
-            df['RSI_14'] = self.compute_rsi(df['Close'].astype(float), 14)
+            close = df['Close'].astype(float).to_numpy()
+            df['SMA_20'] = indicators.sma(close, 20)[:, 0]
+            df['RSI_14'] = indicators.rsi(close, 14, method="simple")[:, 0]
+        return df
+
+    def add_incremental_indicators(self, df, ticker, interval):
+        """
+        Same columns as add_technical_indicators, but SMA_20/RSI_14 come from the stored
+        incremental state: only bars newer than the last committed one are processed, and the
+        final (possibly still-forming) bar is evaluated with peek rather than committed.
+        Bars older than the state's kept history (INDICATOR_HISTORY_BARS) are computed with the
+        vectorized engine. Falls back to a one-off rebuild when the state cannot continue the series.
+        """
+        close = df['Close']
+        if isinstance(close, pd.DataFrame):
+            if len(close.columns) != 1:
+                return self.add_technical_indicators(df)
+            close = close.iloc[:, 0]
+        close = close.astype(float).dropna()
+        if close.empty:
+            return self.add_technical_indicators(df)
+        with self._indicator_lock:
+            state = self.indicator_store.get(ticker, interval)
+            if state is None or not state.covers(close):
+                state = IncrementalIndicators(ticker, interval, max_history=self.indicator_history)
+                state.extend(close.iloc[:-1])
+                self.indicator_store.put(state)
+            else:
+                state.extend(close.iloc[:-1][close.index[:-1] > state.last_timestamp])
+                self.indicator_store.mark_dirty(ticker, interval)
+            sma, rsi = state.history_values(close.index[:-1])
+            oldest = state.history[0][0] if state.history else None
+            last = state.peek(close.iloc[-1])
+        # SMA/RSI only look back over their windows, so the bars before the kept history need just their own prefix
+        n_old = len(close) - 1 if oldest is None else int((close.index[:-1] < oldest).sum())
+        if n_old:
+            older = close.to_numpy()[:n_old]
+            sma[:n_old] = indicators.sma(older, 20)[:, 0].tolist()
+            rsi[:n_old] = indicators.rsi(older, 14, method="simple")[:, 0].tolist()
+        sma = pd.Series(sma + [last['SMA_20']], index=close.index).reindex(df.index)
+        rsi = pd.Series(rsi + [last['RSI_14']], index=close.index).reindex(df.index)
+        df = df.copy()
+        if isinstance(df.columns, pd.MultiIndex):
+            col_ticker = df['Close'].columns[0]
+            df[('SMA_20', col_ticker)] = sma.to_numpy()
+            df[('RSI_14', col_ticker)] = rsi.to_numpy()
+        else:
+            df['SMA_20'] = sma.to_numpy()
+            df['RSI_14'] = rsi.to_numpy()
         return df
 
     def compute_rsi(self, series, period=14):
@@ -70,8 +264,9 @@ class MarketDataAgent(BaseAgent):
                 if not data.empty:
                     data = self.add_technical_indicators(data)
                     data['ticker'] = ticker
-                    # data.to_sql('ohlc', self.engine, if_exists='append', index=True)
-                    # self.log(f"Stored {ticker} data to DB with indicators.")
+                    if self.db_writer:
+                        self.db_writer.write_market_frame(ticker, data)
+                        self.log(f"Queued {ticker} data with indicators for storage.")
                 if data.empty:
                     self.log(f"No data for {ticker}", level=30)
             except Exception as e:
@@ -89,22 +284,30 @@ class MarketDataAgent(BaseAgent):
         period = state.get('period', '1y')
         interval = state.get('interval', '1d')
         api_key = state.get('alpha_vantage_api_key')
+        if self.ohlc_store is not None:
+            frames = self.fetch_cached(tickers, period, interval, chunk_size=state.get('batch_size', 50))
+        elif state.get('batch_download', True):
+            frames = self.fetch_batch_from_yfinance(tickers, period, interval, chunk_size=state.get('batch_size', 50))
+        else:
+            frames = {ticker: self.fetch_from_yfinance(ticker, period, interval) for ticker in tickers}
         all_results = []
         for ticker in tickers:
-            data = self.fetch_from_yfinance(ticker, period, interval)
+            data = frames[ticker]
             print(f"[DEBUG] {ticker} yfinance shape: {data.shape}")
             print(f"[DEBUG] {ticker} yfinance head:\n{data.head()}")
             if api_key:
-                av_data = self.fetch_from_alpha_vantage(ticker, api_key)
+                av_data = self.fetch_from_alpha_vantage_cached(ticker, api_key)
                 if not av_data.empty:
                     data = pd.concat([data, av_data], axis=0).sort_index().drop_duplicates()
             if not data.empty:
-                data = self.add_technical_indicators(data)
+                data = self.add_incremental_indicators(data, ticker, interval)
                 print(f"[DEBUG] {ticker} with indicators head:\n{data.head()}")
                 data['ticker'] = ticker
                 # Flatten columns if MultiIndex (e.g., after yfinance download)
                 if isinstance(data.columns, pd.MultiIndex):
                     data.columns = ['_'.join([str(i) for i in col if i]) for col in data.columns.values]
+                if self.db_writer:
+                    self.db_writer.write_market_frame(ticker, data)
                 # Find the correct 'Close' column (e.g., 'Close_AAPL')
                 close_col = None
                 for col in data.columns:
@@ -115,8 +318,7 @@ class MarketDataAgent(BaseAgent):
                 sma_col = next((c for c in data.columns if 'SMA_20' in c), 'SMA_20')
                 rsi_col = next((c for c in data.columns if 'RSI_14' in c), 'RSI_14')
                 # Recommendation logic: RSI < 30 = Buy, RSI > 70 = Sell, else Hold
-                data['recommendation'] = data[rsi_col].apply(
-                    lambda rsi: 'Buy' if rsi < 30 else ('Sell' if rsi > 70 else 'Hold') if pd.notnull(rsi) else 'N/A')
+                data['recommendation'] = indicators.signal_labels(data[rsi_col].to_numpy(dtype=float))
                 # Only keep relevant columns for frontend
                 result = data.reset_index()[['Date','ticker',close_col,sma_col,rsi_col,'recommendation']].rename(columns={"Date": "date", close_col: "close", sma_col: "SMA_20", rsi_col: "RSI_14"}).fillna('').to_dict(orient='records')
                 print(f"[DEBUG] {ticker} result sample: {result[:2]}")
@@ -124,6 +326,7 @@ class MarketDataAgent(BaseAgent):
             else:
                 self.log(f"No data for {ticker}", level=30)
         print(f"[DEBUG] all_results length: {len(all_results)}")
+        self.indicator_store.maybe_save()
         state['market_data'] = all_results
         # OpenAI-powered summary/insight
         openai_api_key = state.get('openai_api_key')
@@ -134,7 +337,7 @@ class MarketDataAgent(BaseAgent):
                     {"role": "system", "content": "You are a financial analyst. Given the following market data, provide a 2-3 sentence summary of the overall trend and any actionable insights for an equity investor."},
                     {"role": "user", "content": str(all_results[:10])}
                 ]
-                state['market_data_insights'] = openai_chat(summary_prompt, api_key=openai_api_key)
+                state['market_data_insights'] = openai_chat(summary_prompt, api_key=openai_api_key, cache_site='market')
             except Exception as e:
                 self.log(f"OpenAI market data insight failed: {e}", level=30)
         return state
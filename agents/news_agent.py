@@ -5,28 +5,46 @@ Industry-standard: modular, robust, extensible.
 from newspaper import Article
 import pandas as pd
 from .base_agent import BaseAgent
-import scrapy
-from scrapy.crawler import CrawlerProcess
+from .llm_executor import get_llm_executor
+from .crawler_service import get_crawler_service
+from .dedup import ArticleDeduplicator, canonicalize_url
+from utils.semantic_index import tag_tickers
 import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from urllib.parse import urlparse
 
-def crawl_worker(seed_urls, result_queue):
-    from scrapy.crawler import CrawlerProcess
-    from agents.news_agent import NewsSpider  # Adjust import if needed
-    process = CrawlerProcess(settings={"LOG_ENABLED": False})
-    spider = NewsSpider
-    process.crawl(spider, urls=seed_urls)
-    process.start()
-    result_queue.put(spider.results if hasattr(spider, 'results') else seed_urls)
-
-class NewsSpider(scrapy.Spider):
-    name = "news_spider"
-    custom_settings = {'LOG_ENABLED': False}
-    def __init__(self, urls, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.start_urls = urls
-        self.results = []
-    def parse(self, response):
-        self.results.append(response.url)
+ARTICLE_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; MarketTrendAgent/1.0)"}
+
+def parse_article(url, html):
+    """
+    Parse downloaded HTML with Newspaper3k and score its sentiment.
+    Module-level so it can run in the parse process pool.
+    """
+    from utils.sentiment import get_sentiment_service
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return {
+        'url': url,
+        'title': article.title,
+        'text': article.text,
+        'publish_date': str(article.publish_date) if article.publish_date else '',
+        'sentiment': get_sentiment_service().score(article.text),
+    }
+
+def parse_feed(response):
+    import feedparser
+    feed = feedparser.parse(response.content)
+    return [{
+        'url': entry.link,
+        'title': entry.title,
+        'summary': entry.summary if 'summary' in entry else '',
+        'published': entry.published if 'published' in entry else ''
+    } for entry in feed.entries]
 
 class NewsAgent(BaseAgent):
     """
@@ -35,41 +53,153 @@ class NewsAgent(BaseAgent):
     """
     def __init__(self):
         super().__init__()
+        # Download concurrency, per-domain politeness and per-URL deadline for article fetches
+        self.max_downloads = int(os.getenv("NEWS_MAX_DOWNLOADS", "32"))
+        self.per_domain_limit = int(os.getenv("NEWS_PER_DOMAIN_LIMIT", "2"))
+        self.article_timeout = float(os.getenv("NEWS_ARTICLE_TIMEOUT", "20"))
+        self.rss_refresh = float(os.getenv("RSS_REFRESH_SECONDS", "300"))
+        # Parse + sentiment run in a process pool; 0 parses inline
+        self.parse_workers = int(os.getenv("NEWS_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+        # Scrapy runs in one persistent process shared by every crawl
+        self.crawler = get_crawler_service()
+        # Recently seen articles by canonical URL (reused for NEWS_DEDUP_URL_TTL) and content fingerprint (bounded LRU)
+        self.dedup = ArticleDeduplicator(max_items=int(os.getenv("NEWS_DEDUP_SIZE", "5000")),
+                                         url_ttl=float(os.getenv("NEWS_DEDUP_URL_TTL", "3600")))
+
+    def _submit_parse(self, url, html):
+        if self.parse_workers <= 0:
+            future = Future()
+            try:
+                future.set_result(parse_article(url, html))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # spawn: forking a process that runs the HTTP client loop thread is unsafe
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._parse_pool.submit(parse_article, url, html)
+
+    def warm_up(self):
+        # Boots the crawler process and the parse pool (or loads the parser inline) so the first crawl is not paying for it
+        self.crawler.start()
+        self._submit_parse("https://example.com/warm-up", "<html><body><p>Markets opened higher.</p></body></html>").result()
 
-    def crawl_urls(self, seed_urls):
+    def shutdown(self):
+        self.crawler.stop()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(cancel_futures=True)
+            self._parse_pool = None
+
+    def iter_articles(self, urls):
         """
-        Use Scrapy to crawl and collect article URLs from seed pages.
-        Runs the crawl in a subprocess to avoid Twisted reactor reuse errors.
+        Download, parse and score articles concurrently, yielding each article as soon as it
+        is ready (completion order). `urls` may be any iterable and is consumed lazily.
+        At most `max_downloads` fetches are in flight, `per_domain_limit` per domain; a fetch
+        still running after `article_timeout` seconds is cancelled.
         """
-        result_queue = multiprocessing.Queue()
-        p = multiprocessing.Process(target=crawl_worker, args=(seed_urls, result_queue))
-        p.start()
-        p.join()
+        urls = iter(urls)
+        exhausted = False
+        waiting = deque()  # URLs held back by their domain's limit
+        domain_load = {}
+        downloads = {}  # future -> (url, domain, deadline)
+        parses = {}  # future -> url
+
+        def try_start(url):
+            domain = urlparse(url).netloc
+            if domain_load.get(domain, 0) >= self.per_domain_limit:
+                return False
+            future = self.http.submit("GET", url, headers=ARTICLE_HEADERS, timeout=self.article_timeout)
+            downloads[future] = (url, domain, time.monotonic() + self.article_timeout)
+            domain_load[domain] = domain_load.get(domain, 0) + 1
+            return True
+
+        def fill():
+            nonlocal exhausted
+            for _ in range(len(waiting)):
+                if len(downloads) >= self.max_downloads:
+                    return
+                url = waiting.popleft()
+                if not try_start(url):
+                    waiting.append(url)
+            while not exhausted and len(downloads) < self.max_downloads and len(waiting) < self.max_downloads * 4:
+                try:
+                    url = next(urls)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if not try_start(url):
+                    waiting.append(url)
+
         try:
-            results = result_queue.get(timeout=10)
-        except Exception:
-            results = seed_urls
-        return results
+            fill()
+            while downloads or parses:
+                timeout = max(min(d for _, _, d in downloads.values()) - time.monotonic(), 0) if downloads else None
+                done, _ = wait(list(downloads) + list(parses), timeout=timeout, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future in list(downloads):
+                    url, domain, deadline = downloads[future]
+                    if future not in done and deadline > now:
+                        continue
+                    del downloads[future]
+                    domain_load[domain] -= 1
+                    if future not in done:
+                        future.cancel()
+                        self.handle_error(f"Timed out fetching {url}")
+                        continue
+                    try:
+                        resp = future.result()
+                        resp.raise_for_status()
+                    except Exception as e:
+                        self.handle_error(f"Failed to fetch {url}: {e}")
+                        continue
+                    parses[self._submit_parse(url, resp.text)] = url
+                for future in [f for f in parses if f.done()]:
+                    url = parses.pop(future)
+                    try:
+                        article = future.result()
+                    except Exception as e:
+                        self.handle_error(f"Failed to parse {url}: {e}")
+                        continue
+                    self.log(f"Parsed article: {url}")
+                    yield article
+                fill()
+        finally:
+            for future in list(downloads) + list(parses):
+                future.cancel()
 
+    def crawl_urls(self, seed_urls, max_depth=1, max_links=200):
+        """
+        Stream article URLs discovered from the seed pages by the long-lived Scrapy crawler
+        service. Falls back to the seed URLs themselves if the crawler cannot run.
+        """
+        found = False
+        try:
+            for url in self.crawler.crawl(seed_urls, max_depth=max_depth, max_links=max_links):
+                found = True
+                yield url
+        except Exception as e:
+            self.handle_error(f"Crawler failed: {e}")
+        if not found:
+            yield from seed_urls
 
     def fetch_rss(self, rss_urls):
-        import feedparser
+        # Feeds go through the conditional-GET cache: within RSS_REFRESH_SECONDS no request is
+        # made, and an unchanged feed (304) is not re-parsed
+        self.log(f"Fetching RSS feeds: {rss_urls}")
+        feeds = self.http_cache.get_many(rss_urls, parse_feed, refresh_interval=self.rss_refresh)
         entries = []
-        for rss_url in rss_urls:
-            self.log(f"Fetching RSS feed: {rss_url}")
-            feed = feedparser.parse(rss_url)
-            for entry in feed.entries:
-                entries.append({
-                    'url': entry.link,
-                    'title': entry.title,
-                    'summary': entry.summary if 'summary' in entry else '',
-                    'published': entry.published if 'published' in entry else ''
-                })
+        for rss_url, feed_entries in zip(rss_urls, feeds):
+            if isinstance(feed_entries, Exception):
+                self.handle_error(f"Failed to fetch RSS feed {rss_url}: {feed_entries}")
+                continue
+            entries.extend(feed_entries)
         return entries
 
     def analyze_sentiment(self, text):
-        from textblob import TextBlob
-        return TextBlob(text).sentiment.polarity
+        return self.sentiment.score(text)
 
     def summarize(self, text, openai_api_key=None):
         if openai_api_key:
@@ -83,45 +213,107 @@ class NewsAgent(BaseAgent):
         sentences = re.split(r'(?<=[.!?]) +', text)
         return ' '.join(sentences[:2])
 
-    def fetch_and_return(self, urls, rss_urls=None):
-        articles = []
-        # Optionally crawl for more URLs
-        all_urls = self.crawl_urls(urls)
+    def summarize_many(self, texts, openai_api_key=None):
+        """
+        Summarize many texts in one concurrent fan-out through the shared LLM executor.
+        Texts whose completion failed get the extractive fallback.
+        """
+        results = get_llm_executor().summarize_many(texts, api_key=openai_api_key) if openai_api_key else [None] * len(texts)
+        summaries = []
+        for text, result in zip(texts, results):
+            if isinstance(result, Exception):
+                self.log(f"OpenAI summarization failed: {result}", level=30)
+                result = None
+            summaries.append(result if result is not None else self.summarize(text))
+        return summaries
+
+    def _unseen_urls(self, urls, run):
+        """
+        Pass through URLs not seen before. Known URLs reuse the stored article (no download,
+        parse or summary) and repeats within the run are dropped.
+        """
+        for url in urls:
+            canonical = canonicalize_url(url)
+            if canonical in run['requested']:
+                continue
+            run['requested'].add(canonical)
+            stored = self.dedup.lookup_url(url)
+            if stored is not None:
+                self._emit(stored, run)
+            else:
+                yield url
+
+    def _emit(self, article, run):
+        canonical = canonicalize_url(article['url'])
+        if canonical not in run['emitted']:
+            run['emitted'].add(canonical)
+            run['articles'].append(article)
+
+    def _accept(self, article, run, text=None):
+        """
+        Record a newly fetched article, or link it to the canonical copy if it is a
+        (near-)duplicate. Returns True for new articles.
+        """
+        canonical = self.dedup.find_duplicate(text if text is not None else article['text'])
+        if canonical is not None and canonicalize_url(canonical['url']) != canonicalize_url(article['url']):
+            run['duplicates'].append({'url': article['url'], 'title': article.get('title', ''), 'duplicate_of': canonical['url']})
+            self._emit(canonical, run)
+            return False
+        self.dedup.add(article, text)
+        self._emit(article, run)
+        run['fresh'].append(article)
+        return True
+
+    def fetch_and_return(self, urls, rss_urls=None, openai_api_key=None, crawl_depth=1, crawl_max_links=200, duplicates=None, tickers=None):
+        """
+        Crawl, fetch and summarize articles. Duplicates (same canonical URL or near-identical
+        text) are not summarized or stored again; they are appended to `duplicates` with the
+        URL of the copy they duplicate.
+        """
+        run = {'articles': [], 'fresh': [], 'duplicates': duplicates if duplicates is not None else [],
+               'emitted': set(), 'requested': set()}
+        # Optionally crawl for more URLs; links stream into the download pipeline as they are found
+        all_urls = self.crawl_urls(urls, max_depth=crawl_depth, max_links=crawl_max_links)
         # Add RSS feed entries
         if rss_urls:
             rss_entries = self.fetch_rss(rss_urls)
+            rss_articles = []
             for entry in rss_entries:
-                articles.append({
+                if not list(self._unseen_urls([entry['url']], run)):
+                    continue
+                article = {
                     'url': entry['url'],
                     'title': entry['title'],
                     'text': entry.get('summary', ''),
                     'publish_date': entry.get('published', ''),
-                    'sentiment': self.analyze_sentiment(entry.get('summary', '')),
-                    'summary': self.summarize(entry.get('summary', ''))
-                })
-        for url in all_urls:
-            try:
-                self.log(f"Parsing article: {url}")
-                article = Article(url)
-                article.download()
-                article.parse()
-                sentiment = self.analyze_sentiment(article.text)
-                summary = self.summarize(article.text)
-                articles.append({
-                    'url': url,
-                    'title': article.title,
-                    'text': article.text,
-                    'publish_date': str(article.publish_date) if article.publish_date else '',
-                    'sentiment': sentiment,
-                    'summary': summary
-                })
-            except Exception as e:
-                self.handle_error(f"Failed to fetch {url}: {e}")
-        if articles:
-            df = pd.DataFrame(articles)
-            # df.to_sql('news', self.engine, if_exists='append', index=False)
-            self.log(f"Stored {len(articles)} articles.")
-        return articles
+                }
+                if self._accept(article, run, text=f"{entry['title']} {article['text']}"):
+                    rss_articles.append(article)
+            for article, sentiment in zip(rss_articles, self.sentiment.score_many([a['text'] for a in rss_articles])):
+                article['sentiment'] = sentiment
+        # Downloads and parsing are pipelined; articles arrive as they finish
+        for article in self.iter_articles(self._unseen_urls(all_urls, run)):
+            self._accept(article, run)
+        # Summaries are requested together once every new article is parsed
+        fresh = run['fresh']
+        summaries = self.summarize_many([a['text'] for a in fresh], openai_api_key=openai_api_key)
+        for article, summary in zip(fresh, summaries):
+            article['summary'] = summary
+        if run['duplicates']:
+            self.log(f"Skipped {len(run['duplicates'])} duplicate articles.")
+        if fresh and self.db_writer:
+            self.db_writer.write_news(fresh)
+            self.log(f"Queued {len(fresh)} articles for storage.")
+        self.index_semantic([{
+            'text': f"{a['title']}. {a['text'][:1000]}",
+            'kind': 'news',
+            'tickers': tag_tickers(f"{a['title']} {a['text']}", tickers),
+            'ts': a.get('publish_date'),
+            'title': a['title'],
+            'url': a['url'],
+            'sentiment': a.get('sentiment'),
+        } for a in fresh])
+        return run['articles']
 
     def run(self, state):
         """
@@ -135,6 +327,10 @@ class NewsAgent(BaseAgent):
             'https://feeds.reuters.com/reuters/businessNews',
             'https://www.cnbc.com/id/100003114/device/rss/rss.html'
         ])
-        news_data = self.fetch_and_return(urls, rss_urls)
+        duplicates = []
+        news_data = self.fetch_and_return(urls, rss_urls, openai_api_key=state.get('openai_api_key'),
+                                          crawl_depth=state.get('crawl_depth', 1), crawl_max_links=state.get('crawl_max_links', 200),
+                                          duplicates=duplicates, tickers=state.get('tickers'))
         state['news_data'] = news_data
+        state['news_duplicates'] = duplicates
         return state
@@ -2,22 +2,50 @@
 NLPEventExtractionAgent: Extracts structured events/entities from news/filings using spaCy and rule-based pipelines.
 """
 from .base_agent import BaseAgent
+import os
+import threading
 import spacy
 
+# Components entities and noun chunks depend on; anything else in the pipeline (e.g. the lemmatizer) is disabled
+REQUIRED_COMPONENTS = ("tok2vec", "tagger", "attribute_ruler", "parser", "senter", "ner", "entity_ruler")
+
 class NLPEventExtractionAgent(BaseAgent):
     """
     Uses spaCy to extract entities and events from text.
     """
     def __init__(self):
         super().__init__()
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = spacy.load(os.getenv("NLP_SPACY_MODEL", "en_core_web_sm"))
+        self.disabled_components = [name for name in self.nlp.pipe_names if name not in REQUIRED_COMPONENTS]
+        self.nlp.select_pipes(disable=self.disabled_components)
+        self.batch_size = int(os.getenv("NLP_BATCH_SIZE", "64"))
+        self.n_process = int(os.getenv("NLP_N_PROCESS", "1"))
+        # The agent instance is shared across requests; spaCy pipelines are not guaranteed thread-safe
+        self._nlp_lock = threading.Lock()
 
+    def warm_up(self):
+        self.extract_events("Apple announced a new product in Cupertino.")
 
     def extract_events(self, text):
-        doc = self.nlp(text)
+        with self._nlp_lock:
+            doc = self.nlp(text)
+        return self.doc_events(doc, self.analyze_sentiment(text))
+
+    def extract_events_batch(self, texts, batch_size=None, n_process=None):
+        """
+        Extract events from many documents with nlp.pipe; results are returned in input order.
+        n_process > 1 parses in spaCy worker processes.
+        """
+        texts = [text or "" for text in texts]
+        sentiments = self.sentiment.score_many(texts)
+        n_process = max(1, min(n_process or self.n_process, os.cpu_count() or 1, len(texts) or 1))
+        with self._nlp_lock:
+            docs = list(self.nlp.pipe(texts, batch_size=batch_size or self.batch_size, n_process=n_process))
+        return [self.doc_events(doc, sentiment) for doc, sentiment in zip(docs, sentiments)]
+
+    def doc_events(self, doc, sentiment):
         entities = [(ent.text, ent.label_) for ent in doc.ents]
-        key_phrases = [chunk.text for chunk in doc.noun_chunks]
-        sentiment = self.analyze_sentiment(text)
+        key_phrases = [chunk.text for chunk in doc.noun_chunks] if doc.has_annotation("DEP") else []
         return {
             "entities": entities,
             "key_phrases": key_phrases,
@@ -25,10 +53,17 @@ class NLPEventExtractionAgent(BaseAgent):
         }
 
     def analyze_sentiment(self, text):
-        from textblob import TextBlob
-        return TextBlob(text).sentiment.polarity
+        return self.sentiment.score(text)
 
     def run(self, state):
+        if state.get("sec_filing_chunks"):
+            # Full-text filing sections from SECFilingsAgent, parsed in one batch
+            chunks = state["sec_filing_chunks"]
+            events = self.extract_events_batch([chunk["text"] for chunk in chunks])
+            state["filing_events"] = [dict({k: v for k, v in chunk.items() if k != "text"}, **e) for chunk, e in zip(chunks, events)]
+        if state.get("texts"):
+            state["extracted_events_batch"] = self.extract_events_batch(state["texts"], batch_size=state.get("batch_size"))
+            return state
         text = state.get("text", "Apple announced a new product in Cupertino.")
         events = self.extract_events(text)
         state["extracted_events"] = events
@@ -41,7 +76,7 @@ class NLPEventExtractionAgent(BaseAgent):
                     {"role": "system", "content": "You are an NLP event extraction expert. Given the following text, extract and summarize any key events relevant to equity investors in 2-3 sentences."},
                     {"role": "user", "content": text}
                 ]
-                state['nlp_event_insights'] = openai_chat(summary_prompt, api_key=openai_api_key)
+                state['nlp_event_insights'] = openai_chat(summary_prompt, api_key=openai_api_key, cache_site='nlp')
             except Exception as e:
                 self.log(f"OpenAI NLP event insight failed: {e}", level=30)
         return state
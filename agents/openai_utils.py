@@ -1,14 +1,165 @@
+import hashlib
+import json
 import os
-import requests
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from utils.http_client import get_http_client
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-OPENAI_API_URL = 'https://api.openai.com/v1/chat/completions'
+OPENAI_API_URL = os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions')
+# Completions are slower than typical API calls; override the shared client's default timeout
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+
+# Cache TTLs (seconds) per call site: market and social data move fast, filings and summaries of
+# a fixed text do not. A site not listed here uses LLM_CACHE_DEFAULT_TTL.
+CACHE_TTLS = {
+    'market': 300,
+    'social': 300,
+    'insights': 300,
+    'news': 900,
+    'company_events': 1800,
+    'macro': 3600,
+    'startup': 3600,
+    'nlp': 86400,
+    'sec': 86400,
+    'summary': 86400,
+}
+
+
+class LLMCache:
+    """
+    Content-addressed completion cache: an in-memory LRU tier in front of an optional SQLite
+    disk tier. Keys hash (model, messages, temperature, max_tokens); the API key is not part of it.
+    Each thread reuses one SQLite connection; the disk tier is trimmed back to `disk_max_entries`
+    every `evict_every` inserts rather than counted on each one.
+    """
+    def __init__(self, max_entries=1024, disk_path=None, disk_max_entries=100000, default_ttl=3600, evict_every=None):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.evict_every = evict_every or max(1, disk_max_entries // 100)
+        self._local = threading.local()
+        self._inserts = 0
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_path:
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    def _connect(self):
+        # The connection's context manager only commits, so the same connection serves every call
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.disk_path, timeout=10)
+        return conn
+
+    def close(self):
+        """
+        Close the calling thread's disk connection (others close when their thread exits).
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens):
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, count_miss=True):
+        """
+        Cached value or None. Callers that check ahead of openai_chat pass count_miss=False, since
+        openai_chat looks the key up again and records the miss itself.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    with self._lock:
+                        self.hits += 1
+                        self.disk_hits += 1
+                        self._put_memory(key, row[0], row[1])
+                    return row[0]
+        if count_miss:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def _put_memory(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._put_memory(key, value, expires_at)
+            self._inserts += 1
+            evict = self._inserts % self.evict_every == 0
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, expires_at, now))
+                count = conn.execute("SELECT count(*) FROM llm_cache").fetchone()[0] if evict else 0
+                if count > self.disk_max_entries:
+                    conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                    conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                        (max(0, count - self.disk_max_entries),))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+            }
+
+
+llm_cache = LLMCache(
+    max_entries=int(os.getenv('LLM_CACHE_SIZE', '1024')),
+    disk_path=os.getenv('LLM_CACHE_PATH') or None,
+    disk_max_entries=int(os.getenv('LLM_CACHE_DISK_SIZE', '100000')),
+    default_ttl=float(os.getenv('LLM_CACHE_DEFAULT_TTL', '3600')),
+)
+
 
 # Utility to call OpenAI Chat API for summarization, Q&A, etc.
-def openai_chat(messages, api_key=None, model='gpt-3.5-turbo', temperature=0.2, max_tokens=256):
+# `cache_site` picks the TTL from CACHE_TTLS; pass use_cache=False to force a fresh completion.
+def openai_chat(messages, api_key=None, model='gpt-3.5-turbo', temperature=0.2, max_tokens=256, cache_site=None, use_cache=True):
     api_key = api_key or OPENAI_API_KEY
     if not api_key:
         raise ValueError('OpenAI API key not set')
+    key = LLMCache.make_key(model, messages, temperature, max_tokens) if use_cache else None
+    if key:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
     headers = {
         'Authorization': f'Bearer {api_key}',
         'Content-Type': 'application/json',
@@ -19,14 +170,19 @@ def openai_chat(messages, api_key=None, model='gpt-3.5-turbo', temperature=0.2,
         'temperature': temperature,
         'max_tokens': max_tokens,
     }
-    resp = requests.post(OPENAI_API_URL, headers=headers, json=payload)
+    resp = get_http_client().post(OPENAI_API_URL, headers=headers, json=payload, timeout=OPENAI_TIMEOUT)
     resp.raise_for_status()
-    return resp.json()['choices'][0]['message']['content']
+    content = resp.json()['choices'][0]['message']['content']
+    if key:
+        llm_cache.set(key, content, ttl=CACHE_TTLS.get(cache_site))
+    return content
 
-# Example: Summarize a text
-def summarize_text(text, api_key=None):
-    messages = [
+def summary_messages(text):
+    return [
         {"role": "system", "content": "You are a financial news and filings summarizer. Summarize the following text in 2-3 crisp sentences for an investor."},
         {"role": "user", "content": text}
     ]
-    return openai_chat(messages, api_key=api_key)
+
+# Example: Summarize a text
+def summarize_text(text, api_key=None):
+    return openai_chat(summary_messages(text), api_key=api_key, cache_site='summary')
@@ -2,39 +2,171 @@
 SECFilingsAgent: Fetches and parses SEC EDGAR filings (10-K, 10-Q, 8-K, insider trades).
 """
 from .base_agent import BaseAgent
-import requests
-from bs4 import BeautifulSoup
+from .llm_executor import get_llm_executor
+from utils.filing_sections import chunk_text, get_section_cache, parse_sections
+from utils.rate_limit import TokenBucket
+from concurrent.futures import ThreadPoolExecutor
+import os
 import pandas as pd
 
+FULL_TEXT_FORMS = ("10-K", "10-Q")
+
+SEC_HEADERS = {"User-Agent": os.getenv("SEC_USER_AGENT", "OpenSourceMarketAgent/1.0 (contact: your_email@example.com)")}
+
+def normalize_cik(cik):
+    return str(int(str(cik).strip().upper().removeprefix("CIK"))).zfill(10)
+
+def parse_submissions(response):
+    """
+    Flatten an EDGAR submissions document (its columnar `filings.recent` block) into filing dicts, newest first.
+    """
+    data = response.json()
+    cik = str(data.get("cik", "")).zfill(10)
+    tickers = data.get("tickers") or []
+    recent = data.get("filings", {}).get("recent", {})
+    filings = []
+    for i, accession in enumerate(recent.get("accessionNumber", [])):
+        column = lambda name: (recent.get(name) or [""] * (i + 1))[i]
+        form, document, description = column("form"), column("primaryDocument"), column("primaryDocDescription")
+        filings.append({
+            "type": form,
+            "title": f"{form} - {description or document}",
+            "link": f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}/{document}",
+            "date": column("filingDate"),
+            "report_date": column("reportDate"),
+            "accession": accession,
+        })
+    return {"cik": cik, "name": data.get("name", ""), "ticker": tickers[0] if tickers else "", "filings": filings}
+
 class SECFilingsAgent(BaseAgent):
     """
     Fetches SEC filings using EDGAR and parses for key events.
+    Each company's whole filing list comes from one submissions request, cached per CIK with
+    conditional GETs, and is filtered by form type locally.
     """
     def __init__(self):
         super().__init__()
+        self.submissions_url = os.getenv("SEC_SUBMISSIONS_URL", "https://data.sec.gov/submissions").rstrip("/")
+        self.refresh = float(os.getenv("SEC_REFRESH_SECONDS", "300"))
+        # SEC fair access: at most 10 requests per second per client
+        self.rate_limit = TokenBucket(float(os.getenv("SEC_REQUESTS_PER_SECOND", "10")))
+        self.section_cache = get_section_cache()
+        self.section_chunk_chars = int(os.getenv("SEC_SECTION_CHUNK_CHARS", "4000"))
+        self.section_workers = int(os.getenv("SEC_SECTION_WORKERS", "4"))
 
+    def fetch_submissions(self, ciks):
+        """
+        {cik: parsed submissions, or the exception for a CIK that could not be fetched}.
+        """
+        ciks = [normalize_cik(cik) for cik in ciks]
+        urls = [f"{self.submissions_url}/CIK{cik}.json" for cik in ciks]
+        self.log(f"Fetching SEC submissions for {len(ciks)} CIKs")
+        results = self.http_cache.get_many(urls, parse_submissions, refresh_interval=self.refresh,
+                                           headers=SEC_HEADERS, limiter=self.rate_limit)
+        return dict(zip(ciks, results))
 
-    def fetch_filings(self, cik, filing_types=["10-K", "10-Q", "8-K", "4"], count=5, openai_api_key=None):
+    @staticmethod
+    def filter_filings(submissions, filing_types=None, count=5, since=None):
+        """
+        The latest `count` filings of each requested type, filed on or after `since` (YYYY-MM-DD).
+        """
+        taken = {}
         filings = []
-        headers = {"User-Agent": "OpenSourceMarketAgent/1.0 (contact: your_email@example.com)"}
-        for filing_type in filing_types:
-            base_url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK={cik}&type={filing_type}&count={count}&output=atom"
-            print(f"[DEBUG] Fetching SEC filings: {base_url}")
-            resp = requests.get(base_url, headers=headers)
-            print(f"[DEBUG] Response status for {filing_type}: {resp.status_code}")
-            soup = BeautifulSoup(resp.content, "xml")
-            entries = soup.find_all("entry")
-            print(f"[DEBUG] {len(entries)} entries found for {filing_type}")
-            for entry in entries:
-                filings.append({
-                    "type": filing_type,
-                    "title": entry.title.text,
-                    "link": entry.link["href"],
-                    "date": entry.updated.text,
-                    "summary": self.summarize_filing(entry.summary.text if entry.summary else "", openai_api_key=openai_api_key)
-                })
+        for filing in submissions["filings"]:
+            form = filing["type"]
+            if filing_types and form not in filing_types:
+                continue
+            if since and filing["date"] < since:
+                continue
+            if taken.get(form, 0) >= count:
+                continue
+            taken[form] = taken.get(form, 0) + 1
+            filings.append(dict(filing, ticker=submissions["ticker"], company=submissions["name"]))
         return filings
 
+    def fetch_filings_batch(self, ciks, filing_types=["10-K", "10-Q", "8-K", "4"], count=5, since=None, openai_api_key=None):
+        """
+        Filings for many CIKs; returns ({cik: [filings]}, {cik: error message}).
+        Summaries are the filing title and date, condensed by the LLM only when `openai_api_key` is given.
+        """
+        results, errors = {}, {}
+        valid = []
+        for cik in ciks:
+            try:
+                valid.append(normalize_cik(cik))
+            except ValueError:
+                errors[str(cik)] = "invalid CIK"
+        for cik, submissions in self.fetch_submissions(valid).items():
+            if isinstance(submissions, Exception):
+                self.handle_error(f"SEC fetch failed for CIK {cik}: {submissions}")
+                errors[cik] = str(submissions)
+                continue
+            results[cik] = self.filter_filings(submissions, filing_types, count=count, since=since)
+        filings = [f for cik_filings in results.values() for f in cik_filings]
+        # Summarize every filing in one concurrent fan-out
+        summaries = self.summarize_filings([f"{f['title']} filed {f['date']}" for f in filings], openai_api_key=openai_api_key)
+        for filing, summary in zip(filings, summaries):
+            filing["summary"] = summary
+        return results, errors
+
+    def fetch_filings(self, cik, filing_types=["10-K", "10-Q", "8-K", "4"], count=5, openai_api_key=None):
+        results, errors = self.fetch_filings_batch([cik], filing_types, count=count, openai_api_key=openai_api_key)
+        if errors:
+            self.handle_error(f"No filings for CIK {cik}: {next(iter(errors.values()))}")
+            return []
+        filings = results.get(normalize_cik(cik), [])
+        self.log(f"{len(filings)} filings found for CIK {cik}")
+        return filings
+
+    def fetch_sections(self, filing):
+        """
+        Risk factors, MD&A and financial statements of a 10-K / 10-Q. The primary document is
+        streamed straight into the section parser, never held whole; results are cached by accession.
+        """
+        sections = self.section_cache.get(filing["accession"])
+        if sections is not None:
+            return sections
+        self.rate_limit.acquire()
+        self.log(f"Streaming {filing['type']} {filing['accession']} from {filing['link']}")
+        with self.http.stream("GET", filing["link"], headers=SEC_HEADERS, timeout=60.0) as resp:
+            resp.raise_for_status()
+            sections = parse_sections(resp.iter_bytes(), form=filing["type"])
+        self.section_cache.put(filing["accession"], sections)
+        return sections
+
+    def analyze_sections(self, filings, openai_api_key=None):
+        """
+        Fetch the sections of every 10-K / 10-Q in `filings`, summarize them chunk by chunk in one
+        fan-out and attach {section: {chars, chunks, summary}} to each filing. Returns the chunks
+        ({accession, ticker, section, index, text}) for event extraction.
+        """
+        documents = [f for f in filings if f["type"].upper().startswith(FULL_TEXT_FORMS)]
+        if not documents:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.section_workers, len(documents)))) as pool:
+            futures = [pool.submit(self.fetch_sections, filing) for filing in documents]
+        chunks = []
+        for filing, future in zip(documents, futures):
+            try:
+                sections = future.result()
+            except Exception as e:
+                self.handle_error(f"Section extraction failed for {filing['accession']}: {e}")
+                filing["sections_error"] = str(e)
+                continue
+            filing["sections"] = {}
+            for name, text in sections.items():
+                pieces = chunk_text(text, self.section_chunk_chars)
+                filing["sections"][name] = {"chars": len(text), "chunks": len(pieces), "summary": ""}
+                chunks.extend({"accession": filing["accession"], "ticker": filing.get("ticker", ""), "section": name,
+                               "index": i, "text": piece} for i, piece in enumerate(pieces))
+        summaries = self.summarize_filings([chunk["text"] for chunk in chunks], openai_api_key=openai_api_key)
+        by_accession = {filing["accession"]: filing for filing in documents}
+        for chunk, summary in zip(chunks, summaries):
+            section = by_accession[chunk["accession"]]["sections"][chunk["section"]]
+            section["summary"] = f"{section['summary']} {summary}".strip()
+        self.log(f"{len(chunks)} section chunks from {len(documents)} filings")
+        return chunks
+
     def summarize_filing(self, text, openai_api_key=None):
         if openai_api_key:
             try:
@@ -47,10 +179,38 @@ class SECFilingsAgent(BaseAgent):
         sentences = re.split(r'(?<=[.!?]) +', text)
         return ' '.join(sentences[:2])
 
+    def summarize_filings(self, texts, openai_api_key=None):
+        """
+        Batch version of summarize_filing through the shared LLM executor; failed completions
+        fall back to the simple summary.
+        """
+        results = get_llm_executor().summarize_many(texts, api_key=openai_api_key) if openai_api_key else [None] * len(texts)
+        summaries = []
+        for text, result in zip(texts, results):
+            if isinstance(result, Exception):
+                self.log(f"OpenAI summarization failed: {result}", level=30)
+                result = None
+            summaries.append(result if result is not None else self.summarize_filing(text))
+        return summaries
+
     def run(self, state):
-        cik = state.get("cik", "0000320193")  # Apple Inc. as example
         openai_api_key = state.get("openai_api_key")
+        if state.get("ciks"):
+            # A title and date is not worth a completion per filing across a whole watchlist; the LLM
+            # is only spent on batches that also fetch the documents
+            results, errors = self.fetch_filings_batch(state["ciks"], state.get("filing_types") or ["10-K", "10-Q", "8-K", "4"],
+                                                       count=state.get("count", 5), since=state.get("since"),
+                                                       openai_api_key=openai_api_key if state.get("full_text") else None)
+            state["sec_filings_batch"] = results
+            state["sec_filings_errors"] = errors
+            if state.get("full_text"):
+                filings = [f for cik_filings in results.values() for f in cik_filings]
+                state["sec_filing_chunks"] = self.analyze_sections(filings, openai_api_key=openai_api_key)
+            return state
+        cik = state.get("cik", "0000320193")  # Apple Inc. as example
         filings = self.fetch_filings(cik, openai_api_key=openai_api_key)
         print(f"[DEBUG] SECFilingsAgent: {len(filings)} filings found. Sample: {filings[:2]}")
         state["sec_filings"] = filings
+        if state.get("full_text"):
+            state["sec_filing_chunks"] = self.analyze_sections(filings, openai_api_key=openai_api_key)
         return state
@@ -0,0 +1,76 @@
+"""
+SignalIndex: One-pass grouping of agent outputs by ticker for InsightsAgent.
+Market data is reduced to the latest bar per ticker; news, filings and social items are bucketed
+by their 'ticker' field. Items without one apply to every ticker, matching the old
+`item.get('ticker', ticker) == ticker` filter.
+"""
+import heapq
+from collections import defaultdict
+
+
+class SignalIndex:
+    KINDS = ("news", "sec_filings", "sentiment")
+
+    def __init__(self, market_data=(), news=(), sec_filings=(), sentiment=()):
+        self.latest = {}
+        for row in market_data:
+            ticker = row.get('ticker')
+            if not ticker:
+                continue
+            prev = self.latest.get(ticker)
+            if prev is None or not (row.get('date') and prev.get('date')) or row['date'] >= prev['date']:
+                self.latest[ticker] = row
+        self._tagged = {kind: defaultdict(list) for kind in self.KINDS}
+        self._untagged = {kind: [] for kind in self.KINDS}
+        for kind, items in zip(self.KINDS, (news, sec_filings, sentiment)):
+            for pos, item in enumerate(items):
+                if 'ticker' in item:
+                    self._tagged[kind][item['ticker']].append((pos, item))
+                else:
+                    self._untagged[kind].append((pos, item))
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(
+            market_data=state.get('market_data', []),
+            news=state.get('news_data', []),
+            sec_filings=state.get('sec_filings', []),
+            sentiment=state.get('social_mentions', []),
+        )
+
+    @property
+    def tickers(self):
+        return list(self.latest)
+
+    def items(self, kind, ticker):
+        """
+        Items of `kind` for `ticker` (tagged plus untagged), in their original order.
+        """
+        tagged = self._tagged[kind].get(ticker, [])
+        untagged = self._untagged[kind]
+        if not untagged:
+            return [item for _, item in tagged]
+        if not tagged:
+            return [item for _, item in untagged]
+        return [item for _, item in heapq.merge(tagged, untagged, key=lambda t: t[0])]
+
+    def context(self, ticker, shared=None):
+        """
+        The per-ticker context dict consumed by the scoring and LLM paths.
+        """
+        context = {
+            'market_data': self.latest[ticker],
+            'news': self.items('news', ticker),
+            'sec_filings': self.items('sec_filings', ticker),
+            'sentiment': self.items('sentiment', ticker),
+        }
+        context.update(shared or {})
+        return context
+
+    def signals(self, ticker):
+        """
+        (kind, item) pairs for the prompt context builder.
+        """
+        return ([('news', n) for n in self.items('news', ticker)]
+                + [('filing', f) for f in self.items('sec_filings', ticker)]
+                + [('social', s) for s in self.items('sentiment', ticker)])
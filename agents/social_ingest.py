@@ -0,0 +1,289 @@
+"""
+Social ingestion scheduler: polls StockTwits symbol streams and Reddit listings for a whole
+watchlist concurrently, paced by per-platform token buckets that match each API's quota.
+A cursor per symbol (StockTwits `since`) and a newest-seen watermark per subreddit mean only
+messages newer than the last ones seen are scored; scored messages are kept in bounded per-stream buffers that agents read from.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.http_client import get_http_client
+from utils.rate_limit import TokenBucket
+from utils.sentiment import get_sentiment_service
+
+logger = logging.getLogger("SocialIngest")
+
+USER_AGENT = "OpenSourceMarketAgent/1.0"
+
+
+class SocialIngestScheduler:
+    """
+    poll(symbols, subreddits) fetches every stream once and returns only the new messages;
+    recent_stocktwits / recent_reddit serve the buffered history, newest first.
+    start() keeps a watchlist polled in the background at the platforms' quotas; request paths
+    call refresh(), which never waits on a rate limit and leaves watched streams to that loop.
+    """
+    def __init__(self, http=None, sentiment=None, stocktwits_url=None, reddit_url=None,
+                 stocktwits_per_hour=None, reddit_per_minute=None, buffer_size=None):
+        self.http = http or get_http_client()
+        self.sentiment = sentiment or get_sentiment_service()
+        self.stocktwits_url = (stocktwits_url or os.getenv("STOCKTWITS_API_URL", "https://api.stocktwits.com/api/2")).rstrip("/")
+        self.reddit_client_id = os.getenv("REDDIT_CLIENT_ID")
+        self.reddit_client_secret = os.getenv("REDDIT_CLIENT_SECRET")
+        authenticated = bool(self.reddit_client_id and self.reddit_client_secret)
+        default_reddit = "https://oauth.reddit.com" if authenticated else "https://www.reddit.com"
+        self.reddit_url = (reddit_url or os.getenv("REDDIT_API_URL", default_reddit)).rstrip("/")
+        # StockTwits allows 200 unauthenticated requests per hour; Reddit 100/minute with OAuth, ~10 without
+        stocktwits_per_hour = stocktwits_per_hour or float(os.getenv("STOCKTWITS_REQUESTS_PER_HOUR", "200"))
+        reddit_per_minute = reddit_per_minute or float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", "100" if authenticated else "10"))
+        self.stocktwits_bucket = TokenBucket(stocktwits_per_hour / 3600.0, capacity=max(1.0, stocktwits_per_hour / 60.0))
+        self.reddit_bucket = TokenBucket.per_minute(reddit_per_minute)
+        self.buffer_size = buffer_size or int(os.getenv("SOCIAL_BUFFER_SIZE", "200"))
+        self._stocktwits_since = {}
+        # Per subreddit: newest created_utc seen and the fullnames posted at that second. Reddit's
+        # `before` cursor is not used: it returns nothing once the post it names is deleted
+        self._reddit_newest = {}
+        self._reddit_seen = {}
+        self._stocktwits = {}
+        self._reddit = {}
+        self._token = None
+        self._token_expires = 0
+        self._lock = threading.Lock()
+        self._token_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._watched_symbols = set()
+        self._watched_subreddits = set()
+        self._listeners = []
+
+    def _reddit_headers(self):
+        """
+        Headers for Reddit requests, with an OAuth token when credentials are set; None if the token
+        cannot be fetched, in which case Reddit sits the round out.
+        """
+        headers = {"User-Agent": USER_AGENT}
+        if not (self.reddit_client_id and self.reddit_client_secret) or "oauth" not in self.reddit_url:
+            return headers
+        with self._token_lock:
+            if self._token is None or time.time() >= self._token_expires:
+                try:
+                    resp = self.http.post(os.getenv("REDDIT_AUTH_URL", "https://www.reddit.com/api/v1/access_token"),
+                                          data={"grant_type": "client_credentials"}, headers=headers,
+                                          auth=(self.reddit_client_id, self.reddit_client_secret))
+                    resp.raise_for_status()
+                    payload = resp.json()
+                    self._token = payload["access_token"]
+                    self._token_expires = time.time() + payload.get("expires_in", 3600) - 60
+                except Exception as e:
+                    logger.warning(f"Reddit token request failed: {e}")
+                    return None
+            headers["Authorization"] = f"bearer {self._token}"
+        return headers
+
+    def _paced(self, bucket, requests, blocking=True):
+        """
+        Submit (key, url, params, headers) requests as the bucket allows; returns [(key, future)].
+        Without `blocking`, requests the bucket cannot afford right now are skipped.
+        """
+        submitted = []
+        skipped = 0
+        for key, url, params, headers in requests:
+            if blocking:
+                bucket.acquire()
+            elif not bucket.try_acquire():
+                skipped += 1
+                continue
+            submitted.append((key, self.http.submit("GET", url, params=params, headers=headers)))
+        if skipped:
+            logger.info(f"Rate limit reached; {skipped} streams served from buffers")
+        return submitted
+
+    def _responses(self, bucket, submitted, platform):
+        for key, future in submitted:
+            try:
+                resp = future.result()
+                if resp.status_code == 429:
+                    retry_after = float(resp.headers.get("retry-after") or 60)
+                    bucket.pause(retry_after)
+                    logger.warning(f"{platform} throttled on {key}; pausing {retry_after:.0f}s")
+                    continue
+                resp.raise_for_status()
+                yield key, resp.json()
+            except Exception as e:
+                logger.warning(f"{platform} fetch failed for {key}: {e}")
+
+    def _fetch_stocktwits(self, symbols, blocking=True):
+        with self._lock:
+            cursors = {symbol: self._stocktwits_since.get(symbol) for symbol in symbols}
+        requests = [(symbol, f"{self.stocktwits_url}/streams/symbol/{symbol}.json",
+                     {"since": cursors[symbol]} if cursors[symbol] else None, {"User-Agent": USER_AGENT})
+                    for symbol in symbols]
+        fresh = {}
+        for symbol, data in self._responses(self.stocktwits_bucket, self._paced(self.stocktwits_bucket, requests, blocking), "StockTwits"):
+            fresh[symbol] = [{
+                "platform": "StockTwits",
+                "symbol": symbol,
+                "id": msg["id"],
+                "body": msg["body"],
+                "created_at": msg.get("created_at"),
+            } for msg in data.get("messages", [])]
+        return fresh
+
+    def _fetch_reddit(self, subreddits, limit, blocking=True):
+        headers = self._reddit_headers() if subreddits else None
+        if subreddits and headers is None:
+            return {}
+        requests = [(sub, f"{self.reddit_url}/r/{sub}/new.json", {"limit": limit}, headers) for sub in subreddits]
+        fresh = {}
+        for sub, data in self._responses(self.reddit_bucket, self._paced(self.reddit_bucket, requests, blocking), "Reddit"):
+            posts = [post["data"] for post in data.get("data", {}).get("children", [])]
+            fresh[sub] = [{
+                "platform": "Reddit",
+                "subreddit": sub,
+                "id": post["name"],
+                "title": post["title"],
+                "score": post.get("score", 0),
+                "created_utc": post.get("created_utc"),
+                "url": f"https://www.reddit.com{post.get('permalink', '')}",
+            } for post in posts]
+        return fresh
+
+    def _claim(self, stocktwits, reddit):
+        """
+        Drop what another poll already took since these requests were sent and advance the
+        cursors past the rest, in one step, so overlapping polls never hand out a message twice.
+        """
+        with self._lock:
+            for symbol, msgs in stocktwits.items():
+                since = self._stocktwits_since.get(symbol) or 0
+                stocktwits[symbol] = msgs = [m for m in msgs if m["id"] > since]
+                if msgs:
+                    self._stocktwits_since[symbol] = max(m["id"] for m in msgs)
+            for sub, posts in reddit.items():
+                newest = self._reddit_newest.get(sub)
+                if newest is not None:
+                    seen = self._reddit_seen[sub]
+                    posts = [p for p in posts if (p["created_utc"] or 0) >= newest and p["id"] not in seen]
+                reddit[sub] = posts
+                if posts:
+                    latest = max(p["created_utc"] or 0 for p in posts)
+                    at_latest = {p["id"] for p in posts if (p["created_utc"] or 0) == latest}
+                    if newest is None or latest > newest:
+                        self._reddit_newest[sub] = latest
+                        self._reddit_seen[sub] = at_latest
+                    else:
+                        self._reddit_seen[sub] |= at_latest
+        return stocktwits, reddit
+
+    def add_listener(self, callback):
+        """
+        callback(new) is called with every poll's new, scored messages (the dict poll returns)
+        before they are buffered, whichever thread polled; each message reaches listeners once.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def poll(self, symbols=(), subreddits=(), reddit_limit=100, blocking=True):
+        """
+        Fetch every symbol stream and subreddit once; returns {"stocktwits": {symbol: [new]}, "reddit": {sub: [new]}}.
+        The two platforms are paced independently and run side by side. Without `blocking`,
+        streams the rate limits cannot afford right now are left out.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        subreddits = list(dict.fromkeys(subreddits))
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            stocktwits = pool.submit(self._fetch_stocktwits, symbols, blocking)
+            reddit = pool.submit(self._fetch_reddit, subreddits, reddit_limit, blocking)
+            stocktwits, reddit = stocktwits.result(), reddit.result()
+        stocktwits, reddit = self._claim(stocktwits, reddit)
+        # Everything new this round is scored as one batch
+        new = [m for msgs in stocktwits.values() for m in msgs] + [p for posts in reddit.values() for p in posts]
+        for item, sentiment in zip(new, self.sentiment.score_many([m.get("body") or m.get("title") for m in new])):
+            item["sentiment"] = sentiment
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback({"stocktwits": stocktwits, "reddit": reddit})
+            except Exception as e:
+                logger.error(f"Error: social listener failed: {e}")
+        with self._lock:
+            for symbol, msgs in stocktwits.items():
+                buffer = self._stocktwits.setdefault(symbol, deque(maxlen=self.buffer_size))
+                buffer.extendleft(sorted(msgs, key=lambda m: m["id"]))
+            for sub, posts in reddit.items():
+                buffer = self._reddit.setdefault(sub, deque(maxlen=self.buffer_size))
+                buffer.extendleft(reversed(posts))
+        return {"stocktwits": stocktwits, "reddit": reddit}
+
+    def refresh(self, symbols=(), subreddits=()):
+        """
+        Request-path update: streams outside the background watchlist are polled if the rate
+        limits allow it right now; callers then read the buffers. Never blocks on a quota.
+        """
+        with self._lock:
+            symbols = [s for s in symbols if s.upper() not in self._watched_symbols]
+            subreddits = [sub for sub in subreddits if sub not in self._watched_subreddits]
+        if not symbols and not subreddits:
+            return {"stocktwits": {}, "reddit": {}}
+        return self.poll(symbols, subreddits, blocking=False)
+
+    def recent_stocktwits(self, symbol, limit=None):
+        with self._lock:
+            return list(self._stocktwits.get(symbol.upper(), ()))[:limit]
+
+    def recent_reddit(self, subreddit, limit=None):
+        with self._lock:
+            return list(self._reddit.get(subreddit, ()))[:limit]
+
+    def start(self, symbols, subreddits=(), interval=None):
+        """
+        Poll the watchlist in a background thread every `interval` seconds (SOCIAL_POLL_INTERVAL).
+        """
+        interval = interval or float(os.getenv("SOCIAL_POLL_INTERVAL", "300"))
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        with self._lock:
+            self._watched_symbols = {s.upper() for s in symbols}
+            self._watched_subreddits = set(subreddits)
+
+        def loop():
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    self.poll(symbols, subreddits)
+                except Exception as e:
+                    logger.error(f"Error: social poll failed: {e}")
+                self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+        self._thread = threading.Thread(target=loop, name="social-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._watched_symbols = set()
+            self._watched_subreddits = set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_social_scheduler():
+    """
+    Process-wide scheduler, so cursors and buffers are shared by every agent.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = SocialIngestScheduler()
+    return _scheduler
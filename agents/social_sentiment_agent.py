@@ -2,8 +2,10 @@
 SocialSentimentAgent: Scrapes Reddit for stock mentions and sentiment.
 """
 from .base_agent import BaseAgent
-import praw
-from sentence_transformers import SentenceTransformer
+from .social_ingest import get_social_scheduler
+import os
+from utils.embedding_cache import get_embedding_cache
+from utils.semantic_index import tag_tickers
 
 class SocialSentimentAgent(BaseAgent):
     """
@@ -11,59 +13,60 @@ class SocialSentimentAgent(BaseAgent):
     """
     def __init__(self):
         super().__init__()
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        # Set up Reddit API credentials in .env
-        import os
-        self.reddit = praw.Reddit(
-            client_id=os.getenv('REDDIT_CLIENT_ID'),
-            client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-            user_agent="OpenSourceMarketAgent/1.0"
-        )
+        # Embeddings are cached by content hash; mentions carry an embedding_id instead of the vector
+        self.embeddings = get_embedding_cache()
+        # Rate-limited StockTwits / Reddit polling with per-stream cursors (Reddit credentials in .env)
+        self.scheduler = get_social_scheduler()
+        self.watchlist = [s.strip() for s in os.getenv("SOCIAL_WATCHLIST", "AAPL").split(",") if s.strip()]
+        self.subreddits = [s.strip() for s in os.getenv("SOCIAL_SUBREDDITS", "stocks,wallstreetbets").split(",") if s.strip()]
+        # New messages are embedded and indexed whichever poll (background or request) fetched them
+        self.scheduler.add_listener(self.index_new)
 
+    def warm_up(self):
+        self.embeddings.model
+        self.sentiment.load()
 
-    def fetch_mentions(self, subreddits=["stocks", "wallstreetbets"], limit=10):
-        results = []
-        for subreddit in subreddits:
-            posts = self.reddit.subreddit(subreddit).hot(limit=limit)
-            for post in posts:
-                embedding = self.model.encode(post.title)
-                sentiment = self.analyze_sentiment(post.title)
-                results.append({
-                    "subreddit": subreddit,
-                    "title": post.title,
-                    "score": post.score,
-                    "embedding": embedding.tolist(),
-                    "sentiment": sentiment
-                })
-        # Add StockTwits scraping (public endpoint)
-        stocktwits_msgs = self.fetch_stocktwits("AAPL")
-        results.extend(stocktwits_msgs)
+    def index_new(self, new):
+        """
+        Embed and index the new messages of one scheduler poll; each gets its embedding_id.
+        """
+        symbols = list(dict.fromkeys(list(new["stocktwits"]) + [s.upper() for s in self.watchlist]))
+        posts = [p for sub_posts in new["reddit"].values() for p in sub_posts]
+        msgs = [m for symbol_msgs in new["stocktwits"].values() for m in symbol_msgs]
+        if not posts and not msgs:
+            return
+        texts = [p["title"] for p in posts] + [m["body"] for m in msgs]
+        for item, embedding_id in zip(posts + msgs, self.embeddings.embed_many(texts)):
+            item["embedding_id"] = embedding_id
+        self.index_semantic([{"text": p["title"], "kind": "reddit", "tickers": tag_tickers(p["title"], symbols), "ts": p["created_utc"],
+                              "title": p["title"], "url": p["url"], "subreddit": p["subreddit"], "sentiment": p["sentiment"]}
+                             for p in posts] +
+                            [{"text": m["body"], "kind": "stocktwits", "tickers": [m["symbol"]], "ts": m.get("created_at"),
+                              "title": m["body"][:200], "sentiment": m["sentiment"]} for m in msgs])
+
+    def fetch_mentions(self, subreddits=None, limit=10, symbols=None):
+        """
+        Latest `limit` buffered mentions per subreddit and symbol from the shared ingestion
+        scheduler. Streams outside the background watchlist are refreshed first if the platform
+        quotas allow it right now; the request never waits on a quota.
+        """
+        symbols = symbols or self.watchlist
+        subreddits = subreddits or self.subreddits
+        self.scheduler.refresh(symbols, subreddits)
+        results = [p for sub in subreddits for p in self.scheduler.recent_reddit(sub, limit)]
+        results.extend(m for symbol in symbols for m in self.scheduler.recent_stocktwits(symbol, limit))
         return results
 
     def analyze_sentiment(self, text):
-        from textblob import TextBlob
-        return TextBlob(text).sentiment.polarity
+        return self.sentiment.score(text)
 
-    def fetch_stocktwits(self, symbol):
-        import requests
-        msgs = []
-        url = f"https://api.stocktwits.com/api/2/streams/symbol/{symbol}.json"
-        resp = requests.get(url)
-        if resp.status_code == 200:
-            data = resp.json()
-            for msg in data.get("messages", [])[:10]:
-                sentiment = self.analyze_sentiment(msg["body"])
-                msgs.append({
-                    "platform": "StockTwits",
-                    "symbol": symbol,
-                    "body": msg["body"],
-                    "sentiment": sentiment
-                })
-        return msgs
+    def fetch_stocktwits(self, symbol, limit=10):
+        self.scheduler.refresh([symbol])
+        return self.scheduler.recent_stocktwits(symbol, limit)
 
     def run(self, state):
-        subreddits = state.get("subreddits", ["stocks", "wallstreetbets"])
-        mentions = self.fetch_mentions(subreddits=subreddits)
+        subreddits = state.get("subreddits") or self.subreddits
+        mentions = self.fetch_mentions(subreddits=subreddits, symbols=state.get("tickers"))
         state["social_mentions"] = mentions
         # OpenAI-powered summary/insight
         openai_api_key = state.get('openai_api_key')
@@ -74,7 +77,7 @@ class SocialSentimentAgent(BaseAgent):
                     {"role": "system", "content": "You are a financial social sentiment analyst. Given the following Reddit/social mentions, summarize the overall sentiment and highlight any actionable signals for equity investors in 2-3 sentences."},
                     {"role": "user", "content": str(mentions[:10])}
                 ]
-                state['social_sentiment_insights'] = openai_chat(summary_prompt, api_key=openai_api_key)
+                state['social_sentiment_insights'] = openai_chat(summary_prompt, api_key=openai_api_key, cache_site='social')
             except Exception as e:
                 self.log(f"OpenAI social sentiment insight failed: {e}", level=30)
         return state
@@ -2,7 +2,6 @@
 StartupSignalsAgent: Tracks startup funding, GitHub stars, job postings, and public press.
 """
 from .base_agent import BaseAgent
-import requests
 import pandas as pd
 
 class StartupSignalsAgent(BaseAgent):
@@ -15,7 +14,7 @@ class StartupSignalsAgent(BaseAgent):
 
     def fetch_github_stars(self, repo="openai/gym"):
         url = f"https://api.github.com/repos/{repo}"
-        resp = requests.get(url)
+        resp = self.http.get(url)
         if resp.status_code == 200:
             data = resp.json()
             return {"repo": repo, "stars": data.get("stargazers_count", 0)}
@@ -50,7 +49,7 @@ class StartupSignalsAgent(BaseAgent):
                     {"role": "system", "content": "You are a startup signals analyst. Given the following GitHub stars, funding news, and job postings, summarize any key startup signals or trends relevant to equity investors in 2-3 sentences."},
                     {"role": "user", "content": str({'github_stars': stars, 'funding_news': funding, 'job_postings': jobs})}
                 ]
-                state['startup_signals_insights'] = openai_chat(summary_prompt, api_key=openai_api_key)
+                state['startup_signals_insights'] = openai_chat(summary_prompt, api_key=openai_api_key, cache_site='startup')
             except Exception as e:
                 self.log(f"OpenAI startup signals insight failed: {e}", level=30)
         return state
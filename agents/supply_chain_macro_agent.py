@@ -2,43 +2,103 @@
 SupplyChainMacroAgent: Ingests macroeconomic indicators and public datasets.
 """
 from .base_agent import BaseAgent
-import requests
+from utils.macro_store import get_macro_store
+import io
+import os
+import time
 import pandas as pd
 
+def parse_fred_series(response):
+    """
+    (dates, values, date column name) from a FRED graph CSV; "." (no observation) becomes NaN.
+    """
+    df = pd.read_csv(io.StringIO(response.text))
+    if df.shape[1] < 2:
+        raise ValueError("FRED CSV has no value column")
+    dates = pd.to_datetime(df.iloc[:, 0]).to_numpy(dtype="datetime64[D]")
+    values = pd.to_numeric(df.iloc[:, 1], errors="coerce").to_numpy(dtype=float)
+    return dates, values, df.columns[0]
+
 class SupplyChainMacroAgent(BaseAgent):
     """
     Fetches macroeconomic data from public APIs (e.g., FRED) and Kaggle datasets.
+    Series are kept in the local macro store and refreshed incrementally: a stored series is only
+    requested from its last observation date on, and at most once per FRED_REFRESH_SECONDS.
     """
     def __init__(self):
         super().__init__()
+        # FRED series update monthly or quarterly; re-validate at most this often
+        self.fred_refresh = float(os.getenv("FRED_REFRESH_SECONDS", "21600"))
+        # A failed fetch (unknown id, FRED down) is not retried for this long
+        self.fred_retry = float(os.getenv("FRED_RETRY_SECONDS", "300"))
+        self._failed_at = {}
+        self.fred_url = os.getenv("FRED_GRAPH_URL", "https://fred.stlouisfed.org/graph/fredgraph.csv")
+        self.store = get_macro_store()
 
+    def refresh_macro(self, indicators):
+        """
+        Append new FRED observations for each indicator not fetched within FRED_REFRESH_SECONDS;
+        returns {indicator: observations added}.
+        """
+        # The store's own fetch time gates refreshes: the cosd URL changes with every new
+        # observation, so it is not a stable key for an HTTP cache
+        now = time.time()
+        due = [i for i in indicators
+               if now - self.store.fetched_at(i) >= self.fred_refresh and now - self._failed_at.get(i, 0.0) >= self.fred_retry]
+        requests = []
+        for indicator in due:
+            params = {"id": indicator}
+            last = self.store.last_date(indicator)
+            if last:
+                # cosd (coverage start date) limits the CSV to observations from the last stored one on
+                params["cosd"] = last
+            requests.append(("GET", self.fred_url, {"params": params}))
+        added = {}
+        for indicator, response in zip(due, self.http.gather(requests)):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                response.raise_for_status()
+                dates, values, date_column = parse_fred_series(response)
+            except Exception as e:
+                self.handle_error(f"FRED fetch failed for {indicator}: {e}")
+                self._failed_at[indicator] = time.time()
+                continue
+            self._failed_at.pop(indicator, None)
+            added[indicator] = self.store.append(indicator, dates, values, date_column=date_column)
+        if due:
+            self.log(f"FRED refresh: {added}")
+        return added
 
-    def fetch_macro(self, indicators=["GDP", "UNRATE", "CPIAUCSL"], source="FRED"):
-        # Fetch multiple macro indicators from FRED
+    def fetch_macro(self, indicators=["GDP", "UNRATE", "CPIAUCSL"], source="FRED", start=None, end=None, max_points=None, format="records"):
+        """
+        Each indicator's observations between `start` and `end`, LTTB-downsampled to `max_points`,
+        as FRED-style records or columnar {"dates", "values"}.
+        """
         all_data = {}
-        for indicator in indicators:
-            if source == "FRED":
-                url = f"https://fred.stlouisfed.org/graph/fredgraph.csv?id={indicator}"
-                resp = requests.get(url)
-                import io
-                df = pd.read_csv(io.StringIO(resp.text))
-                all_data[indicator] = df.to_dict(orient="records")
+        if source == "FRED":
+            self.refresh_macro(indicators)
+            for indicator in indicators:
+                if indicator in self.store:
+                    all_data[indicator] = self.store.query(indicator, start=start, end=end, max_points=max_points, format=format)
         return all_data
 
     def run(self, state):
         indicators = state.get("macro_indicators", ["GDP", "UNRATE", "CPIAUCSL"])
-        macro = self.fetch_macro(indicators=indicators)
+        macro = self.fetch_macro(indicators=indicators, start=state.get("start"), end=state.get("end"),
+                                 max_points=state.get("max_points"), format=state.get("format") or "records")
         state["macro_data"] = macro
         # OpenAI-powered summary/insight
         openai_api_key = state.get('openai_api_key')
         if openai_api_key and macro:
             try:
+                from .insights_context import summarize_macro
                 from .openai_utils import openai_chat
                 summary_prompt = [
                     {"role": "system", "content": "You are a macroeconomic analyst. Given the following macro indicators, summarize the current macroeconomic environment and any implications for equity investors in 2-3 sentences."},
-                    {"role": "user", "content": str(macro)}
+                    {"role": "user", "content": str(summarize_macro(macro))}
                 ]
-                state['macro_insights'] = openai_chat(summary_prompt, api_key=openai_api_key)
+                state['macro_insights'] = openai_chat(summary_prompt, api_key=openai_api_key, cache_site='macro')
             except Exception as e:
                 self.log(f"OpenAI macro insight failed: {e}", level=30)
         return state
@@ -24,7 +24,7 @@ import os
 from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 import logging
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -35,12 +35,16 @@ from fastapi.exceptions import RequestValidationError as FastAPIRequestValidatio
 from agents.insights_agent import InsightsAgent
 from agents.market_data_agent import MarketDataAgent
 from agents.news_agent import NewsAgent
-from agents.sec_filings_agent import SECFilingsAgent
+from agents.sec_filings_agent import SECFilingsAgent, normalize_cik
+from agents.social_sentiment_agent import SocialSentimentAgent
 from agents.supply_chain_macro_agent import SupplyChainMacroAgent
 from agents.company_event_hiring_agent import CompanyEventHiringAgent
 from agents.startup_signals_agent import StartupSignalsAgent
 from agents.nlp_event_extraction_agent import NLPEventExtractionAgent
 from agents.combined_sentiment_agent import CombinedSentimentAgent
+from agents.agent_registry import AgentRegistry
+from orchestration.dag_executor import build_insights_dag
+from contextlib import asynccontextmanager
 
 # --- Structured Logging Setup ---
 logger = logging.getLogger("api")
@@ -52,8 +56,42 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
+# --- Agent Registry: one warm, shared instance per agent for the whole process ---
+agent_registry = AgentRegistry({
+    "market_data": MarketDataAgent,
+    "news": NewsAgent,
+    "sec_filings": SECFilingsAgent,
+    "social_sentiment": SocialSentimentAgent,
+    "macro": SupplyChainMacroAgent,
+    "company_event": CompanyEventHiringAgent,
+    "startup_signals": StartupSignalsAgent,
+    "nlp_event": NLPEventExtractionAgent,
+    "insights": InsightsAgent,
+    "combined_sentiment": CombinedSentimentAgent,
+})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("WARM_AGENTS_ON_STARTUP", "1") == "1":
+        report = await asyncio.to_thread(agent_registry.warm_up)
+        logger.info(f"[API] Agent warm-up: {report}")
+    app.state.agents = agent_registry
+    # SOCIAL_WATCHLIST is polled in the background; request handlers read the buffered mentions
+    social = None
+    if os.getenv("SOCIAL_WATCHLIST"):
+        social = await asyncio.to_thread(agent_registry.get, "social_sentiment")
+        social.scheduler.start(social.watchlist, social.subreddits)
+    yield
+    if social is not None:
+        await asyncio.to_thread(social.scheduler.stop)
+    await asyncio.to_thread(agent_registry.shutdown)
+    from utils.semantic_index import get_semantic_index
+    semantic_index = await asyncio.to_thread(get_semantic_index)
+    if semantic_index is not None:
+        await asyncio.to_thread(semantic_index.save)
+
 # --- CORS Restriction: Use env var for allowed origins in production ---
-app = FastAPI(title="Market Trend Multi-Agent API")
+app = FastAPI(title="Market Trend Multi-Agent API", lifespan=lifespan)
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 app.add_middleware(
     CORSMiddleware,
@@ -89,15 +127,30 @@ class MarketDataRequest(BaseModel):
 class NewsRequest(BaseModel):
     urls: List[str]
     rss_urls: Optional[List[str]] = None
+    crawl_depth: Optional[int] = 1
+    crawl_max_links: Optional[int] = 200
 
 class SECFilingsRequest(BaseModel):
     cik: str
+    full_text: bool = False
+class SECFilingsBatchRequest(BaseModel):
+    ciks: List[str]
+    filing_types: Optional[List[str]] = None
+    count: int = 5
+    since: Optional[str] = None
+    full_text: bool = False
 
 class SocialSentimentRequest(BaseModel):
     subreddits: Optional[List[str]] = ["stocks", "wallstreetbets"]
 
 class MacroRequest(BaseModel):
     macro_indicators: Optional[List[str]] = ["GDP", "UNRATE", "CPIAUCSL"]
+    start: Optional[str] = None
+    end: Optional[str] = None
+    # Downsample each series to at most this many points (LTTB)
+    max_points: Optional[int] = None
+    # "records" (FRED CSV rows) or "columnar" ({"dates": [...], "values": [...]})
+    format: Literal["records", "columnar"] = "records"
 
 class CompanyEventRequest(BaseModel):
     pressroom_url: Optional[str] = "https://www.apple.com/newsroom/"
@@ -110,6 +163,9 @@ class StartupSignalsRequest(BaseModel):
 
 class NLPEventRequest(BaseModel):
     text: str
+class NLPEventBatchRequest(BaseModel):
+    texts: List[str]
+    batch_size: Optional[int] = None
 class InsightsRequest(BaseModel):
     tickers: List[str]
     period: Optional[str] = "1y"
@@ -123,18 +179,18 @@ async def run_insights(req: InsightsRequest, request: Request):
         logger.info("[API] /insights/run returning MOCK_INSIGHTS")
         return {"status": "success", **MOCK_INSIGHTS}
     state = req.dict()
-    await asyncio.to_thread(MarketDataAgent().run, state)
-    await asyncio.to_thread(NewsAgent().run, state)
-    await asyncio.to_thread(SECFilingsAgent().run, state)
-    await asyncio.to_thread(SupplyChainMacroAgent().run, state)
-    await asyncio.to_thread(CompanyEventHiringAgent().run, state)
-    await asyncio.to_thread(StartupSignalsAgent().run, state)
-    await asyncio.to_thread(NLPEventExtractionAgent().run, state)
-    await asyncio.to_thread(InsightsAgent().run, state)
-    logger.info(f"[API] /insights/run completed")
+    # Building an agent can load models; keep that off the event loop
+    agents = await asyncio.to_thread(lambda: {name: agent_registry.get(name) for name in (
+        "market_data", "news", "sec_filings", "social_sentiment", "macro", "company_event",
+        "startup_signals", "nlp_event", "insights")})
+    dag = build_insights_dag(agents)
+    report = await dag.run(state)
+    logger.info(f"[API] /insights/run completed in {report['total_seconds']:.2f}s, critical path: {' -> '.join(report['critical_path'])} ({report['critical_path_seconds']:.2f}s)")
     return {
         "status": "success",
         "result": state.get('insights', []),
+        "critical_path": report['critical_path'],
+        "timings": report['timings'],
         "market_data_insights": state.get('market_data_insights', ""),
         "news_insights": state.get('news_insights', ""),
         "sec_filings_insights": state.get('sec_filings_insights', ""),
@@ -148,7 +204,7 @@ async def run_insights(req: InsightsRequest, request: Request):
 
 async def run_market_data(req: MarketDataRequest, request: Request):
     logger.info(f"[API] /marketdata/run called from {request.client.host} with {req.dict()}")
-    agent = MarketDataAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "market_data")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /marketdata/run completed for {req.dict().get('tickers')}")
@@ -163,7 +219,7 @@ async def run_market_data(req: MarketDataRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /marketdata/run returning MOCK_MARKET_DATA")
         return {"status": "success", **MOCK_MARKET_DATA}
-    agent = MarketDataAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "market_data")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /marketdata/run completed for {req.dict().get('tickers')}")
@@ -175,7 +231,7 @@ async def run_market_data(req: MarketDataRequest, request: Request):
 
 async def run_news(req: NewsRequest, request: Request):
     logger.info(f"[API] /news/run called from {request.client.host} with {req.dict()}")
-    agent = NewsAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "news")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /news/run completed")
@@ -190,19 +246,20 @@ async def run_news(req: NewsRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /news/run returning MOCK_NEWS")
         return {"status": "success", **MOCK_NEWS}
-    agent = NewsAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "news")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /news/run completed")
     return {
         "status": "success",
         "result": state.get('news_data', []),
+        "duplicates": state.get('news_duplicates', []),
         "news_insights": state.get('news_insights', "")
     }
 
 async def run_sec_filings(req: SECFilingsRequest, request: Request):
     logger.info(f"[API] /secfilings/run called from {request.client.host} with {req.dict()}")
-    agent = SECFilingsAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "sec_filings")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /secfilings/run completed")
@@ -217,7 +274,11 @@ async def run_sec_filings(req: SECFilingsRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /secfilings/run returning MOCK_SECFILINGS")
         return {"status": "success", **MOCK_SECFILINGS}
-    agent = SECFilingsAgent()
+    try:
+        normalize_cik(req.cik)
+    except ValueError:
+        return JSONResponse(status_code=422, content={"detail": f"Invalid CIK: {req.cik}"})
+    agent = await asyncio.to_thread(agent_registry.get, "sec_filings")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /secfilings/run completed")
@@ -227,10 +288,22 @@ async def run_sec_filings(req: SECFilingsRequest, request: Request):
         "sec_filings_insights": state.get('sec_filings_insights', "")
     }
 
+@app.post("/secfilings/batch", summary="Fetch filings for many CIKs under SEC fair-access limits", response_model=dict, tags=["Agents"])
+async def run_sec_filings_batch(req: SECFilingsBatchRequest, request: Request):
+    logger.info(f"[API] /secfilings/batch called from {request.client.host} for {len(req.ciks)} CIKs")
+    agent = await asyncio.to_thread(agent_registry.get, "sec_filings")
+    state = req.dict()
+    await asyncio.to_thread(agent.run, state)
+    logger.info(f"[API] /secfilings/batch completed")
+    return {
+        "status": "success",
+        "result": state.get('sec_filings_batch', {}),
+        "errors": state.get('sec_filings_errors', {})
+    }
 
 async def run_macro(req: MacroRequest, request: Request):
     logger.info(f"[API] /macro/run called from {request.client.host} with {req.dict()}")
-    agent = SupplyChainMacroAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "macro")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /macro/run completed")
@@ -245,7 +318,7 @@ async def run_macro(req: MacroRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /macro/run returning MOCK_MACRO")
         return {"status": "success", **MOCK_MACRO}
-    agent = SupplyChainMacroAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "macro")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /macro/run completed")
@@ -257,7 +330,7 @@ async def run_macro(req: MacroRequest, request: Request):
 
 async def run_company_event(req: CompanyEventRequest, request: Request):
     logger.info(f"[API] /companyevent/run called from {request.client.host} with {req.dict()}")
-    agent = CompanyEventHiringAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "company_event")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /companyevent/run completed")
@@ -272,7 +345,7 @@ async def run_company_event(req: CompanyEventRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /companyevent/run returning MOCK_COMPANY_EVENTS")
         return {"status": "success", **MOCK_COMPANY_EVENTS}
-    agent = CompanyEventHiringAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "company_event")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /companyevent/run completed")
@@ -284,7 +357,7 @@ async def run_company_event(req: CompanyEventRequest, request: Request):
 
 async def run_startup_signals(req: StartupSignalsRequest, request: Request):
     logger.info(f"[API] /startupsignals/run called from {request.client.host} with {req.dict()}")
-    agent = StartupSignalsAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "startup_signals")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /startupsignals/run completed")
@@ -299,7 +372,7 @@ async def run_startup_signals(req: StartupSignalsRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /startupsignals/run returning MOCK_STARTUP_SIGNALS")
         return {"status": "success", **MOCK_STARTUP_SIGNALS}
-    agent = StartupSignalsAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "startup_signals")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /startupsignals/run completed")
@@ -311,7 +384,7 @@ async def run_startup_signals(req: StartupSignalsRequest, request: Request):
 
 async def run_nlp_event(req: NLPEventRequest, request: Request):
     logger.info(f"[API] /nlpevent/run called from {request.client.host} with {req.dict()}")
-    agent = NLPEventExtractionAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "nlp_event")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /nlpevent/run completed")
@@ -326,7 +399,7 @@ async def run_nlp_event(req: NLPEventRequest, request: Request):
     if request.query_params.get("mock") == "1":
         logger.info("[API] /nlpevent/run returning MOCK_NLP_EVENT")
         return {"status": "success", **MOCK_NLP_EVENT}
-    agent = NLPEventExtractionAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "nlp_event")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /nlpevent/run completed")
@@ -336,13 +409,71 @@ async def run_nlp_event(req: NLPEventRequest, request: Request):
         "nlp_event_insights": state.get('nlp_event_insights', "")
     }
 
+@app.post("/nlpevent/batch", summary="Run NLP Event Extraction over many documents", response_model=dict, tags=["Agents"])
+async def run_nlp_event_batch(req: NLPEventBatchRequest, request: Request):
+    logger.info(f"[API] /nlpevent/batch called from {request.client.host} with {len(req.texts)} documents")
+    agent = await asyncio.to_thread(agent_registry.get, "nlp_event")
+    state = req.dict()
+    await asyncio.to_thread(agent.run, state)
+    logger.info(f"[API] /nlpevent/batch completed")
+    return {
+        "status": "success",
+        "results": state.get('extracted_events_batch', [])
+    }
+
+class EmbeddingLookupRequest(BaseModel):
+    ids: List[str]
+
+@app.post("/embeddings", summary="Look up cached embeddings by embedding_id", response_model=dict, tags=["Agents"])
+async def lookup_embeddings(req: EmbeddingLookupRequest, request: Request):
+    from utils.embedding_cache import get_embedding_cache
+    # The first call opens the on-disk cache; neither that nor the lookup runs on the event loop
+    cache = await asyncio.to_thread(get_embedding_cache)
+    known = [i for i in req.ids if i in cache]
+    vectors = await asyncio.to_thread(cache.vectors, known)
+    return {
+        "status": "success",
+        "embeddings": {i: vector.tolist() for i, vector in zip(known, vectors)},
+        "missing": [i for i in req.ids if i not in cache]
+    }
+
+class SemanticSearchRequest(BaseModel):
+    query: Optional[str] = None
+    embedding_id: Optional[str] = None
+    k: int = 10
+    tickers: Optional[List[str]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    kinds: Optional[List[str]] = None
+
+@app.post("/search/semantic", summary="Find news and social items similar to a text or embedding_id", response_model=dict, tags=["Agents"])
+async def semantic_search(req: SemanticSearchRequest, request: Request):
+    logger.info(f"[API] /search/semantic called from {request.client.host} with {req.dict()}")
+    from utils.semantic_index import get_semantic_index
+    index = await asyncio.to_thread(get_semantic_index)
+    if index is None:
+        return JSONResponse(status_code=503, content={"detail": "Semantic search is disabled; set SEMANTIC_INDEX_DIR"})
+    if not req.query and not req.embedding_id:
+        return JSONResponse(status_code=422, content={"detail": "Provide query or embedding_id"})
+    try:
+        results = await asyncio.to_thread(index.search, query=req.query, embedding_id=req.embedding_id, k=min(req.k, 100),
+                                          tickers=req.tickers, start=req.start, end=req.end, kinds=req.kinds)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"detail": f"Unknown embedding_id {req.embedding_id}"})
+    return {
+        "status": "success",
+        "results": results
+    }
+
 class CombinedSentimentRequest(BaseModel):
     tickers: List[str]
+    news_urls: Optional[List[str]] = None
+    rss_urls: Optional[List[str]] = None
 
 @app.post("/combinedsentiment/run", summary="Run Combined Sentiment Agent (StockTwits + News)", response_model=dict, tags=["Agents"])
 async def run_combined_sentiment(req: CombinedSentimentRequest, request: Request):
     logger.info(f"[API] /combinedsentiment/run called from {request.client.host} with {req.dict()}")
-    agent = CombinedSentimentAgent()
+    agent = await asyncio.to_thread(agent_registry.get, "combined_sentiment")
     state = req.dict()
     await asyncio.to_thread(agent.run, state)
     logger.info(f"[API] /combinedsentiment/run completed")
@@ -353,6 +484,8 @@ async def run_combined_sentiment(req: CombinedSentimentRequest, request: Request
 
 @app.get("/health")
 def health():
+    # A plain def: FastAPI runs it in its worker threadpool, so the network checks and the first
+    # load of the embedding cache / semantic index below never block the event loop
     import os
     health_report = {"status": "ok", "checks": {}}
     # yfinance check
@@ -376,5 +509,19 @@ def health():
     # OpenAI key check
     openai_key = os.getenv('OPENAI_API_KEY')
     health_report["checks"]["openai_key"] = bool(openai_key)
+    health_report["agents"] = agent_registry.warmup_report
+    from agents.openai_utils import llm_cache
+    health_report["llm_cache"] = llm_cache.stats()
+    from utils.http_cache import get_http_cache
+    health_report["http_cache"] = get_http_cache().stats()
+    from utils.sentiment import get_sentiment_service
+    health_report["sentiment_cache"] = get_sentiment_service().stats()
+    from utils.embedding_cache import get_embedding_cache
+    health_report["embedding_cache"] = get_embedding_cache().stats()
+    from utils.semantic_index import get_semantic_index
+    semantic_index = get_semantic_index()
+    health_report["semantic_index"] = semantic_index.stats() if semantic_index else None
+    from utils.macro_store import get_macro_store
+    health_report["macro_store"] = get_macro_store().stats()
     logger.info(f"[API] /health checked: {health_report}")
     return health_report
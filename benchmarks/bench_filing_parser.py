@@ -0,0 +1,111 @@
+"""
+Benchmark: streaming section parser vs. loading the whole filing into a tree, on large
+synthetic 10-K documents (inline-XBRL styled HTML) written to .cache/bench_filings on first run.
+Each measurement runs in a fresh process so peak RSS reflects that parse alone.
+Run from the repo root: python -m benchmarks.bench_filing_parser
+"""
+import multiprocessing
+import os
+import resource
+import time
+
+FIXTURE_DIR = os.path.join(".cache", "bench_filings")
+SIZES_MB = (10, 25, 50)
+
+PARAGRAPH = ('<div style="margin-top:6pt;text-align:justify"><span style="font-family:Times New Roman;font-size:10pt">'
+             'Our operations and performance depend significantly on global and regional economic conditions and '
+             'adverse economic conditions can materially adversely affect our business ({i}).</span></div>\n')
+ROW = ('<tr><td style="padding:2px"><span>Net sales line {i}</span></td><td style="text-align:right">'
+       '<ix:nonFraction name="us-gaap:Revenues" contextRef="c-{i}" unitRef="usd" decimals="-6">{i},285</ix:nonFraction>'
+       '</td></tr>\n')
+
+
+def write_fixture(path, size_mb):
+    """
+    A 10-K with a table of contents, hidden XBRL header, and Items 1, 1A, 7, 8 and 9 whose bodies
+    are scaled so the file reaches roughly `size_mb`.
+    """
+    target = size_mb * 1024 * 1024
+    # Share of the document per item: business, risk factors, MD&A, financial statements, the rest
+    shares = (("1", "Business", 0.15, PARAGRAPH), ("1A", "Risk Factors", 0.2, PARAGRAPH),
+              ("7", "Management's Discussion and Analysis", 0.25, PARAGRAPH),
+              ("8", "Financial Statements and Supplementary Data", 0.3, ROW), ("9", "Controls and Procedures", 0.1, PARAGRAPH))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<html><head><title>10-K</title></head><body>\n<div style="display:none"><ix:header>')
+        f.write("".join(f'<xbrli:context id="c-{i}"><xbrli:period>2024</xbrli:period></xbrli:context>' for i in range(2000)))
+        f.write("</ix:header></div>\n<p>PART I</p><table>")
+        f.write("".join(f"<tr><td>Item {item}.</td><td>{title}</td><td>{n}</td></tr>" for n, (item, title, _, _) in enumerate(shares)))
+        f.write("</table>\n")
+        for item, title, share, template in shares:
+            f.write(f'<div style="page-break-before:always"><span><b>Item {item}. {title}</b></span></div>\n')
+            if template is ROW:
+                f.write("<table>")
+            written, i = 0, 0
+            while written < target * share:
+                block = template.format(i=i)
+                f.write(block)
+                written += len(block)
+                i += 1
+                if i % 50 == 0 and template is PARAGRAPH:
+                    f.write(f'<p style="text-align:center">{i // 50}</p><hr/>\n')
+            if template is ROW:
+                f.write("</table>")
+        f.write("</body></html>\n")
+
+
+def fixtures():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    paths = []
+    for size in SIZES_MB:
+        path = os.path.join(FIXTURE_DIR, f"10k_{size}mb.htm")
+        if not os.path.exists(path):
+            print(f"Writing {path}")
+            write_fixture(path, size)
+        paths.append(path)
+    return paths
+
+
+def streaming(path):
+    from utils.filing_sections import iter_file, parse_sections
+    sections = parse_sections(iter_file(path), form="10-K")
+    return sum(len(text) for text in sections.values())
+
+
+def full_tree(path):
+    # Roughly what BeautifulSoup-style processing costs at best: the whole document in memory
+    import lxml.html
+    return len(lxml.html.parse(path).getroot().text_content())
+
+
+def measure(fn, path, queue):
+    import lxml.html  # noqa: F401 -- imports are not part of the measurement
+    import utils.filing_sections  # noqa: F401
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    chars = fn(path)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    queue.put((elapsed, peak / 1024, chars))
+
+
+def run_isolated(fn, path):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(fn, path, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    for path in fixtures():
+        size = os.path.getsize(path) / (1024 * 1024)
+        print(f"{os.path.basename(path)} ({size:.1f} MB)")
+        for label, fn in (("streaming sections", streaming), ("full tree", full_tree)):
+            elapsed, peak, chars = run_isolated(fn, path)
+            print(f"  {label:<20} {elapsed * 1000:8.0f} ms  {size / elapsed:6.1f} MB/s  peak +{peak:7.1f} MB  ({chars} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -148,18 +148,19 @@ macro_data = None
 if st.sidebar.button("Run Macro Agent", key="btn_macro_agent"):
     resp = requests.post(
         "http://localhost:8000/macro/run",
-        json={"macro_indicators": [m.strip() for m in macro_indicators.split(",") if m.strip()]}
+        json={"macro_indicators": [m.strip() for m in macro_indicators.split(",") if m.strip()],
+              "format": "columnar", "max_points": 500}
     )
     macro_data = resp.json()
     st.json(macro_data)
     # Visualization: macro indicators line chart
     if 'result' in macro_data and macro_data['result']:
         try:
-            for indicator, records in macro_data['result'].items():
-                df = pd.DataFrame(records)
-                if not df.empty and 'DATE' in df and indicator in df:
+            for indicator, series in macro_data['result'].items():
+                df = pd.DataFrame({"date": series.get("dates", []), indicator: series.get("values", [])})
+                if not df.empty:
                     st.write(f"### {indicator} Over Time")
-                    fig = px.line(df, x='DATE', y=indicator, title=f"{indicator} Over Time")
+                    fig = px.line(df, x='date', y=indicator, title=f"{indicator} Over Time")
                     st.plotly_chart(fig)
         except Exception as e:
             st.warning(f"Could not plot macro data: {e}")
@@ -0,0 +1,135 @@
+"""
+DAG executor for agent orchestration.
+Each agent declares the state keys it reads and writes; edges are derived from those
+declarations, independent agents run concurrently and every run reports its critical path.
+"""
+import asyncio
+import logging
+import time
+import networkx as nx
+
+logger = logging.getLogger("orchestration")
+
+
+class AgentNode:
+    """
+    A node in the agent graph: an agent plus the state keys it reads and writes.
+    """
+    def __init__(self, name, agent, reads=(), writes=()):
+        self.name = name
+        self.agent = agent
+        self.reads = tuple(reads)
+        self.writes = tuple(writes)
+
+    def run(self, state):
+        return self.agent.run(state)
+
+
+class AgentDAG:
+    """
+    Builds a networkx DiGraph from node read/write declarations and executes it.
+    A node starts as soon as every node that writes one of its inputs has finished.
+    Every key a node reads must be written by another node or be one of `inputs`, the keys the
+    caller may supply in the initial state; anything else is a wiring mistake and is rejected.
+    """
+    def __init__(self, nodes, inputs=()):
+        self.nodes = {node.name: node for node in nodes}
+        self.inputs = frozenset(inputs)
+        self.graph = nx.DiGraph()
+        writers = {}
+        for node in nodes:
+            self.graph.add_node(node.name, agent=node.agent)
+            for key in node.writes:
+                writers.setdefault(key, []).append(node.name)
+        unknown = {f"{node.name}.{key}" for node in nodes for key in node.reads if key not in writers and key not in self.inputs}
+        if unknown:
+            raise ValueError(f"Agent graph reads keys no node writes and the caller does not supply: {sorted(unknown)}")
+        for node in nodes:
+            for key in node.reads:
+                for writer in writers.get(key, []):
+                    if writer != node.name:
+                        self.graph.add_edge(writer, node.name, key=key)
+        if not nx.is_directed_acyclic_graph(self.graph):
+            cycle = nx.find_cycle(self.graph)
+            raise ValueError(f"Agent graph has a cycle: {cycle}")
+
+    async def run(self, state):
+        """
+        Run every node once, concurrently where the graph allows.
+        Agents mutate `state` in place (each writes its own keys). Returns the run report.
+        """
+        unexpected = set(state) - self.inputs
+        if unexpected:
+            logger.warning(f"Initial state keys not declared as DAG inputs: {sorted(unexpected)}")
+        t0 = time.perf_counter()
+        timings = {}
+        tasks = {}
+
+        async def run_node(name):
+            preds = [tasks[p] for p in self.graph.predecessors(name)]
+            if preds:
+                await asyncio.gather(*preds)
+            start = time.perf_counter() - t0
+            await asyncio.to_thread(self.nodes[name].run, state)
+            end = time.perf_counter() - t0
+            timings[name] = {"start": start, "end": end, "duration": end - start}
+
+        for name in nx.topological_sort(self.graph):
+            tasks[name] = asyncio.ensure_future(run_node(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        report = {
+            "total_seconds": time.perf_counter() - t0,
+            "timings": timings,
+        }
+        report.update(self.critical_path(timings))
+        return report
+
+    def critical_path(self, timings):
+        """
+        Walk back from the last node to finish, following at each step the predecessor
+        that finished last (the one the node actually waited on).
+        """
+        if not timings:
+            return {"critical_path": [], "critical_path_seconds": 0.0}
+        name = max(timings, key=lambda n: timings[n]["end"])
+        path = [name]
+        while True:
+            preds = [p for p in self.graph.predecessors(name) if p in timings]
+            if not preds:
+                break
+            name = max(preds, key=lambda n: timings[n]["end"])
+            path.append(name)
+        path.reverse()
+        return {
+            "critical_path": path,
+            "critical_path_seconds": sum(timings[n]["duration"] for n in path),
+        }
+
+
+INSIGHTS_INPUTS = (
+    "tickers", "period", "interval", "alpha_vantage_api_key", "openai_api_key", "context_token_budget",
+    "news_urls", "rss_urls", "crawl_depth", "crawl_max_links", "cik", "full_text", "subreddits",
+    "macro_indicators", "pressroom_url", "job_board_url", "github_org", "repo", "company", "text",
+)
+
+
+def build_insights_dag(agents):
+    """
+    Graph used by /insights/run. `agents` maps node name to an agent instance.
+    """
+    return AgentDAG([
+        AgentNode("market_data", agents["market_data"], reads=["tickers", "period", "interval", "alpha_vantage_api_key"], writes=["market_data", "market_data_insights"]),
+        AgentNode("news", agents["news"], reads=["news_urls", "rss_urls", "crawl_depth", "crawl_max_links"], writes=["news_data", "news_duplicates"]),
+        AgentNode("sec_filings", agents["sec_filings"], reads=["cik", "full_text"], writes=["sec_filings", "sec_filing_chunks"]),
+        AgentNode("social_sentiment", agents["social_sentiment"], reads=["tickers", "subreddits"], writes=["social_mentions", "social_sentiment_insights"]),
+        AgentNode("macro", agents["macro"], reads=["macro_indicators"], writes=["macro_data", "macro_insights"]),
+        AgentNode("company_event", agents["company_event"], reads=["pressroom_url", "job_board_url", "github_org"], writes=["company_events", "company_events_insights"]),
+        AgentNode("startup_signals", agents["startup_signals"], reads=["repo", "company"], writes=["startup_signals", "startup_signals_insights"]),
+        AgentNode("nlp_event", agents["nlp_event"], reads=["text", "sec_filing_chunks"], writes=["extracted_events", "nlp_event_insights", "filing_events"]),
+        AgentNode("insights", agents["insights"], reads=["market_data", "news_data", "sec_filings", "social_mentions", "macro_data", "company_events", "startup_signals", "extracted_events"], writes=["insights"]),
+    ], inputs=INSIGHTS_INPUTS)
@@ -11,6 +11,11 @@ def test_health():
     assert "status" in data
     assert "checks" in data
 
+def test_embeddings_reports_unknown_ids():
+    resp = client.post("/embeddings", json={"ids": ["unknown"]})
+    assert resp.status_code == 200
+    assert resp.json()["missing"] == ["unknown"]
+
 def test_marketdata_run():
     payload = {"tickers": ["AAPL"], "period": "1y", "interval": "1d"}
     resp = client.post("/marketdata/run?mock=1", json=payload)
@@ -35,6 +40,10 @@ def test_secfilings_run():
     assert data["status"] == "success"
     assert "sec_filings_insights" in data
 
+def test_secfilings_run_rejects_invalid_cik():
+    resp = client.post("/secfilings/run", json={"cik": "AAPL"})
+    assert resp.status_code == 422
+
 def test_socialsentiment_run():
     payload = {"subreddits": ["stocks"]}
     resp = client.post("/socialsentiment/run?mock=1", json=payload)
@@ -0,0 +1,72 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from agents.crawler_service import CrawlerService
+
+
+class SectionHandler(BaseHTTPRequestHandler):
+    """
+    Every page links to five children (/<page>-0 ... /<page>-4) and one off-site URL.
+    """
+    def do_GET(self):
+        page = self.path.strip("/") or "root"
+        links = "".join(f'<a href="/{page}-{i}">story</a>' for i in range(5))
+        body = f'<html><body>{links}<a href="http://elsewhere.example/x">ad</a></body></html>'.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SectionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = CrawlerService(timeout=20)
+    service.start()
+    yield service
+    service.stop()
+
+
+def test_streams_same_domain_links(service, site):
+    links = list(service.crawl([f"{site}/"], max_depth=1))
+    assert links == [f"{site}/root-{i}" for i in range(5)]
+
+
+def test_depth_and_link_limits(service, site):
+    links = list(service.crawl([f"{site}/"], max_depth=2, max_links=12))
+    assert len(links) == 12
+    assert len(set(links)) == 12
+    assert all(link.startswith(site) for link in links)
+
+
+def test_process_is_reused_across_jobs(service, site):
+    pid = service._process.pid
+    start = time.perf_counter()
+    list(service.crawl([f"{site}/a"], max_depth=1))
+    assert time.perf_counter() - start < 1.0
+    assert service._process.pid == pid
+
+
+def test_unreachable_seed_finishes_without_links(service):
+    assert list(service.crawl(["http://127.0.0.1:9/"], max_depth=1)) == []
+
+
+def test_slow_consumer_time_does_not_count_against_the_timeout(service, site):
+    links = []
+    for link in service.crawl([f"{site}/b"], max_depth=1, timeout=0.5):
+        links.append(link)
+        time.sleep(0.2)
+    assert links == [f"{site}/b-{i}" for i in range(5)]
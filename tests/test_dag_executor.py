@@ -0,0 +1,67 @@
+import asyncio
+import time
+import pytest
+from orchestration.dag_executor import AgentDAG, AgentNode, build_insights_dag
+
+
+class SleepAgent:
+    def __init__(self, key, delay, needs=()):
+        self.key = key
+        self.delay = delay
+        self.needs = needs
+
+    def run(self, state):
+        for k in self.needs:
+            assert k in state, f"{self.key} ran before {k} was written"
+        time.sleep(self.delay)
+        state[self.key] = True
+        return state
+
+
+def test_independent_agents_run_concurrently():
+    dag = AgentDAG([
+        AgentNode("a", SleepAgent("a", 0.3), writes=["a"]),
+        AgentNode("b", SleepAgent("b", 0.3), writes=["b"]),
+        AgentNode("c", SleepAgent("c", 0.3), writes=["c"]),
+        AgentNode("final", SleepAgent("final", 0.05, needs=["a", "b", "c"]), reads=["a", "b", "c"], writes=["final"]),
+    ])
+    state = {}
+    report = asyncio.run(dag.run(state))
+    assert state["final"]
+    assert report["total_seconds"] < 0.8
+    assert report["critical_path"][-1] == "final"
+    assert report["critical_path"][0] in {"a", "b", "c"}
+
+
+def test_critical_path_follows_slowest_chain():
+    dag = AgentDAG([
+        AgentNode("fast", SleepAgent("fast", 0.05), writes=["fast"]),
+        AgentNode("slow", SleepAgent("slow", 0.3), writes=["slow"]),
+        AgentNode("mid", SleepAgent("mid", 0.05, needs=["fast"]), reads=["fast"], writes=["mid"]),
+        AgentNode("final", SleepAgent("final", 0.05, needs=["mid", "slow"]), reads=["mid", "slow"], writes=["final"]),
+    ])
+    report = asyncio.run(dag.run({}))
+    assert report["critical_path"] == ["slow", "final"]
+    assert set(report["timings"]) == {"fast", "slow", "mid", "final"}
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError):
+        AgentDAG([
+            AgentNode("a", SleepAgent("a", 0), reads=["b"], writes=["a"]),
+            AgentNode("b", SleepAgent("b", 0), reads=["a"], writes=["b"]),
+        ])
+
+
+def test_reads_must_be_written_or_declared_inputs():
+    with pytest.raises(ValueError, match="final.news"):
+        AgentDAG([
+            AgentNode("news", SleepAgent("news_data", 0), writes=["news_data"]),
+            AgentNode("final", SleepAgent("final", 0), reads=["news", "tickers"], writes=["final"]),
+        ], inputs=["tickers"])
+
+
+def test_insights_waits_for_every_signal():
+    names = ["market_data", "news", "sec_filings", "social_sentiment", "macro", "company_event", "startup_signals", "nlp_event", "insights"]
+    dag = build_insights_dag({name: SleepAgent(name, 0) for name in names})
+    assert set(dag.graph.predecessors("insights")) == set(names) - {"insights"}
@@ -0,0 +1,52 @@
+import os
+import pandas as pd
+import pytest
+import sqlalchemy
+from utils.db import copy_upsert, ensure_schema, get_engine, indicator_rows, ohlc_rows
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+def _frame(closes):
+    idx = pd.date_range("2024-01-01", periods=len(closes), freq="D", name="Date")
+    return pd.DataFrame({
+        "Close_TEST": closes, "High_TEST": closes, "Low_TEST": closes, "Open_TEST": closes,
+        "Volume_TEST": [100.0] * len(closes), "SMA_20_TEST": closes, "RSI_14_TEST": [50.0] * len(closes),
+    }, index=idx)
+
+
+def test_engine_is_shared():
+    assert get_engine(TEST_DATABASE_URL) is get_engine(TEST_DATABASE_URL)
+
+
+def test_copy_upsert_is_idempotent_and_updates():
+    engine = get_engine(TEST_DATABASE_URL)
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("DELETE FROM ohlc WHERE ticker = 'TEST'"))
+        conn.execute(sqlalchemy.text("DELETE FROM indicators WHERE ticker = 'TEST'"))
+    df = _frame([1.0, 2.0, 3.0])
+    assert copy_upsert(engine, "ohlc", ohlc_rows("TEST", df), batch_size=2) == 3
+    copy_upsert(engine, "indicators", indicator_rows("TEST", df))
+    # Re-ingesting the same window with a revised last bar updates in place
+    copy_upsert(engine, "ohlc", ohlc_rows("TEST", _frame([1.0, 2.0, 4.0])))
+    with engine.connect() as conn:
+        closes = [r[0] for r in conn.execute(sqlalchemy.text(
+            "SELECT close FROM ohlc WHERE ticker = 'TEST' ORDER BY timestamp"))]
+        n_ind = conn.execute(sqlalchemy.text("SELECT count(*) FROM indicators WHERE ticker = 'TEST'")).scalar()
+    assert closes == [1.0, 2.0, 4.0]
+    assert n_ind == 3
+
+
+def test_copy_upsert_keeps_the_last_row_of_a_repeated_key():
+    engine = get_engine(TEST_DATABASE_URL)
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("DELETE FROM ohlc WHERE ticker = 'TEST'"))
+    rows = list(ohlc_rows("TEST", _frame([1.0, 2.0]))) + list(ohlc_rows("TEST", _frame([5.0, 6.0])))
+    assert copy_upsert(engine, "ohlc", rows) == 2
+    with engine.connect() as conn:
+        closes = [r[0] for r in conn.execute(sqlalchemy.text(
+            "SELECT close FROM ohlc WHERE ticker = 'TEST' ORDER BY timestamp"))]
+    assert closes == [5.0, 6.0]
@@ -0,0 +1,36 @@
+import numpy as np
+from utils.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(text), text.count("o"), 0.5, -1.0] for text in texts], dtype=np.float32)
+
+
+def test_only_new_texts_are_encoded_once_per_batch():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(encode=encoder)
+    ids = cache.embed_many(["AAPL to the moon", "TSLA puts", "AAPL to the moon"])
+    assert ids[0] == ids[2] != ids[1]
+    cache.embed_many(["TSLA puts", "NVDA earnings"])
+    assert encoder.batches == [["AAPL to the moon", "TSLA puts"], ["NVDA earnings"]]
+    vectors = cache.vectors([ids[1], ids[0]])
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[9, 0, 0.5, -1], [16, 3, 0.5, -1]]
+    assert cache.stats() == {"entries": 3, "hits": 2, "encoded": 3}
+
+
+def test_memmap_survives_restarts_and_grows(tmp_path):
+    encoder = CountingEncoder()
+    texts = [f"post {i}" for i in range(1500)]
+    ids = EmbeddingCache(root=str(tmp_path), encode=encoder).embed_many(texts[:1000])
+    EmbeddingCache(root=str(tmp_path), encode=encoder).embed_many(texts)
+    reopened = EmbeddingCache(root=str(tmp_path), encode=encoder)
+    assert reopened.embed_many(texts[:3]) == ids[:3]
+    assert [len(batch) for batch in encoder.batches] == [1000, 500]
+    assert reopened.vectors(ids[:2]).tolist() == [[6, 1, 0.5, -1], [6, 1, 0.5, -1]]
+    assert reopened.stats()["entries"] == 1500
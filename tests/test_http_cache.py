@@ -0,0 +1,114 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from utils.http_cache import ConditionalCache
+from utils.http_client import HTTPClient
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """
+    /etag answers If-None-Match with 304, /modified answers If-Modified-Since with 304,
+    /plain never sends validators, /broken fails once `broken` is set.
+    """
+    protocol_version = "HTTP/1.1"
+    version = "v1"
+    broken = False
+    full = 0
+    not_modified = 0
+
+    def do_GET(self):
+        cls = FeedHandler
+        stamp = "Wed, 01 May 2024 00:00:00 GMT"
+        if self.path == "/broken" and cls.broken:
+            return self._send(500, b"")
+        if self.path == "/etag" and self.headers.get("If-None-Match") == f'"{cls.version}"':
+            return self._send(304, b"")
+        if self.path == "/modified" and self.headers.get("If-Modified-Since") == stamp:
+            return self._send(304, b"")
+        headers = {}
+        if self.path == "/etag":
+            headers["ETag"] = f'"{cls.version}"'
+        if self.path == "/modified":
+            headers["Last-Modified"] = stamp
+        self._send(200, f"{self.path}:{cls.version}".encode(), headers)
+
+    def _send(self, status, body, headers=None):
+        if status == 304:
+            FeedHandler.not_modified += 1
+        elif status == 200:
+            FeedHandler.full += 1
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FeedHandler.version, FeedHandler.broken, FeedHandler.full, FeedHandler.not_modified = "v1", False, 0, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def client():
+    client = HTTPClient()
+    yield client
+    client.close()
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, response):
+        self.calls += 1
+        return response.text.upper()
+
+
+def test_304_serves_the_stored_parse(server, client):
+    cache = ConditionalCache(http=client)
+    parse = CountingParser()
+    urls = [f"{server}/etag", f"{server}/modified"]
+    assert cache.get_many(urls, parse) == ["/ETAG:V1", "/MODIFIED:V1"]
+    assert cache.get_many(urls, parse) == ["/ETAG:V1", "/MODIFIED:V1"]
+    assert parse.calls == 2
+    assert FeedHandler.not_modified == 2
+    FeedHandler.version = "v2"
+    assert cache.get(f"{server}/etag", parse) == "/ETAG:V2"
+    assert parse.calls == 3
+
+
+def test_refresh_interval_skips_the_request(server, client):
+    cache = ConditionalCache(http=client)
+    parse = CountingParser()
+    cache.get(f"{server}/plain", parse, refresh_interval=60)
+    cache.get(f"{server}/plain", parse, refresh_interval=60)
+    assert FeedHandler.full == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_survive_restarts_on_disk(server, client, tmp_path):
+    ConditionalCache(http=client, root=str(tmp_path)).get(f"{server}/etag", CountingParser())
+    parse = CountingParser()
+    assert ConditionalCache(http=client, root=str(tmp_path)).get(f"{server}/etag", parse) == "/ETAG:V1"
+    assert parse.calls == 0
+
+
+def test_errors_fall_back_to_stale_value(server, client):
+    cache = ConditionalCache(http=client)
+    cache.get(f"{server}/broken", CountingParser())
+    FeedHandler.broken = True
+    assert cache.get(f"{server}/broken", CountingParser()) == "/BROKEN:V1"
+    fresh = ConditionalCache(http=client)
+    assert isinstance(fresh.get_many([f"{server}/broken"], CountingParser())[0], httpx.HTTPStatusError)
@@ -0,0 +1,92 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import httpx
+import pytest
+from utils.http_client import HTTPClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        StubHandler.connections.add(self.client_address)
+        query = parse_qs(urlparse(self.path).query)
+        time.sleep(float(query.get("delay", ["0"])[0]))
+        body = urlparse(self.path).path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fan_out_costs_one_round_trip(stub_url):
+    client = HTTPClient(per_host_limit=8)
+    try:
+        start = time.perf_counter()
+        responses = client.get_many([f"{stub_url}/s{i}?delay=0.3" for i in range(4)])
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+    assert [r.text for r in responses] == ["/s0", "/s1", "/s2", "/s3"]
+    assert elapsed < 0.9
+
+
+def test_per_host_limit_serializes(stub_url):
+    client = HTTPClient(per_host_limit=1)
+    try:
+        start = time.perf_counter()
+        client.get_many([f"{stub_url}/s{i}?delay=0.2" for i in range(3)])
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+    assert elapsed >= 0.55
+
+
+def test_keep_alive_reuses_connection(stub_url):
+    client = HTTPClient(per_host_limit=1)
+    StubHandler.connections.clear()
+    try:
+        for i in range(3):
+            client.get(f"{stub_url}/k{i}")
+    finally:
+        client.close()
+    assert len(StubHandler.connections) == 1
+
+
+def test_timeout_is_returned_in_place(stub_url):
+    client = HTTPClient(timeout=0.2)
+    try:
+        ok, slow = client.get_many([f"{stub_url}/ok", f"{stub_url}/slow?delay=1"])
+    finally:
+        client.close()
+    assert ok.status_code == 200
+    assert isinstance(slow, httpx.TimeoutException)
+
+
+def test_stream_holds_the_host_slot_until_closed(stub_url):
+    client = HTTPClient(per_host_limit=1)
+    try:
+        with client.stream("GET", f"{stub_url}/streamed") as resp:
+            resp.raise_for_status()
+            waiting = client.submit("GET", f"{stub_url}/next")
+            assert b"".join(resp.iter_bytes(4)) == b"/streamed"
+            time.sleep(0.1)
+            assert not waiting.done()
+        assert waiting.result(timeout=5).text == "/next"
+    finally:
+        client.close()
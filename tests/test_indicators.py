@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from agents.market_data_agent import MarketDataAgent
+from utils import indicators
+
+
+def _prices(rows=300, cols=4, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, cols)), axis=0))
+    close[:25, 1] = np.nan  # ticker listed later than the rest
+    return close
+
+
+def _wilder_reference(values, period):
+    out, avg, seen = [], None, []
+    for v in values:
+        if avg is None:
+            if not np.isnan(v):
+                seen.append(v)
+            if len(seen) == period:
+                avg = sum(seen) / period
+            out.append(np.nan if avg is None else avg)
+        else:
+            if not np.isnan(v):
+                avg = (avg * (period - 1) + v) / period
+            out.append(avg)
+    return np.array(out)
+
+
+def test_sma_and_ema_match_pandas():
+    close = _prices()
+    df = pd.DataFrame(close)
+    np.testing.assert_allclose(indicators.sma(close, 20), df.rolling(20).mean().to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(indicators.ema(close, span=12), df.ewm(span=12, adjust=False).mean().to_numpy(), equal_nan=True)
+
+
+def test_simple_rsi_matches_agent_compute_rsi():
+    close = _prices()
+    agent = MarketDataAgent.__new__(MarketDataAgent)
+    expected = np.column_stack([agent.compute_rsi(pd.Series(close[:, i]), 14).to_numpy() for i in range(close.shape[1])])
+    np.testing.assert_allclose(indicators.rsi(close, 14, method="simple"), expected, equal_nan=True)
+
+
+def test_wilder_rsi_matches_reference_loop():
+    close = _prices()
+    delta = np.diff(close[:, 1], prepend=np.nan)
+    gains = np.where(np.isnan(delta), np.nan, np.clip(np.nan_to_num(delta), 0, None))
+    losses = np.where(np.isnan(delta), np.nan, np.clip(-np.nan_to_num(delta), 0, None))
+    ag, al = _wilder_reference(gains, 14), _wilder_reference(losses, 14)
+    expected = 100 - 100 / (1 + ag / al)
+    np.testing.assert_allclose(indicators.rsi(close, 14)[:, 1], expected, equal_nan=True)
+
+
+def test_compute_indicators_shapes():
+    close = _prices()
+    out = indicators.compute_indicators(close, high=close * 1.01, low=close * 0.99)
+    assert {"SMA_200", "EMA_26", "RSI_14", "MACD_hist", "BB_upper_20", "ATR_14", "VOL_20"} <= set(out)
+    assert all(v.shape == close.shape for v in out.values())
+
+
+def test_signal_labels():
+    labels = indicators.signal_labels([np.nan, 10, 50, 90])
+    assert labels.tolist() == ["N/A", "Buy", "Hold", "Sell"]
@@ -0,0 +1,43 @@
+from agents.insights_context import ContextBuilder, count_tokens, summarize_macro
+
+
+def macro_history(n=20000):
+    return {"GDP": [{"observation_date": f"day{i}", "GDP": float(i + 1)} for i in range(n)]}
+
+
+def test_macro_history_is_reduced_to_latest_values():
+    summary = summarize_macro(macro_history())
+    assert summary == {"GDP": {"date": "day19999", "latest": 20000.0, "change_pct": 0.005}}
+
+
+def test_columnar_series_are_summarized_too():
+    summary = summarize_macro({"UNRATE": {"dates": ["2024-03-01", "2024-04-01", "2024-05-01"], "values": [3.8, 4.0, None]}})
+    assert summary == {"UNRATE": {"date": "2024-04-01", "latest": 4.0, "change_pct": 5.263}}
+
+
+def test_global_context_respects_its_share_of_the_budget():
+    builder = ContextBuilder(budget_tokens=400, now="2024-06-01")
+    events = {"pressroom": ["x" * 1000] * 50, "jobs": [], "github_activity": ["PushEvent"] * 50}
+    text = builder.build_global(macro_history(), events, {}, {"entities": [["Apple", "ORG"]] * 100})
+    assert count_tokens(text) <= 120
+
+
+def test_prompt_fits_budget_and_ranks_recent_tagged_items_first():
+    builder = ContextBuilder(budget_tokens=300, now="2024-06-01")
+    signals = [("news", {"title": f"old story {i}", "publish_date": "2023-01-01"}) for i in range(50)]
+    signals.append(("news", {"title": "fresh AAPL story", "ticker": "AAPL", "publish_date": "2024-05-31"}))
+    signals.append(("filing", {"title": "10-Q", "date": "2024-05-30", "summary": "Quarterly report."}))
+    text = builder.build("AAPL", {"close": 190.123456, "SMA_20": 185.0}, signals, "{}")
+    assert count_tokens(text) <= 300
+    lines = text.splitlines()
+    first_signal = lines.index("SIGNALS:") + 1
+    assert lines[first_signal].endswith("fresh AAPL story")
+    assert "10-Q" in lines[first_signal + 1]
+    assert '"close":190.1235' in text
+
+
+def test_prompts_are_deterministic():
+    signals = [("social", {"body": f"post {i}", "sentiment": (i % 5) / 10}) for i in range(40)]
+    a = ContextBuilder(budget_tokens=200, now="2024-06-01").build("MSFT", {}, signals, "g")
+    b = ContextBuilder(budget_tokens=200, now="2024-06-01").build("MSFT", {}, list(signals), "g")
+    assert a == b
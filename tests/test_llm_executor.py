@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from agents import openai_utils
+from agents.llm_executor import LLMExecutor
+from agents.openai_utils import LLMCache
+from utils.rate_limit import TokenBucket
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    """
+    Echoes the last user message back as the completion. The first `throttle` requests get a
+    429 with Retry-After: 0; every request sleeps `delay` seconds while in flight.
+    """
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    requests = 0
+    throttle = 0
+    delay = 0.0
+
+    def do_POST(self):
+        cls = FakeCompletionHandler
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            cls.requests += 1
+            throttled = cls.requests <= cls.throttle
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.in_flight -= 1
+        if throttled:
+            body = b'{"error": "rate limited"}'
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+        else:
+            content = payload["messages"][-1]["content"].upper()
+            body = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    cls = FakeCompletionHandler
+    cls.in_flight = cls.max_in_flight = cls.requests = cls.throttle = 0
+    cls.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), cls)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(openai_utils, "OPENAI_API_URL", f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+    monkeypatch.setattr(openai_utils, "llm_cache", LLMCache())
+    yield cls
+    server.shutdown()
+
+
+def prompts(n):
+    return [[{"role": "user", "content": f"ticker {i}"}] for i in range(n)]
+
+
+def test_results_in_input_order_under_concurrency_limit(fake_openai):
+    fake_openai.delay = 0.2
+    executor = LLMExecutor(max_concurrency=4)
+    start = time.perf_counter()
+    results = executor.chat_many(prompts(8), api_key="k")
+    elapsed = time.perf_counter() - start
+    assert results == [f"TICKER {i}" for i in range(8)]
+    assert fake_openai.max_in_flight <= 4
+    # Two waves of four, not eight sequential completions
+    assert elapsed < 1.2
+
+
+def test_429_is_retried(fake_openai):
+    fake_openai.throttle = 3
+    executor = LLMExecutor(max_concurrency=2, max_retries=5, backoff_base=0.01)
+    assert executor.chat_many(prompts(3), api_key="k") == ["TICKER 0", "TICKER 1", "TICKER 2"]
+    assert fake_openai.requests == 6
+
+
+def test_exhausted_retries_come_back_in_place(fake_openai):
+    fake_openai.throttle = 100
+    executor = LLMExecutor(max_concurrency=2, max_retries=1, backoff_base=0.01)
+    results = executor.chat_many(prompts(2), api_key="k")
+    assert all(getattr(r, "response").status_code == 429 for r in results)
+
+
+def test_cached_prompts_skip_the_server(fake_openai):
+    executor = LLMExecutor(max_concurrency=2)
+    executor.chat_many(prompts(2), api_key="k")
+    assert executor.chat_many(prompts(3), api_key="k") == ["TICKER 0", "TICKER 1", "TICKER 2"]
+    assert fake_openai.requests == 3
+    stats = openai_utils.llm_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 3)
+
+
+def test_request_budget_paces_calls(fake_openai):
+    # 10 requests/s with no burst: four calls need at least 0.3s
+    executor = LLMExecutor(max_concurrency=4)
+    executor.request_bucket = TokenBucket(rate=10, capacity=1)
+    start = time.perf_counter()
+    executor.chat_many(prompts(4), api_key="k")
+    assert time.perf_counter() - start >= 0.25
+
+
+def test_token_bucket_admits_oversized_requests():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.acquire(50)
+    assert not bucket.try_acquire(1)
@@ -0,0 +1,84 @@
+import pytest
+from agents import openai_utils
+from agents.openai_utils import LLMCache
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        return FakeResponse(f"answer {self.calls}")
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(openai_utils, "get_http_client", lambda: client)
+    monkeypatch.setattr(openai_utils, "llm_cache", LLMCache(max_entries=2))
+    return client
+
+
+def test_identical_prompts_hit_the_cache(fake_client):
+    msgs = [{"role": "user", "content": "hi"}]
+    assert openai_utils.openai_chat(msgs, api_key="k", cache_site="macro") == "answer 1"
+    assert openai_utils.openai_chat(msgs, api_key="other", cache_site="macro") == "answer 1"
+    assert openai_utils.openai_chat(msgs, api_key="k", max_tokens=10) == "answer 2"
+    assert openai_utils.openai_chat(msgs, api_key="k", use_cache=False) == "answer 3"
+    stats = openai_utils.llm_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_lru_eviction_and_ttl():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    cache.set("d", "4", ttl=-1)
+    assert cache.get("d") is None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_disk_tier_survives_a_new_process_cache(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    LLMCache(disk_path=path).set("k", "v", ttl=60)
+    fresh = LLMCache(disk_path=path)
+    assert fresh.get("k") == "v"
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_is_size_bounded(tmp_path):
+    cache = LLMCache(max_entries=1, disk_path=str(tmp_path / "llm.sqlite"), disk_max_entries=3)
+    for i in range(6):
+        cache.set(str(i), str(i))
+    with cache._connect() as conn:
+        assert conn.execute("SELECT count(*) FROM llm_cache").fetchone()[0] == 3
+
+
+def test_disk_tier_reuses_one_connection_and_trims_periodically(tmp_path):
+    cache = LLMCache(max_entries=1, disk_path=str(tmp_path / "llm.sqlite"), disk_max_entries=4, evict_every=5)
+    conn = cache._connect()
+    for i in range(9):
+        cache.set(str(i), str(i))
+    assert cache._connect() is conn
+    # Trimmed at the fifth insert, then allowed to run over until the next check
+    assert conn.execute("SELECT count(*) FROM llm_cache").fetchone()[0] == 8
+    cache.set("9", "9")
+    assert conn.execute("SELECT count(*) FROM llm_cache").fetchone()[0] == 4
+    assert cache.get("9") == "9" and cache.get("0") is None
+    cache.close()
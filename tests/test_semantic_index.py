@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from utils.embedding_cache import EmbeddingCache
+from utils.semantic_index import SemanticIndex, tag_tickers
+
+TOPICS = ["chips", "rates", "oil", "retail"]
+
+
+def encode(texts):
+    # Each text is its topic's axis plus a small per-text offset
+    vectors = np.zeros((len(texts), 8), dtype=np.float32)
+    for row, text in enumerate(texts):
+        topic, _, n = text.partition(" ")
+        vectors[row, TOPICS.index(topic)] = 1.0
+        vectors[row, 4 + len(n) % 4] = 0.01 * (hash(n) % 7)
+    return vectors
+
+
+def items(n=200):
+    return [{"text": f"{TOPICS[i % 4]} story {i}", "kind": "news" if i % 2 else "reddit",
+             "tickers": ["NVDA"] if i % 4 == 0 else ["XOM"], "ts": 1_700_000_000 + i * 60,
+             "title": f"story {i}", "sentiment": 0.1} for i in range(n)]
+
+
+def test_tag_tickers():
+    assert tag_tickers("Loading up on $nvda and AAPL before CPI", ["AAPL", "MSFT"]) == ["AAPL", "NVDA"]
+
+
+def test_search_filters_by_ticker_time_and_kind(tmp_path):
+    embeddings = EmbeddingCache(encode=encode)
+    index = SemanticIndex(str(tmp_path), embeddings=embeddings, exact_threshold=10)
+    index.add_items(items())
+    index.add_items(items(10))
+    assert index.stats()["items"] == 200
+    top = index.search("chips query", k=5)
+    assert len(top) == 5 and all(r["title"].startswith("story") and int(r["title"].split()[1]) % 4 == 0 for r in top)
+    assert top[0]["score"] >= top[-1]["score"]
+    # Large candidate set: graph search with an ID selector; small one: exact scoring
+    for start in (1_700_000_000, 1_700_000_000 + 190 * 60):
+        hits = index.search("chips query", k=5, tickers=["xom"], start=start, kinds=["reddit"])
+        assert hits and all(h["tickers"] == ["XOM"] and h["kind"] == "reddit" and h["ts"] >= start for h in hits)
+    similar = index.search(embedding_id=top[0]["embedding_id"], k=3)
+    assert top[0]["embedding_id"] not in [r["embedding_id"] for r in similar]
+    assert similar[0]["sentiment"] == 0.1
+
+
+def test_index_persists_and_recovers_unsaved_items(tmp_path):
+    embeddings = EmbeddingCache(encode=encode)
+    index = SemanticIndex(str(tmp_path), embeddings=embeddings, save_every=100)
+    index.add_items(items(150))
+    assert index.stats() == {"items": 150, "unsaved": 0}
+    index.add_items(items(180))
+    reopened = SemanticIndex(str(tmp_path), embeddings=embeddings)
+    assert reopened.stats()["items"] == 180
+    assert len(reopened.search("oil query", k=10, tickers=["XOM"])) == 10
+
+
+def test_queries_are_not_cached_and_ids_survive_a_cold_embedding_cache(tmp_path):
+    embeddings = EmbeddingCache(encode=encode)
+    index = SemanticIndex(str(tmp_path), embeddings=embeddings)
+    index.add_items(items(40))
+    index.save()
+    entries = embeddings.stats()["entries"]
+    for i in range(5):
+        index.search(f"rates query {i}", k=3)
+    assert embeddings.stats()["entries"] == entries
+    target = index.search("chips query", k=1)[0]["embedding_id"]
+    warm = index.search(embedding_id=target, k=3)
+    # A restart without a persistent embedding cache: the vector is read back from the index
+    reopened = SemanticIndex(str(tmp_path), embeddings=EmbeddingCache(encode=encode))
+    assert reopened.search(embedding_id=target, k=3) == warm
+    with pytest.raises(KeyError):
+        reopened.search(embedding_id="missing", k=3)
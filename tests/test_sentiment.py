@@ -0,0 +1,43 @@
+import random
+import pytest
+from textblob import TextBlob
+from utils.sentiment import SentimentService
+
+SENTENCES = [
+    "$AAPL breaking out!! Best day in months, super bullish on this one.",
+    "Not a great quarter for Tesla, but deliveries weren't terrible either.",
+    "Really not impressed by the new iPhone. Overpriced and boring.",
+    "The stock is up 5% after-hours following a surprisingly strong revenue beat.",
+    "Long-term I'm very optimistic, short-term pretty volatile.",
+    "Absolutely amazing results!!! Couldn't be happier :)",
+    "not very good",
+    "Fed holds rates steady; markets mixed as investors await CPI data.",
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def service():
+    return SentimentService()
+
+
+def test_matches_textblob_polarity(service):
+    rng = random.Random(1)
+    vocab = "good bad very not no never really great terrible stock a I ! happy extremely slightly don't it's surprisingly , .".split()
+    texts = SENTENCES + [" ".join(rng.choice(vocab) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+    for text, score in zip(texts, service.score_many(texts)):
+        assert score == pytest.approx(TextBlob(text).sentiment.polarity, abs=1e-9), text
+
+
+def test_batch_matches_single_texts(service):
+    batch = service.score_many(SENTENCES + SENTENCES[:3])
+    assert batch == [service.score(text) for text in SENTENCES + SENTENCES[:3]]
+    assert service.score(None) == 0.0
+
+
+def test_memo_is_bounded():
+    service = SentimentService(cache_size=3)
+    service.score_many(["good", "bad", "good", "great", "terrible"])
+    assert service.stats() == {"hits": 0, "misses": 4, "entries": 3}
+    service.score_many(["terrible"])
+    assert service.stats()["hits"] == 1
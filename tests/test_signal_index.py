@@ -0,0 +1,50 @@
+import random
+from agents.signal_index import SignalIndex
+
+
+def legacy_context(ticker, news, sec_filings, sentiment):
+    return {
+        'news': [n for n in news if n.get('ticker', ticker) == ticker],
+        'sec_filings': [f for f in sec_filings if f.get('ticker', ticker) == ticker],
+        'sentiment': [s for s in sentiment if s.get('ticker', ticker) == ticker],
+    }
+
+
+def random_items(rng, tickers, n):
+    items = []
+    for i in range(n):
+        item = {'id': i}
+        choice = rng.random()
+        if choice < 0.6:
+            item['ticker'] = rng.choice(tickers)
+        elif choice < 0.7:
+            item['ticker'] = None
+        items.append(item)
+    return items
+
+
+def test_grouping_matches_the_list_scans():
+    rng = random.Random(7)
+    tickers = ['AAPL', 'MSFT', 'NVDA', 'TSLA']
+    market = [{'ticker': t, 'date': f'2024-01-{d:02d}', 'close': d} for d in range(1, 29) for t in tickers]
+    news, filings, social = (random_items(rng, tickers + ['GOOG'], 300) for _ in range(3))
+    index = SignalIndex(market, news, filings, social)
+    assert index.tickers == tickers
+    for ticker in tickers:
+        context = index.context(ticker, {'macro': []})
+        assert context['market_data']['date'] == '2024-01-28'
+        assert context['macro'] == []
+        for key, items in legacy_context(ticker, news, filings, social).items():
+            assert context[key] == items
+
+
+def test_latest_bar_wins_regardless_of_row_order():
+    market = [{'ticker': 'AAPL', 'date': '2024-01-03'}, {'ticker': 'AAPL', 'date': '2024-01-01'}, {'date': '2024-01-05'}]
+    index = SignalIndex(market_data=market)
+    assert index.tickers == ['AAPL']
+    assert index.context('AAPL')['market_data']['date'] == '2024-01-03'
+
+
+def test_signals_are_tagged_by_kind():
+    index = SignalIndex([{'ticker': 'AAPL'}], news=[{'t': 1}], sec_filings=[{'ticker': 'AAPL'}], sentiment=[{'ticker': 'MSFT'}])
+    assert [kind for kind, _ in index.signals('AAPL')] == ['news', 'filing']
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from agents.social_ingest import SocialIngestScheduler
+from utils.http_client import HTTPClient
+from utils.rate_limit import TokenBucket
+from utils.sentiment import SentimentService
+
+
+class FakeSocialAPI(BaseHTTPRequestHandler):
+    """
+    StockTwits streams honour `since`; Reddit listings are newest first. /streams/symbol/SLOW.json answers 429 once.
+    """
+    protocol_version = "HTTP/1.1"
+    messages = {}
+    posts = {}
+    requests = []
+    throttled = False
+
+    def do_GET(self):
+        cls = FakeSocialAPI
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        cls.requests.append((url.path, query))
+        if url.path == "/streams/symbol/SLOW.json" and not cls.throttled:
+            cls.throttled = True
+            return self._send(429, {}, {"Retry-After": "0"})
+        if url.path.startswith("/streams/symbol/"):
+            symbol = url.path.rsplit("/", 1)[1][:-5]
+            since = int(query.get("since", 0))
+            msgs = [m for m in cls.messages.get(symbol, []) if m["id"] > since]
+            return self._send(200, {"messages": sorted(msgs, key=lambda m: -m["id"])[:30]})
+        sub = url.path.split("/")[2]
+        posts = cls.posts.get(sub, [])
+        self._send(200, {"data": {"children": [{"kind": "t3", "data": p} for p in posts[:int(query["limit"])]]}})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    FakeSocialAPI.messages = {f"S{i}": [{"id": i * 100 + 1, "body": "great quarter", "created_at": "2024-05-01T00:00:00Z"}]
+                              for i in range(30)}
+    FakeSocialAPI.messages["SLOW"] = [{"id": 1, "body": "terrible", "created_at": None}]
+    # Newest first, as Reddit lists them
+    FakeSocialAPI.posts = {"stocks": [{"name": f"t3_{i}", "title": f"post {i} is good", "score": i, "created_utc": 1.7e9 + i,
+                                       "permalink": f"/r/stocks/{i}"} for i in range(5, 0, -1)]}
+    FakeSocialAPI.requests, FakeSocialAPI.throttled = [], False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSocialAPI)
+    server.request_queue_size = 64
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def scheduler(api):
+    client = HTTPClient(per_host_limit=32)
+    yield SocialIngestScheduler(http=client, sentiment=SentimentService(), stocktwits_url=api, reddit_url=api,
+                                stocktwits_per_hour=3600 * 100, reddit_per_minute=6000, buffer_size=3)
+    client.close()
+
+
+def test_cursors_only_pull_new_messages(scheduler):
+    symbols = [f"S{i}" for i in range(30)]
+    first = scheduler.poll(symbols, ["stocks"])
+    assert [m["id"] for m in first["stocktwits"]["S2"]] == [201]
+    assert first["stocktwits"]["S2"][0]["sentiment"] == pytest.approx(0.8)
+    assert [p["id"] for p in first["reddit"]["stocks"]] == ["t3_5", "t3_4", "t3_3", "t3_2", "t3_1"]
+    FakeSocialAPI.messages["S2"].append({"id": 202, "body": "awful guidance", "created_at": None})
+    FakeSocialAPI.posts["stocks"].insert(0, {"name": "t3_6", "title": "post 6", "score": 0, "created_utc": 1.7e9 + 6, "permalink": "/r/stocks/6"})
+    second = scheduler.poll(symbols, ["stocks"])
+    assert [m["id"] for m in second["stocktwits"]["S2"]] == [202]
+    assert second["stocktwits"]["S3"] == []
+    assert [p["id"] for p in second["reddit"]["stocks"]] == ["t3_6"]
+    assert ("/streams/symbol/S2.json", {"since": "201"}) in FakeSocialAPI.requests
+    assert [q for path, q in FakeSocialAPI.requests if path == "/r/stocks/new.json"] == [{"limit": "100"}] * 2
+    # Buffers are bounded and newest first
+    assert [m["id"] for m in scheduler.recent_stocktwits("s2")] == [202, 201]
+    assert [p["id"] for p in scheduler.recent_reddit("stocks")] == ["t3_6", "t3_5", "t3_4"]
+
+
+def test_deleted_newest_post_does_not_stall_reddit(scheduler):
+    scheduler.poll(subreddits=["stocks"])
+    del FakeSocialAPI.posts["stocks"][0]
+    new = [{"name": f"t3_{i}", "title": f"post {i}", "score": 0, "created_utc": 1.7e9 + i, "permalink": f"/r/stocks/{i}"}
+           for i in (7, 6)]
+    # A post made in the same second as the newest one seen still counts as new
+    new.append({"name": "t3_5b", "title": "post 5b", "score": 0, "created_utc": 1.7e9 + 5, "permalink": "/r/stocks/5b"})
+    FakeSocialAPI.posts["stocks"][:0] = new
+    assert [p["id"] for p in scheduler.poll(subreddits=["stocks"])["reddit"]["stocks"]] == ["t3_7", "t3_6", "t3_5b"]
+    assert scheduler.poll(subreddits=["stocks"])["reddit"]["stocks"] == []
+
+
+def test_buckets_pace_requests_and_429_is_retried_next_round(scheduler):
+    scheduler.stocktwits_bucket = TokenBucket(50, capacity=5)
+    started = time.monotonic()
+    result = scheduler.poll([f"S{i}" for i in range(30)] + ["SLOW"])
+    assert time.monotonic() - started >= 0.45
+    assert "SLOW" not in result["stocktwits"]
+    assert [m["id"] for m in scheduler.poll(["SLOW"])["stocktwits"]["SLOW"]] == [1]
+
+
+def test_requests_never_wait_on_the_default_quota(api):
+    client = HTTPClient(per_host_limit=32)
+    scheduler = SocialIngestScheduler(http=client, sentiment=SentimentService(), stocktwits_url=api, reddit_url=api,
+                                      stocktwits_per_hour=200)
+    symbols = [f"S{i}" for i in range(30)]
+    try:
+        started = time.monotonic()
+        first = scheduler.refresh(symbols)
+        second = scheduler.refresh(symbols)
+        # 200/hour leaves a burst of three requests; the other streams are served from (empty) buffers
+        assert time.monotonic() - started < 2.0
+        assert len(first["stocktwits"]) == 3 and second["stocktwits"] == {}
+        assert [m["id"] for m in scheduler.recent_stocktwits("S0")] == [1]
+        assert scheduler.recent_stocktwits("S29") == []
+    finally:
+        client.close()
+
+
+def test_background_watchlist_feeds_listeners_and_is_skipped_by_requests(scheduler):
+    seen = []
+    scheduler.add_listener(lambda new: seen.extend(m["id"] for msgs in new["stocktwits"].values() for m in msgs))
+    scheduler.start(["S1", "S2"], ["stocks"], interval=60)
+    try:
+        deadline = time.monotonic() + 5
+        while len(scheduler.recent_reddit("stocks")) < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert sorted(seen) == [101, 201]
+        requests = len(FakeSocialAPI.requests)
+        scheduler.refresh(["s1", "S3"], ["stocks"])
+        assert FakeSocialAPI.requests[requests:] == [("/streams/symbol/S3.json", {})]
+        assert sorted(seen) == [101, 201, 301]
+    finally:
+        scheduler.stop()
+
+
+def test_overlapping_polls_hand_out_each_message_once(scheduler):
+    seen = []
+    scheduler.add_listener(lambda new: seen.extend([m["id"] for msgs in new["stocktwits"].values() for m in msgs] +
+                                                   [p["id"] for posts in new["reddit"].values() for p in posts]))
+    barrier = threading.Barrier(8)
+
+    def refresh():
+        barrier.wait()
+        scheduler.refresh(["S1"], ["stocks"])
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(map(str, seen)) == ["101", "t3_1", "t3_2", "t3_3", "t3_4", "t3_5"]
+    assert [m["id"] for m in scheduler.recent_stocktwits("S1")] == [101]
+    assert [p["id"] for p in scheduler.recent_reddit("stocks")] == ["t3_5", "t3_4", "t3_3"]
+
+
+def test_failed_reddit_token_skips_reddit_but_keeps_stocktwits(api, monkeypatch):
+    monkeypatch.setenv("REDDIT_CLIENT_ID", "id")
+    monkeypatch.setenv("REDDIT_CLIENT_SECRET", "secret")
+    # The fake API has no POST handler, so the token request fails
+    monkeypatch.setenv("REDDIT_AUTH_URL", f"{api}/api/v1/access_token")
+    client = HTTPClient(per_host_limit=32)
+    scheduler = SocialIngestScheduler(http=client, sentiment=SentimentService(), stocktwits_url=api,
+                                      reddit_url=f"{api}/oauth", stocktwits_per_hour=3600 * 100, reddit_per_minute=6000)
+    try:
+        result = scheduler.refresh(["S1"], ["stocks"])
+        assert [m["id"] for m in result["stocktwits"]["S1"]] == [101]
+        assert result["reddit"] == {}
+        assert not [path for path, _ in FakeSocialAPI.requests if "/r/" in path]
+    finally:
+        client.close()
@@ -0,0 +1,234 @@
+"""
+Shared TimescaleDB access: one pooled SQLAlchemy engine per database URL, and a bulk
+ingestion path that streams rows into hypertables with PostgreSQL COPY and upserts them.
+"""
+import csv
+import io
+import itertools
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import sqlalchemy
+
+logger = logging.getLogger("db")
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_url):
+    """
+    Return the process-wide engine for `db_url`, creating it with a configured pool on first use.
+    Pool settings come from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT and DB_POOL_RECYCLE.
+    """
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = sqlalchemy.create_engine(
+                db_url,
+                pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+                max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+                pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+                pool_pre_ping=True,
+            )
+            _engines[db_url] = engine
+        return engine
+
+
+# Table definitions: (columns with types, upsert key). Every table is partitioned on "timestamp".
+TABLES = {
+    "ohlc": (
+        [("ticker", "TEXT NOT NULL"), ("timestamp", "TIMESTAMPTZ NOT NULL"), ("open", "DOUBLE PRECISION"),
+         ("high", "DOUBLE PRECISION"), ("low", "DOUBLE PRECISION"), ("close", "DOUBLE PRECISION"),
+         ("volume", "DOUBLE PRECISION")],
+        ("ticker", "timestamp"),
+    ),
+    "indicators": (
+        [("ticker", "TEXT NOT NULL"), ("timestamp", "TIMESTAMPTZ NOT NULL"), ("sma_20", "DOUBLE PRECISION"),
+         ("rsi_14", "DOUBLE PRECISION")],
+        ("ticker", "timestamp"),
+    ),
+    "news": (
+        [("url", "TEXT NOT NULL"), ("timestamp", "TIMESTAMPTZ NOT NULL"), ("title", "TEXT"), ("text", "TEXT"),
+         ("sentiment", "DOUBLE PRECISION"), ("summary", "TEXT")],
+        ("url", "timestamp"),
+    ),
+}
+
+
+def ensure_schema(engine):
+    """
+    Create the ingestion tables if missing and turn them into hypertables when TimescaleDB is installed.
+    """
+    with engine.begin() as conn:
+        has_timescale = conn.execute(sqlalchemy.text(
+            "SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).first() is not None
+        for table, (columns, key) in TABLES.items():
+            cols = ", ".join(f'"{name}" {ctype}' for name, ctype in columns)
+            conn.execute(sqlalchemy.text(
+                f'CREATE TABLE IF NOT EXISTS {table} ({cols}, PRIMARY KEY ({", ".join(key)}))'))
+            if has_timescale:
+                conn.execute(sqlalchemy.text(
+                    f"SELECT create_hypertable('{table}', 'timestamp', if_not_exists => TRUE, migrate_data => TRUE)"))
+
+
+def _csv_value(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def copy_upsert(engine, table, rows, batch_size=10000):
+    """
+    Stream `rows` (tuples in TABLES column order) into `table` with COPY through a temp table,
+    then upsert on the table's key. Rows are sent in batches so memory stays bounded.
+    Returns the number of rows written.
+    """
+    columns, key = TABLES[table]
+    names = [name for name, _ in columns]
+    key_idx = [names.index(k) for k in key]
+    col_list = ", ".join(f'"{n}"' for n in names)
+    key_list = ", ".join(f'"{k}"' for k in key)
+    updates = ", ".join(f'"{n}" = EXCLUDED."{n}"' for n in names if n not in key)
+    tmp = f"_ingest_{table}"
+    written = 0
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {tmp} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            # One row per key (the last) so the upsert never sees a key twice
+            batch = list({tuple(row[i] for i in key_idx): row for row in batch}.values())
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in batch:
+                writer.writerow([_csv_value(v) for v in row])
+            buf.seek(0)
+            cur.copy_expert(f"COPY {tmp} ({col_list}) FROM STDIN WITH (FORMAT csv)", buf)
+            cur.execute(
+                f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {tmp} "
+                f"ON CONFLICT ({key_list}) DO UPDATE SET {updates}"
+            )
+            raw.commit()
+            written += len(batch)
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return written
+
+
+def _find_column(df, prefix):
+    for col in df.columns:
+        name = col[0] if isinstance(col, tuple) else col
+        if str(name).lower().startswith(prefix):
+            return col
+    return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _column_values(df, col):
+    return df[col].tolist() if col is not None else [None] * len(df)
+
+
+def ohlc_rows(ticker, df):
+    """
+    Yield `ohlc` rows from a (flattened) yfinance frame indexed by timestamp.
+    """
+    cols = [_column_values(df, _find_column(df, p)) for p in ("open", "high", "low", "close", "volume")]
+    for ts, *values in zip(df.index, *cols):
+        yield (ticker, ts.isoformat()) + tuple(_float(v) for v in values)
+
+
+def indicator_rows(ticker, df):
+    """
+    Yield `indicators` rows (SMA_20, RSI_14) from a frame produced by MarketDataAgent.
+    """
+    sma = _column_values(df, next((c for c in df.columns if "SMA_20" in str(c)), None))
+    rsi = _column_values(df, next((c for c in df.columns if "RSI_14" in str(c)), None))
+    for ts, s, r in zip(df.index, sma, rsi):
+        yield (ticker, ts.isoformat(), _float(s), _float(r))
+
+
+def news_rows(articles, fetched_at):
+    """
+    Yield `news` rows. Articles without a parseable publish date are keyed by `fetched_at`.
+    """
+    import pandas as pd
+    for a in articles:
+        ts = pd.to_datetime(a.get("publish_date") or None, errors="coerce", utc=True)
+        ts = fetched_at if ts is None or pd.isna(ts) else ts
+        yield (a.get("url"), ts.isoformat(), a.get("title"), a.get("text"), _float(a.get("sentiment")), a.get("summary"))
+
+
+class TimescaleWriter:
+    """
+    Persists agent output off the request path: writes are queued to a single background
+    worker that ensures the schema once and then COPY-upserts each batch.
+    """
+    def __init__(self, engine, batch_size=10000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timescale-writer")
+        self._schema_ready = False
+
+    def _write(self, table, rows):
+        try:
+            if not self._schema_ready:
+                ensure_schema(self.engine)
+                self._schema_ready = True
+            n = copy_upsert(self.engine, table, rows, batch_size=self.batch_size)
+            logger.info(f"Stored {n} rows in {table}")
+            return n
+        except Exception as e:
+            logger.error(f"Error: failed to store rows in {table}: {e}")
+            return 0
+
+    def submit(self, table, rows):
+        """
+        Queue rows for `table`. Rows are materialized first so the caller may reuse its frames.
+        """
+        return self._executor.submit(self._write, table, list(rows))
+
+    def write_market_frame(self, ticker, df):
+        self.submit("ohlc", ohlc_rows(ticker, df))
+        self.submit("indicators", indicator_rows(ticker, df))
+
+    def write_news(self, articles):
+        import pandas as pd
+        self.submit("news", news_rows(articles, pd.Timestamp.now(tz="UTC").normalize()))
+
+
+_writers = {}
+
+
+def get_writer(engine):
+    """
+    Return the shared TimescaleWriter for `engine`, or None unless TIMESCALEDB_PERSIST=1.
+    """
+    if os.getenv("TIMESCALEDB_PERSIST", "0") != "1":
+        return None
+    with _engines_lock:
+        writer = _writers.get(id(engine))
+        if writer is None:
+            writer = _writers[id(engine)] = TimescaleWriter(engine)
+        return writer
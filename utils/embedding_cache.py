@@ -0,0 +1,163 @@
+"""
+Content-addressed sentence embedding cache.
+Texts are keyed by a blake2b hash of their content; the hex digest is the embedding ID handed to
+API clients. Vectors live in one float16 matrix, memory-mapped from disk when a directory is
+configured, so reposted or unchanged texts are never encoded twice, even across restarts.
+Only texts that are not cached yet are sent to the model, in batches.
+"""
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+
+def embedding_id(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    embed_many(texts) returns embedding IDs in input order; vectors(ids) returns a float32 matrix.
+    `encode` maps a list of texts to a 2-D array; by default the SentenceTransformer `model_name`
+    is loaded on first use.
+    """
+    def __init__(self, root=None, model_name="all-MiniLM-L6-v2", encode=None, batch_size=64):
+        self.model_name = model_name
+        self.root = os.path.join(root, model_name.replace("/", "_")) if root else None
+        self.batch_size = batch_size
+        self._encode = encode
+        self._model = None
+        self._rows = {}
+        self._matrix = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self.hits = 0
+        self.encoded = 0
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+            self._open()
+
+    def _paths(self):
+        return (os.path.join(self.root, "meta.json"), os.path.join(self.root, "vectors.f16"),
+                os.path.join(self.root, "keys.bin"))
+
+    def _open(self):
+        meta_path, vectors_path, keys_path = self._paths()
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            dim = json.load(f)["dim"]
+        with open(keys_path, "rb") as f:
+            keys = f.read()
+        # Keys are appended only after their rows are flushed, so every listed key has a vector
+        self._count = len(keys) // 16
+        self._rows = {keys[i * 16:(i + 1) * 16].hex(): i for i in range(self._count)}
+        capacity = os.path.getsize(vectors_path) // (dim * 2)
+        self._matrix = np.memmap(vectors_path, dtype=np.float16, mode="r+", shape=(capacity, dim))
+
+    def _reserve(self, rows, dim):
+        if self._matrix is not None and rows <= len(self._matrix):
+            return
+        capacity = max(rows, 1024, 2 * (len(self._matrix) if self._matrix is not None else 0))
+        if not self.root:
+            grown = np.zeros((capacity, dim), dtype=np.float16)
+            if self._matrix is not None:
+                grown[:self._count] = self._matrix[:self._count]
+            self._matrix = grown
+            return
+        meta_path, vectors_path, _ = self._paths()
+        if self._matrix is None:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim, "model": self.model_name}, f)
+        else:
+            self._matrix.flush()
+        with open(vectors_path, "ab") as f:
+            f.truncate(capacity * dim * 2)
+        self._matrix = np.memmap(vectors_path, dtype=np.float16, mode="r+", shape=(capacity, dim))
+
+    def _append(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with self._lock:
+            fresh = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._rows]
+            if not fresh:
+                return
+            self._reserve(self._count + len(fresh), vectors.shape[1])
+            start = self._count
+            self._matrix[start:start + len(fresh)] = np.stack([vector for _, vector in fresh])
+            if self.root:
+                self._matrix.flush()
+                with open(self._paths()[2], "ab") as f:
+                    f.write(b"".join(bytes.fromhex(key) for key, _ in fresh))
+            for offset, (key, _) in enumerate(fresh):
+                self._rows[key] = start + offset
+            self._count += len(fresh)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts):
+        if self._encode is not None:
+            return self._encode(texts)
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+
+    def embed_many(self, texts):
+        texts = ["" if text is None else str(text) for text in texts]
+        ids = [embedding_id(text) for text in texts]
+        with self._lock:
+            missing = {}
+            for key, text in zip(ids, texts):
+                if key not in self._rows:
+                    missing.setdefault(key, text)
+            self.hits += len(ids) - len(missing)
+        if missing:
+            self._append(list(missing), self.encode(list(missing.values())))
+            with self._lock:
+                self.encoded += len(missing)
+        return ids
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._rows
+
+    def vectors(self, ids):
+        """
+        float32 matrix with one row per ID; unknown IDs raise KeyError.
+        """
+        with self._lock:
+            rows = [self._rows[key] for key in ids]
+            if not rows:
+                return np.zeros((0, self._matrix.shape[1] if self._matrix is not None else 0), dtype=np.float32)
+            return np.asarray(self._matrix[rows], dtype=np.float32)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": self._count, "hits": self.hits, "encoded": self.encoded}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    Process-wide cache; EMBEDDING_CACHE_DIR enables the memory-mapped on-disk tier.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(root=os.getenv("EMBEDDING_CACHE_DIR") or None,
+                                        model_name=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+                                        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+    return _cache
@@ -0,0 +1,282 @@
+"""
+Streaming, section-aware parsing of full 10-K / 10-Q documents.
+Filings (often tens of MB of HTML with inline XBRL) are fed to an lxml pull parser chunk by chunk;
+each block element is turned into a line of text as soon as it closes and then dropped from the
+tree, so memory stays bounded by the sections kept rather than by the document. Item headings
+switch the current section; table-of-contents entries are recognised by having next to no body
+before the following heading. Extracted sections are cached by accession number.
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from lxml import etree
+
+# Section names per form: 10-K items, and 10-Q items by part (Part I Item 1/2, Part II Item 1A)
+FORM_SECTIONS = {
+    "10-K": {"1A": "risk_factors", "7": "mda", "8": "financial_statements"},
+    "10-Q": {"I.1": "financial_statements", "I.2": "mda", "II.1A": "risk_factors"},
+}
+
+BLOCK_TAGS = {"p", "div", "li", "h1", "h2", "h3", "h4", "h5", "h6", "center", "blockquote", "pre", "dd", "dt", "caption", "tr"}
+SKIP_TAGS = {"script", "style", "title", "ix:header"}
+HEADING_MAX_CHARS = 200
+# "Item 7." / "ITEM 1A - RISK" / "Item 8 Financial", but not "Item 8 of this report"
+ITEM_RE = re.compile(r"^(?i:item)\s*(\d{1,2}[A-Ca-c]?)(?:\s*[.:\-–—|]|\s+[A-Z]|\s*$)")
+PART_RE = re.compile(r"^part\s+(iv|iii|ii|i)\b", re.I)
+# Page numbers and running headers between pages
+NOISE_RE = re.compile(r"^(?:\d{1,3}|table of contents|index)$", re.I)
+BLOCK_START_RE = re.compile(rb"<(?:div|p)[\s>]", re.I)
+ROW_START_RE = re.compile(rb"<tr[\s>]", re.I)
+
+
+def normalize_form(form):
+    form = (form or "10-K").upper()
+    return "10-Q" if form.startswith("10-Q") else "10-K"
+
+
+def clean_text(parts):
+    return " ".join("".join(parts).split())
+
+
+class FilingSectionParser:
+    """
+    Incremental parser: feed(bytes) as the document arrives, then close() returns
+    {section name: text} with paragraphs and table rows separated by newlines (cells by " | ").
+    Each section keeps at most `max_chars`; a section with fewer than `toc_chars` before the
+    next heading is treated as a table-of-contents entry and discarded.
+    libxml2's HTML push parser keeps the input it has consumed, so every `segment_bytes` the
+    document is handed to a fresh parser at the start of a block (or of a row, inside a table).
+    """
+    def __init__(self, form="10-K", max_chars=500000, toc_chars=300, segment_bytes=8 << 20):
+        self.form = normalize_form(form)
+        self.sections = FORM_SECTIONS[self.form]
+        self.max_chars = max_chars
+        self.toc_chars = toc_chars
+        self.segment_bytes = segment_bytes
+        self.parser = self._new_parser()
+        self.segment = 0
+        self.part = None
+        self.current = None
+        self.buffer = []
+        self.buffered = 0
+        self.found = {}
+        self.table_depth = 0
+        self.bytes_read = 0
+
+    def _new_parser(self):
+        # Only block-level, skipped and table elements reach Python; inline markup stays in libxml2
+        return etree.HTMLPullParser(events=("start", "end"), tag=BLOCK_TAGS | SKIP_TAGS | {"table"}, huge_tree=True)
+
+    def feed(self, data):
+        self.bytes_read += len(data)
+        if self.segment + len(data) >= self.segment_bytes:
+            # Split before a row inside a table, before a paragraph or division outside one
+            in_table = bool(self.table_depth)
+            starts = [m.start() for m in (ROW_START_RE if in_table else BLOCK_START_RE).finditer(data)]
+            if starts and starts[-1] > 0:
+                self._feed(data[:starts[-1]])
+                data = data[starts[-1]:]
+                if bool(self.table_depth) == in_table:
+                    data = self._restart() + data
+        self._feed(data)
+
+    def _restart(self):
+        # Elements still open are closed (their text so far emitted) and open tables are reopened in
+        # the new parser; the stray end tags that follow are ignored
+        depth = self.table_depth
+        self.parser.close()
+        self._drain()
+        self.parser = self._new_parser()
+        self.segment = 0
+        self.table_depth = 0
+        return b"<table>" * depth
+
+    def _feed(self, data):
+        self.segment += len(data)
+        self.parser.feed(data)
+        self._drain()
+
+    def close(self):
+        self.parser.close()
+        self._drain()
+        self._end_section()
+        return dict(self.found)
+
+    def _drain(self):
+        for event, el in self.parser.read_events():
+            tag = el.tag
+            if tag == "table":
+                self.table_depth += 1 if event == "start" else -1
+            if event == "start":
+                continue
+            if tag in SKIP_TAGS:
+                el.clear(keep_tail=True)
+            elif tag == "tr":
+                self._flush_before(el)
+                cells = (clean_text(cell.itertext()) for cell in el if isinstance(cell.tag, str))
+                self._block(" | ".join(cell for cell in cells if cell))
+                el.clear(keep_tail=True)
+            elif tag in BLOCK_TAGS and not self.table_depth:
+                self._flush_before(el)
+                self._block(clean_text(el.itertext()))
+                el.clear(keep_tail=True)
+
+    def _flush_before(self, el):
+        # Text the enclosing elements hold ahead of `el` (their own text, inline siblings, tails of
+        # consumed blocks) comes first in the document: emit it, outermost first, and drop the
+        # consumed siblings so the tree never grows beyond the current path
+        pending = []
+        node, parent = el, el.getparent()
+        while parent is not None:
+            parts = [parent.text or ""]
+            parent.text = None
+            while node.getprevious() is not None:
+                sibling = parent[0]
+                if isinstance(sibling.tag, str) and sibling.tag not in SKIP_TAGS:
+                    parts.extend(sibling.itertext())
+                parts.append(sibling.tail or "")
+                del parent[0]
+            text = "".join(parts)
+            if text and not text.isspace():
+                pending.append(" ".join(text.split()))
+            node, parent = parent, parent.getparent()
+        for text in reversed(pending):
+            self._block(text)
+
+    def _block(self, text):
+        if not text or NOISE_RE.match(text):
+            return
+        if len(text) <= HEADING_MAX_CHARS:
+            part = PART_RE.match(text)
+            if part:
+                self._end_section()
+                self.part = part.group(1).upper()
+                return
+            item = ITEM_RE.match(text)
+            if item:
+                self._end_section()
+                self.current = self._section_for(item.group(1).upper())
+                return
+        if self.current is not None and self.buffered < self.max_chars:
+            text = text[:self.max_chars - self.buffered]
+            self.buffer.append(text)
+            self.buffered += len(text) + 1
+
+    def _section_for(self, item):
+        if self.form == "10-Q":
+            return self.sections.get(f"{self.part or 'I'}.{item}")
+        return self.sections.get(item)
+
+    def _end_section(self):
+        # A later occurrence of the same item (the body after the table of contents) wins if it is longer
+        if self.current is not None and self.buffered >= self.toc_chars:
+            if self.buffered > len(self.found.get(self.current, "")):
+                self.found[self.current] = "\n".join(self.buffer)
+        self.current = None
+        self.buffer = []
+        self.buffered = 0
+
+
+def parse_sections(chunks, form="10-K", max_chars=500000, toc_chars=300):
+    """
+    Extract sections from an iterable of byte chunks (a file read in blocks, a streamed response).
+    """
+    parser = FilingSectionParser(form, max_chars=max_chars, toc_chars=toc_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def iter_file(path, chunk_size=1 << 16):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def chunk_text(text, max_chars=4000):
+    """
+    Split section text into pieces of at most `max_chars`, breaking between paragraphs where
+    possible, then between sentences, then anywhere.
+    """
+    pieces, current, size = [], [], 0
+    for paragraph in text.split("\n"):
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(". ", 0, max_chars) + 1 or max_chars
+            pieces.extend(["\n".join(current)] if current else [])
+            current, size = [], 0
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if current and size + len(paragraph) + 1 > max_chars:
+            pieces.append("\n".join(current))
+            current, size = [], 0
+        if paragraph:
+            current.append(paragraph)
+            size += len(paragraph) + 1
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+class SectionCache:
+    """
+    Extracted sections by accession number: a small in-memory LRU, plus one JSON file per
+    filing under `root` when given. Filings never change once accepted, so entries never expire.
+    """
+    def __init__(self, root=None, max_entries=64):
+        self.root = root
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, accession):
+        return os.path.join(self.root, f"{accession}.json")
+
+    def get(self, accession):
+        with self._lock:
+            if accession in self._memory:
+                self._memory.move_to_end(accession)
+                return self._memory[accession]
+        if self.root and os.path.exists(self._path(accession)):
+            with open(self._path(accession), encoding="utf-8") as f:
+                sections = json.load(f)
+            self._remember(accession, sections)
+            return sections
+        return None
+
+    def put(self, accession, sections):
+        if self.root:
+            tmp = self._path(accession) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(sections, f)
+            os.replace(tmp, self._path(accession))
+        self._remember(accession, sections)
+
+    def _remember(self, accession, sections):
+        with self._lock:
+            self._memory[accession] = sections
+            self._memory.move_to_end(accession)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_section_cache():
+    """
+    Process-wide section cache; SEC_SECTIONS_DIR persists it across restarts.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SectionCache(root=os.getenv("SEC_SECTIONS_DIR") or None)
+    return _cache
@@ -0,0 +1,158 @@
+"""
+Conditional-GET resource cache for feeds and datasets that rarely change.
+Each URL's ETag / Last-Modified validators are stored with the already-parsed result. Within a
+source's refresh interval the stored result is served without any request; after it, a
+conditional request is sent and a 304 serves the stored result without re-parsing.
+Entries live in memory and, when a directory is configured, in pickle files that survive restarts.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from utils.http_client import get_http_client
+
+logger = logging.getLogger("HTTPCache")
+
+
+class CacheEntry:
+    def __init__(self, value, etag=None, last_modified=None, fetched_at=None):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+
+class ConditionalCache:
+    """
+    `parse` callables receive the httpx response and return the value to store.
+    Counters (hits, not_modified, fetched) are exposed through stats().
+    """
+    def __init__(self, http=None, root=None):
+        self.http = http or get_http_client()
+        self.root = root
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.not_modified = 0
+        self.fetched = 0
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.root, hashlib.sha256(url.encode()).hexdigest() + ".pkl")
+
+    def entry(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None and self.root and os.path.exists(self._path(url)):
+            try:
+                with open(self._path(url), "rb") as f:
+                    entry = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Dropping unreadable cache entry for {url}: {e}")
+                return None
+            with self._lock:
+                self._entries[url] = entry
+        return entry
+
+    def _store(self, url, entry):
+        with self._lock:
+            self._entries[url] = entry
+        if self.root:
+            path = self._path(url)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(entry, f)
+            os.replace(path + ".tmp", path)
+
+    def _conditional_headers(self, entry, headers):
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _resolve(self, url, entry, response, parse):
+        if not isinstance(response, Exception) and response.status_code == 304 and entry is not None:
+            with self._lock:
+                self.not_modified += 1
+            self._store(url, CacheEntry(entry.value, entry.etag, entry.last_modified))
+            return entry.value
+        try:
+            if isinstance(response, Exception):
+                raise response
+            response.raise_for_status()
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning(f"Serving stale {url} after fetch error: {e}")
+            return entry.value
+        value = parse(response)
+        with self._lock:
+            self.fetched += 1
+        self._store(url, CacheEntry(value, response.headers.get("etag"), response.headers.get("last-modified")))
+        return value
+
+    def _fresh(self, entry, refresh_interval):
+        if entry is not None and refresh_interval and time.time() - entry.fetched_at < refresh_interval:
+            with self._lock:
+                self.hits += 1
+            return True
+        return False
+
+    def get(self, url, parse, refresh_interval=0, headers=None, **kwargs):
+        return self.get_many([url], parse, refresh_interval=refresh_interval, headers=headers, return_exceptions=False, **kwargs)[0]
+
+    def _submit(self, url, entry, headers, limiter, **kwargs):
+        if limiter is not None:
+            limiter.acquire()
+        return self.http.submit("GET", url, headers=self._conditional_headers(entry, headers), **kwargs)
+
+    def get_many(self, urls, parse, refresh_interval=0, headers=None, return_exceptions=True, limiter=None, **kwargs):
+        """
+        Parsed results for `urls` in input order; requests that are needed run concurrently.
+        With return_exceptions, a URL that failed with nothing stored yields its exception.
+        `limiter` (a TokenBucket) paces the requests that actually go out.
+        """
+        entries = [self.entry(url) for url in urls]
+        futures = [None if self._fresh(entry, refresh_interval) else self._submit(url, entry, headers, limiter, **kwargs)
+                   for url, entry in zip(urls, entries)]
+        results = []
+        for url, entry, future in zip(urls, entries, futures):
+            if future is None:
+                results.append(entry.value)
+                continue
+            try:
+                response = future.result()
+            except Exception as e:
+                response = e
+            try:
+                results.append(self._resolve(url, entry, response, parse))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "not_modified": self.not_modified, "fetched": self.fetched, "entries": len(self._entries)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """
+    Process-wide cache; HTTP_CACHE_DIR enables the on-disk tier.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ConditionalCache(root=os.getenv("HTTP_CACHE_DIR") or None)
+    return _cache
@@ -0,0 +1,190 @@
+"""
+Shared async HTTP client for all network-bound agents.
+One httpx.AsyncClient (keep-alive connection pool) lives on a background event loop; agents,
+which run synchronously in worker threads, submit requests to it and can fan a whole fetch loop
+out concurrently. Every host gets its own concurrency limit. Large bodies can be streamed chunk
+by chunk instead of being read into memory.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import threading
+import httpx
+
+
+class HTTPClient:
+    """
+    Pooled HTTP client usable from synchronous code.
+    Responses are httpx.Response objects (status_code, text, content, json(), raise_for_status()).
+    """
+    def __init__(self, timeout=15.0, connect_timeout=5.0, max_connections=100, max_keepalive=20,
+                 keepalive_expiry=30.0, per_host_limit=8, headers=None):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.per_host_limit = per_host_limit
+        self.headers = headers or {}
+        self._host_semaphores = {}
+        self._loop = None
+        self._client = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="http-client-loop", daemon=True)
+                self._thread.start()
+                self._client = asyncio.run_coroutine_threadsafe(self._create_client(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _create_client(self):
+        return httpx.AsyncClient(timeout=self.timeout, limits=self.limits, headers=self.headers, follow_redirects=True)
+
+    def _semaphore(self, host):
+        # Only touched from the loop thread, so no lock is needed
+        sem = self._host_semaphores.get(host)
+        if sem is None:
+            sem = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return sem
+
+    async def arequest(self, method, url, **kwargs):
+        """
+        Send a request on the client loop, waiting for a slot in the host's concurrency limit.
+        """
+        async with self._semaphore(httpx.URL(url).host):
+            return await self._client.request(method, url, **kwargs)
+
+    def submit(self, method, url, **kwargs):
+        """
+        Start a request without waiting; returns a concurrent.futures.Future.
+        """
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self.arequest(method, url, **kwargs), loop)
+
+    def request(self, method, url, **kwargs):
+        return self.submit(method, url, **kwargs).result()
+
+    async def _open_stream(self, method, url, **kwargs):
+        sem = self._semaphore(httpx.URL(url).host)
+        await sem.acquire()
+        try:
+            return await self._client.send(self._client.build_request(method, url, **kwargs), stream=True), sem
+        except BaseException:
+            sem.release()
+            raise
+
+    @staticmethod
+    async def _close_stream(response, sem):
+        try:
+            await response.aclose()
+        finally:
+            sem.release()
+
+    @contextlib.contextmanager
+    def stream(self, method, url, **kwargs):
+        """
+        Send a request and yield a StreamedResponse whose body is read with iter_bytes(). The
+        connection and the host's concurrency slot are held until the block exits.
+        """
+        loop = self._ensure_started()
+        response, sem = asyncio.run_coroutine_threadsafe(self._open_stream(method, url, **kwargs), loop).result()
+        try:
+            yield StreamedResponse(response, loop)
+        finally:
+            asyncio.run_coroutine_threadsafe(self._close_stream(response, sem), loop).result()
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def gather(self, requests, return_exceptions=True):
+        """
+        Run (method, url, kwargs) requests concurrently and return responses in input order.
+        With return_exceptions, a failed request yields its exception instead of raising.
+        """
+        futures = [self.submit(method, url, **(kwargs or {})) for method, url, kwargs in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    for f in futures:
+                        f.cancel()
+                    raise
+                results.append(e)
+        return results
+
+    def get_many(self, urls, return_exceptions=True, **kwargs):
+        return self.gather([("GET", url, kwargs) for url in urls], return_exceptions=return_exceptions)
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._client = None
+        self._host_semaphores = {}
+
+
+class StreamedResponse:
+    """
+    Synchronous view of a streaming httpx.Response on the client loop: status_code, headers,
+    raise_for_status() and iter_bytes().
+    """
+    def __init__(self, response, loop):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self._loop = loop
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+    def iter_bytes(self, chunk_size=None):
+        chunks = self.response.aiter_bytes(chunk_size)
+
+        async def next_chunk():
+            try:
+                return await chunks.__anext__()
+            except StopAsyncIteration:
+                return None
+
+        while True:
+            chunk = asyncio.run_coroutine_threadsafe(next_chunk(), self._loop).result()
+            if chunk is None:
+                return
+            yield chunk
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Return the process-wide client, configured from HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE and HTTP_PER_HOST_LIMIT.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HTTPClient(
+                    timeout=float(os.getenv("HTTP_TIMEOUT", "15")),
+                    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+                    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+                    max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+                    per_host_limit=int(os.getenv("HTTP_PER_HOST_LIMIT", "8")),
+                )
+    return _client
@@ -0,0 +1,245 @@
+"""
+Incremental indicator state for live updates.
+IncrementalIndicators keeps the rolling sums and Wilder averages for one (ticker, interval)
+so each appended bar costs O(1), and can be snapshotted and restored across restarts.
+Values match the batch computations in utils.indicators (SMA, simple and Wilder RSI).
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import quote
+import pandas as pd
+
+# Running sums are re-derived from their windows this often to stop floating-point drift
+RESYNC_EVERY = 1000
+
+
+class IncrementalIndicators:
+    """
+    O(1)-per-bar SMA and RSI for one (ticker, interval).
+    `update` commits a closed bar; `peek` evaluates a still-forming bar without committing it.
+    Committed values are kept for the last `max_history` bars so callers can serve recent rows;
+    older bars are left to the batch engine in utils.indicators.
+    """
+    def __init__(self, ticker, interval, sma_window=20, rsi_period=14, max_history=5000):
+        self.ticker = ticker
+        self.interval = interval
+        self.sma_window = sma_window
+        self.rsi_period = rsi_period
+        self.closes = deque(maxlen=sma_window)
+        self.gains = deque(maxlen=rsi_period)
+        self.losses = deque(maxlen=rsi_period)
+        self.close_sum = 0.0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.wilder_count = 0
+        self.wilder_gain_total = 0.0
+        self.wilder_loss_total = 0.0
+        self.avg_gain = math.nan
+        self.avg_loss = math.nan
+        self.last_close = None
+        self.last_timestamp = None
+        self.updates = 0
+        # (timestamp, close, sma, rsi) for committed bars, plus a timestamp -> (sma, rsi) index
+        # kept in step with it so lookups never rebuild anything
+        self.history = deque(maxlen=max_history)
+        self._history_index = {}
+
+    @staticmethod
+    def _window_sum(window, running, value):
+        full = len(window) == window.maxlen
+        return running + value - (window[0] if full else 0.0), min(len(window) + 1, window.maxlen)
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if math.isnan(gain) or math.isnan(loss):
+            return math.nan
+        if loss == 0:
+            return 100.0 if gain > 0 else math.nan
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def _next(self, close):
+        """
+        Compute the state after appending `close` without mutating anything.
+        """
+        if self.last_close is None:
+            delta = None
+            gain = loss = 0.0
+        else:
+            delta = close - self.last_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        close_sum, n_closes = self._window_sum(self.closes, self.close_sum, close)
+        gain_sum, n_gains = self._window_sum(self.gains, self.gain_sum, gain)
+        loss_sum, _ = self._window_sum(self.losses, self.loss_sum, loss)
+        count, gain_total, loss_total = self.wilder_count, self.wilder_gain_total, self.wilder_loss_total
+        avg_gain, avg_loss = self.avg_gain, self.avg_loss
+        # Wilder smoothing starts at the first delta, i.e. the second bar
+        if delta is not None:
+            count += 1
+            p = self.rsi_period
+            if count <= p:
+                gain_total += gain
+                loss_total += loss
+                if count == p:
+                    avg_gain, avg_loss = gain_total / p, loss_total / p
+            else:
+                avg_gain = (avg_gain * (p - 1) + gain) / p
+                avg_loss = (avg_loss * (p - 1) + loss) / p
+        values = {
+            f"SMA_{self.sma_window}": close_sum / self.sma_window if n_closes == self.sma_window else math.nan,
+            f"RSI_{self.rsi_period}": self._rsi(gain_sum, loss_sum) if n_gains == self.rsi_period else math.nan,
+            f"RSI_{self.rsi_period}_wilder": self._rsi(avg_gain, avg_loss),
+        }
+        state = (gain, loss, close_sum, gain_sum, loss_sum, count, gain_total, loss_total, avg_gain, avg_loss)
+        return values, state
+
+    def peek(self, close):
+        """
+        Indicator values if `close` were appended now; the state is left unchanged.
+        """
+        return self._next(float(close))[0]
+
+    def update(self, timestamp, close):
+        """
+        Append a closed bar in O(1) and return its indicator values.
+        """
+        close = float(close)
+        values, state = self._next(close)
+        (gain, loss, self.close_sum, self.gain_sum, self.loss_sum, self.wilder_count,
+         self.wilder_gain_total, self.wilder_loss_total, self.avg_gain, self.avg_loss) = state
+        self.closes.append(close)
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.last_close = close
+        self.last_timestamp = pd.Timestamp(timestamp)
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.close_sum, self.gain_sum, self.loss_sum = sum(self.closes), sum(self.gains), sum(self.losses)
+        self._remember((self.last_timestamp, close, values[f"SMA_{self.sma_window}"], values[f"RSI_{self.rsi_period}"]))
+        return values
+
+    def _remember(self, row):
+        if len(self.history) == self.history.maxlen:
+            self._history_index.pop(self.history[0][0], None)
+        self.history.append(row)
+        self._history_index[row[0]] = (row[2], row[3])
+
+    def extend(self, closes):
+        """
+        Append every bar of a timestamp-indexed Series.
+        """
+        for timestamp, close in closes.items():
+            self.update(timestamp, close)
+
+    def covers(self, closes):
+        """
+        True if this state can continue `closes`: its last committed bar is in the series with an
+        unchanged close (no split/dividend re-adjustment). Bars older than the kept history do not
+        matter; their values come from the batch engine.
+        """
+        if self.last_timestamp is None or self.last_timestamp not in closes.index:
+            return False
+        return math.isclose(float(closes.loc[self.last_timestamp]), self.last_close, rel_tol=1e-9)
+
+    def history_values(self, index):
+        """
+        (SMA, RSI) lists for the committed bars in `index`; NaN where a bar is not in the history.
+        """
+        pairs = [self._history_index.get(ts, (math.nan, math.nan)) for ts in index]
+        return [p[0] for p in pairs], [p[1] for p in pairs]
+
+    def to_dict(self):
+        return {
+            "ticker": self.ticker,
+            "interval": self.interval,
+            "sma_window": self.sma_window,
+            "rsi_period": self.rsi_period,
+            "max_history": self.history.maxlen,
+            "closes": list(self.closes),
+            "gains": list(self.gains),
+            "losses": list(self.losses),
+            "wilder": [self.wilder_count, self.wilder_gain_total, self.wilder_loss_total, self.avg_gain, self.avg_loss],
+            "last_close": self.last_close,
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            "history": [[ts.isoformat(), c, s, r] for ts, c, s, r in self.history],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["ticker"], data["interval"], data["sma_window"], data["rsi_period"], data["max_history"])
+        state.closes.extend(data["closes"])
+        state.gains.extend(data["gains"])
+        state.losses.extend(data["losses"])
+        state.close_sum, state.gain_sum, state.loss_sum = sum(state.closes), sum(state.gains), sum(state.losses)
+        (state.wilder_count, state.wilder_gain_total, state.wilder_loss_total,
+         state.avg_gain, state.avg_loss) = data["wilder"]
+        state.last_close = data["last_close"]
+        state.last_timestamp = pd.Timestamp(data["last_timestamp"]) if data["last_timestamp"] else None
+        for ts, c, s, r in data["history"]:
+            state._remember((pd.Timestamp(ts), c, s, r))
+        return state
+
+
+class IndicatorStateStore:
+    """
+    Thread-safe map of (ticker, interval) -> IncrementalIndicators, optionally snapshotted
+    to a directory (one JSON file per key) so a restart resumes without a full recompute.
+    """
+    def __init__(self, directory=None, save_interval=300):
+        self.directory = directory
+        self.save_interval = save_interval
+        self._states = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.load()
+
+    def _path(self, ticker, interval):
+        # Tickers come from requests; quoting keeps them to one file inside the directory
+        return os.path.join(self.directory, f"{quote(ticker, safe='')}__{quote(interval, safe='')}.json")
+
+    def get(self, ticker, interval):
+        with self._lock:
+            return self._states.get((ticker, interval))
+
+    def put(self, state):
+        with self._lock:
+            self._states[(state.ticker, state.interval)] = state
+            self._dirty.add((state.ticker, state.interval))
+
+    def mark_dirty(self, ticker, interval):
+        with self._lock:
+            self._dirty.add((ticker, interval))
+
+    def load(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.directory, name)) as f:
+                state = IncrementalIndicators.from_dict(json.load(f))
+            self._states[(state.ticker, state.interval)] = state
+
+    def save(self):
+        """
+        Write snapshots for every key updated since the last save.
+        """
+        if not self.directory:
+            return
+        with self._lock:
+            dirty = [(key, self._states[key].to_dict()) for key in self._dirty]
+            self._dirty.clear()
+            self._last_save = time.monotonic()
+        for (ticker, interval), snapshot in dirty:
+            path = self._path(ticker, interval)
+            with open(path + ".tmp", "w") as f:
+                json.dump(snapshot, f)
+            os.replace(path + ".tmp", path)
+
+    def maybe_save(self):
+        if self.directory and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
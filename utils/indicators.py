@@ -0,0 +1,207 @@
+"""
+Vectorized technical indicator engine.
+Every function takes dense (time x ticker) float arrays and computes the indicator for all
+tickers in one pass. Rolling indicators use cumulative sums or strided windows; recursive ones
+(EMA, Wilder smoothing) step through time once with whole-row array operations.
+NaN marks missing bars; outputs are NaN until a ticker has enough history.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_CONFIG = {
+    "sma": (20, 50, 200),
+    "ema": (12, 26),
+    "rsi": 14,
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+    "atr": 14,
+    "volatility": (20, 252),
+}
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=np.float64)
+    return x.reshape(-1, 1) if x.ndim == 1 else x
+
+
+def sma(x, window):
+    """
+    Rolling mean over `window` rows, NaN unless the whole window is present
+    (same as pandas `rolling(window).mean()`).
+    """
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] < window:
+        return out
+    valid = ~np.isnan(x)
+    zero = np.zeros((1, x.shape[1]))
+    sums = np.concatenate([zero, np.cumsum(np.where(valid, x, 0.0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    win_sums = sums[window:] - sums[:-window]
+    win_counts = counts[window:] - counts[:-window]
+    out[window - 1:] = np.where(win_counts == window, win_sums / window, np.nan)
+    return out
+
+
+def rolling_std(x, window, ddof=1):
+    """
+    Rolling standard deviation over `window` rows (pandas `rolling(window).std(ddof)`).
+    """
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] < window:
+        return out
+    out[window - 1:] = sliding_window_view(x, window, axis=0).std(axis=-1, ddof=ddof)
+    return out
+
+
+def ema(x, span=None, alpha=None):
+    """
+    Exponential moving average seeded with each ticker's first value
+    (pandas `ewm(span=span, adjust=False).mean()`). Missing bars carry the last value forward.
+    """
+    x = _as_2d(x)
+    alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+    out = np.empty(x.shape)
+    prev = np.full(x.shape[1], np.nan)
+    for t in range(x.shape[0]):
+        v = x[t]
+        upd = alpha * v + (1.0 - alpha) * prev
+        prev = np.where(np.isnan(prev), v, np.where(np.isnan(v), prev, upd))
+        out[t] = prev
+    return out
+
+
+def wilder(x, period):
+    """
+    Wilder smoothing: the first value is the simple mean of the first `period` observations,
+    then avg = (avg * (period - 1) + x) / period. Each ticker starts at its own first observation.
+    """
+    x = _as_2d(x)
+    n_cols = x.shape[1]
+    out = np.full(x.shape, np.nan)
+    count = np.zeros(n_cols)
+    total = np.zeros(n_cols)
+    avg = np.full(n_cols, np.nan)
+    for t in range(x.shape[0]):
+        v = x[t]
+        valid = ~np.isnan(v)
+        count += valid
+        warming = valid & (count <= period)
+        total = np.where(warming, total + v, total)
+        seeded = warming & (count == period)
+        smoothing = valid & (count > period)
+        avg = np.where(seeded, total / period, avg)
+        avg = np.where(smoothing, (avg * (period - 1) + v) / period, avg)
+        out[t] = avg
+    return out
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def rsi(close, period=14, method="wilder"):
+    """
+    Relative Strength Index. `method="wilder"` uses Wilder smoothing; `method="simple"` uses
+    rolling means of gains and losses, matching MarketDataAgent.compute_rsi.
+    """
+    close = _as_2d(close)
+    delta = np.full(close.shape, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    if method == "simple":
+        with np.errstate(invalid="ignore"):
+            gains = np.where(delta > 0, delta, 0.0)
+            losses = np.where(delta < 0, -delta, 0.0)
+        return _rsi_from_averages(sma(gains, period), sma(losses, period))
+    missing = np.isnan(delta)
+    gains = np.where(missing, np.nan, np.clip(np.nan_to_num(delta), 0.0, None))
+    losses = np.where(missing, np.nan, np.clip(-np.nan_to_num(delta), 0.0, None))
+    return _rsi_from_averages(wilder(gains, period), wilder(losses, period))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Returns (macd line, signal line, histogram).
+    """
+    line = ema(close, span=fast) - ema(close, span=slow)
+    sig = ema(line, span=signal)
+    return line, sig, line - sig
+
+
+def bollinger(close, window=20, num_std=2.0):
+    """
+    Returns (upper, middle, lower) bands using the population standard deviation.
+    """
+    mid = sma(close, window)
+    std = rolling_std(close, window, ddof=0)
+    return mid + num_std * std, mid, mid - num_std * std
+
+
+def atr(high, low, close, period=14):
+    """
+    Average True Range with Wilder smoothing.
+    """
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[1:] = close[:-1]
+    with np.errstate(invalid="ignore"):
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return wilder(true_range, period)
+
+
+def volatility(close, window=20, periods_per_year=252):
+    """
+    Annualized rolling volatility of log returns.
+    """
+    close = _as_2d(close)
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = np.log(close[1:] / close[:-1])
+    return rolling_std(returns, window) * np.sqrt(periods_per_year)
+
+
+def compute_indicators(close, high=None, low=None, config=None):
+    """
+    Compute the configured indicator set for every ticker at once.
+    Returns {column name: (time x ticker) array}. ATR is skipped without high/low.
+    """
+    config = DEFAULT_CONFIG if config is None else config
+    close = _as_2d(close)
+    out = {}
+    for window in config.get("sma", ()):
+        out[f"SMA_{window}"] = sma(close, window)
+    for span in config.get("ema", ()):
+        out[f"EMA_{span}"] = ema(close, span=span)
+    if config.get("rsi"):
+        out[f"RSI_{config['rsi']}"] = rsi(close, config["rsi"])
+    if config.get("macd"):
+        out["MACD"], out["MACD_signal"], out["MACD_hist"] = macd(close, *config["macd"])
+    if config.get("bollinger"):
+        window, num_std = config["bollinger"]
+        out[f"BB_upper_{window}"], out[f"BB_middle_{window}"], out[f"BB_lower_{window}"] = bollinger(close, window, num_std)
+    if config.get("atr") and high is not None and low is not None:
+        out[f"ATR_{config['atr']}"] = atr(high, low, close, config["atr"])
+    if config.get("volatility"):
+        window, periods_per_year = config["volatility"]
+        out[f"VOL_{window}"] = volatility(close, window, periods_per_year)
+    return out
+
+
+_LABELS = np.array(["N/A", "Buy", "Sell", "Hold"], dtype=object)
+
+
+def signal_labels(rsi_values, buy_below=30, sell_above=70):
+    """
+    Buy/Sell/Hold labels from RSI by vectorized selection; 'N/A' where RSI is missing.
+    """
+    rsi_values = np.asarray(rsi_values, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        codes = np.select(
+            [np.isnan(rsi_values), rsi_values < buy_below, rsi_values > sell_above],
+            [0, 1, 2],
+            default=3,
+        )
+    return _LABELS[codes]
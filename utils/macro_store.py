@@ -0,0 +1,177 @@
+"""
+Local store for macro time series (FRED and similar).
+Each series is a pair of numpy arrays, observation dates (datetime64[D]) and float64 values with
+NaN for missing observations, kept in memory and saved as one .npz per series together with when
+it was last fetched. Refreshes append only observations from the last stored date on, so
+revisions of the latest value are picked up.
+Queries slice a date window with a binary search and can downsample it server-side with LTTB
+(largest-triangle-three-buckets), returned as records or in a compact columnar layout.
+"""
+import os
+import threading
+import time
+from urllib.parse import quote
+import numpy as np
+
+FORMATS = ("records", "columnar")
+
+
+def lttb(x, y, n_out):
+    """
+    Indices of the `n_out` points of (x, y) that best preserve the shape of the line.
+    The first and last points are always kept; every bucket in between contributes the point
+    forming the largest triangle with the previous pick and the next bucket's average.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < n_out - 1:
+            nxt_x, nxt_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            nxt_x, nxt_y = x[-1], y[-1]
+        area = np.abs((x[a] - nxt_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (nxt_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def to_day(value):
+    return None if value in (None, "") else np.datetime64(str(value)[:10], "D")
+
+
+class MacroSeriesStore:
+    """
+    append(series_id, dates, values) merges freshly fetched observations; query(...) serves a
+    window, optionally downsampled to `max_points`. Memory only unless `root` is given.
+    """
+    def __init__(self, root=None):
+        self.root = root
+        self._series = {}
+        self._fetched_at = {}
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, series_id):
+        # Series ids come from requests; quoting keeps each one to a single file in the root
+        return os.path.join(self.root, f"{quote(series_id, safe='')}.npz")
+
+    def get(self, series_id):
+        """
+        (dates, values, date_column) for a stored series, or None.
+        """
+        with self._lock:
+            if series_id not in self._series and self.root and os.path.exists(self._path(series_id)):
+                with np.load(self._path(series_id)) as data:
+                    self._series[series_id] = (data["dates"], data["values"], str(data["date_column"]))
+                    self._fetched_at[series_id] = float(data["fetched_at"]) if "fetched_at" in data else 0.0
+            return self._series.get(series_id)
+
+    def __contains__(self, series_id):
+        return self.get(series_id) is not None
+
+    def fetched_at(self, series_id):
+        """
+        Epoch seconds of the last append for the series (0 if never fetched).
+        """
+        self.get(series_id)
+        with self._lock:
+            return self._fetched_at.get(series_id, 0.0)
+
+    def last_date(self, series_id):
+        stored = self.get(series_id)
+        return str(stored[0][-1]) if stored is not None and len(stored[0]) else None
+
+    def append(self, series_id, dates, values, date_column="observation_date"):
+        """
+        Merge observations: everything from the first new date on is replaced. Returns how many
+        observations are past the previously stored last date. Records the fetch time either way.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(dates, kind="stable")
+        dates, values = dates[order], values[order]
+        stored = self.get(series_id)
+        with self._lock:
+            self._fetched_at[series_id] = time.time()
+            if stored is not None and len(dates):
+                old_dates, old_values, date_column = stored
+                keep = np.searchsorted(old_dates, dates[0], side="left")
+                added = int(np.count_nonzero(dates > old_dates[-1])) if len(old_dates) else len(dates)
+                dates = np.concatenate([old_dates[:keep], dates])
+                values = np.concatenate([old_values[:keep], values])
+            elif stored is not None:
+                return 0
+            else:
+                added = len(dates)
+            self._series[series_id] = (dates, values, date_column)
+            if self.root:
+                tmp = self._path(series_id) + ".tmp.npz"
+                np.savez(tmp, dates=dates, values=values, date_column=np.array(date_column),
+                         fetched_at=np.array(self._fetched_at[series_id]))
+                os.replace(tmp, self._path(series_id))
+        return added
+
+    def window(self, series_id, start=None, end=None):
+        """
+        (dates, values) between `start` and `end` inclusive (YYYY-MM-DD or anything date-like).
+        """
+        stored = self.get(series_id)
+        if stored is None:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        dates, values, _ = stored
+        lo = np.searchsorted(dates, to_day(start), side="left") if start else 0
+        hi = np.searchsorted(dates, to_day(end), side="right") if end else len(dates)
+        return dates[lo:hi], values[lo:hi]
+
+    def query(self, series_id, start=None, end=None, max_points=None, format="records"):
+        """
+        A window of the series, downsampled with LTTB to `max_points` when it has more.
+        "records" is [{date_column: date, series_id: value}] (the FRED CSV rows);
+        "columnar" is {"dates": [...], "values": [...]}. Missing observations are None.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; expected one of {FORMATS}")
+        dates, values = self.window(series_id, start, end)
+        if max_points and len(dates) > max_points:
+            # Gaps carry no shape information, so only observed points are candidates
+            observed = np.flatnonzero(~np.isnan(values))
+            keep = observed[lttb(dates[observed].astype(np.int64), values[observed], max_points)]
+            dates, values = dates[keep], values[keep]
+        day_strings = dates.astype(str).tolist()
+        value_list = [None if v != v else v for v in values.tolist()]
+        if format == "columnar":
+            return {"dates": day_strings, "values": value_list}
+        stored = self.get(series_id)
+        date_column = stored[2] if stored is not None else "observation_date"
+        return [{date_column: d, series_id: v} for d, v in zip(day_strings, value_list)]
+
+    def stats(self):
+        with self._lock:
+            return {"series": len(self._series), "observations": sum(len(d) for d, _, _ in self._series.values())}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_macro_store():
+    """
+    Process-wide store; MACRO_STORE_DIR persists series across restarts.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MacroSeriesStore(root=os.getenv("MACRO_STORE_DIR") or None)
+    return _store
@@ -0,0 +1,189 @@
+"""
+Local columnar OHLC store keyed by (ticker, interval).
+Bars live in Parquet part files under <root>/<interval>/<ticker>/ (both URL-quoted) with a small meta.json that
+records each part's time range, the window the history is known to cover and when it was last
+refreshed. Reads memory-map only the parts that overlap the requested window; appends write the
+new tail as a small part (rewriting just the overlapping tail), and runs of small parts are
+periodically compacted while large parts are left untouched.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1), "5d": pd.DateOffset(days=5), "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3), "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5), "10y": pd.DateOffset(years=10),
+}
+
+INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600,
+    "1d": 86400, "5d": 5 * 86400, "1wk": 7 * 86400, "1mo": 30 * 86400, "3mo": 90 * 86400,
+}
+
+
+def to_utc(ts):
+    """
+    Timestamps are compared in UTC; tz-naive values (yfinance daily bars) are taken as UTC.
+    """
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def utc_index(index):
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+
+
+def period_start(period, now=None):
+    """
+    Start of a yfinance `period` window in UTC, or None for 'max'/unknown periods.
+    """
+    now = to_utc(now if now is not None else pd.Timestamp.now(tz="UTC"))
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    offset = PERIOD_OFFSETS.get(period)
+    return now - offset if offset is not None else None
+
+
+class OHLCStore:
+    """
+    Parquet-backed bar store. Frames passed in and returned are flat (Open, High, Low, Close,
+    Volume, ...) and indexed by timestamp.
+    """
+    def __init__(self, root, max_parts=16, seal_rows=50000):
+        self.root = root
+        self.max_parts = max_parts
+        self.seal_rows = seal_rows
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _dir(self, ticker, interval):
+        # Tickers come from requests; quoting keeps each one to a single directory under the root
+        return os.path.join(self.root, quote(interval, safe=''), quote(ticker, safe=''))
+
+    def lock(self, ticker, interval):
+        with self._locks_lock:
+            return self._locks.setdefault((ticker, interval), threading.Lock())
+
+    def meta(self, ticker, interval):
+        path = os.path.join(self._dir(ticker, interval), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, ticker, interval, meta):
+        path = os.path.join(self._dir(ticker, interval), "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def _part_name(self):
+        return f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+
+    def _write_part(self, ticker, interval, df, name):
+        index_name = df.index.name or "timestamp"
+        table = pa.Table.from_pandas(df.rename_axis(index_name).reset_index(), preserve_index=False)
+        path = os.path.join(self._dir(ticker, interval), name)
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return {"file": name, "first": to_utc(df.index[0]).isoformat(), "last": to_utc(df.index[-1]).isoformat(),
+                "rows": len(df), "index": index_name}
+
+    def _read_part(self, ticker, interval, part):
+        table = pq.read_table(os.path.join(self._dir(ticker, interval), part["file"]), memory_map=True)
+        return table.to_pandas().set_index(part["index"])
+
+    def read(self, ticker, interval, start=None):
+        """
+        Bars at or after `start` (None = everything). Only overlapping parts are opened.
+        """
+        meta = self.meta(ticker, interval)
+        if not meta or not meta["parts"]:
+            return pd.DataFrame()
+        start = to_utc(start) if start is not None else None
+        parts = [p for p in meta["parts"] if start is None or pd.Timestamp(p["last"]) >= start]
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat([self._read_part(ticker, interval, p) for p in parts])
+        if start is not None:
+            df = df[utc_index(df.index) >= start]
+        return df
+
+    def write(self, ticker, interval, df, covered_from=None, full_history=False):
+        """
+        Replace the stored history with `df` (a full fetch covering the window from `covered_from`,
+        or everything the source has when `full_history`, i.e. a period='max' download).
+        """
+        directory = self._dir(ticker, interval)
+        os.makedirs(directory, exist_ok=True)
+        old = self.meta(ticker, interval)
+        df = df.sort_index()
+        part = self._write_part(ticker, interval, df, self._part_name())
+        self._write_meta(ticker, interval, {
+            "parts": [part],
+            "covered_from": to_utc(covered_from).isoformat() if covered_from is not None else part["first"],
+            "full_history": full_history,
+            "fetched_at": time.time(),
+        })
+        self._remove_parts(ticker, interval, old["parts"] if old else [], keep=[part])
+
+    def append(self, ticker, interval, df):
+        """
+        Merge a freshly fetched tail. Stored bars at or after the tail's first timestamp are
+        replaced (the previous last bar may have been incomplete); only parts overlapping the
+        tail are rewritten.
+        """
+        meta = self.meta(ticker, interval)
+        if meta is None:
+            return self.write(ticker, interval, df)
+        if df.empty:
+            meta["fetched_at"] = time.time()
+            self._write_meta(ticker, interval, meta)
+            return
+        df = df.sort_index()
+        tail_start = to_utc(df.index[0])
+        keep = [p for p in meta["parts"] if pd.Timestamp(p["last"]) < tail_start]
+        overlapping = [p for p in meta["parts"] if pd.Timestamp(p["last"]) >= tail_start]
+        if overlapping:
+            prefix = pd.concat([self._read_part(ticker, interval, p) for p in overlapping])
+            prefix = prefix[utc_index(prefix.index) < tail_start]
+            df = pd.concat([prefix, df]) if not prefix.empty else df
+        parts = keep + [self._write_part(ticker, interval, df, self._part_name())]
+        compacted = []
+        if len(parts) > self.max_parts:
+            parts, compacted = self._compact(ticker, interval, parts)
+        meta.update({"parts": parts, "fetched_at": time.time()})
+        self._write_meta(ticker, interval, meta)
+        self._remove_parts(ticker, interval, overlapping + compacted, keep=parts)
+
+    def _compact(self, ticker, interval, parts):
+        """
+        Merge the trailing run of small parts into one. Parts of at least `seal_rows` rows are
+        never rewritten, so compaction cost stays bounded as the history grows.
+        Returns (new part list, parts to delete once the new meta is written).
+        """
+        i = len(parts)
+        while i > 0 and parts[i - 1]["rows"] < self.seal_rows:
+            i -= 1
+        small = parts[i:]
+        if len(small) < 2:
+            return parts, []
+        merged = pd.concat([self._read_part(ticker, interval, p) for p in small])
+        return parts[:i] + [self._write_part(ticker, interval, merged, self._part_name())], small
+
+    def _remove_parts(self, ticker, interval, parts, keep):
+        keep_files = {p["file"] for p in keep}
+        for p in parts:
+            if p["file"] not in keep_files:
+                try:
+                    os.remove(os.path.join(self._dir(ticker, interval), p["file"]))
+                except FileNotFoundError:
+                    pass
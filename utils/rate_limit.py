@@ -0,0 +1,55 @@
+"""
+Thread-safe token-bucket rate limiting shared by the LLM executor and ingestion schedulers.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Holds up to `capacity` tokens, refilled continuously at `rate` tokens per second.
+    `acquire` blocks until the requested amount is available. A request larger than the
+    capacity waits for a full bucket and then drives it negative, so it is still admitted.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount):
+        return cls(amount / 60.0, capacity=amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1.0):
+        needed = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, amount=1.0):
+        with self._lock:
+            self._refill()
+            if self.tokens >= min(float(amount), self.capacity):
+                self.tokens -= amount
+                return True
+            return False
+
+    def pause(self, seconds):
+        """
+        Empty the bucket so no tokens are granted for `seconds` (e.g. after an HTTP 429 Retry-After).
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -float(seconds) * self.rate)
@@ -0,0 +1,272 @@
+"""
+Approximate-nearest-neighbour search over embedded news articles and social mentions.
+Vectors go into a faiss HNSW graph (cosine similarity over normalized embeddings), which accepts
+incremental adds without retraining; item metadata (kind, tickers, timestamp, title, URL) lives in
+SQLite next to it so searches can be filtered by ticker, time window and kind. Small filtered
+candidate sets are scored exactly; larger ones are searched in the graph with an ID selector.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from utils.embedding_cache import embedding_id as embedding_id_for, get_embedding_cache
+
+logger = logging.getLogger("SemanticIndex")
+
+CASHTAG_RE = re.compile(r"\$([A-Za-z]{1,5})\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    embedding_id TEXT UNIQUE NOT NULL,
+    kind TEXT,
+    ts REAL,
+    title TEXT,
+    url TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS items_ts ON items (ts);
+CREATE TABLE IF NOT EXISTS item_tickers (
+    ticker TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (ticker, item_id)
+);
+"""
+
+
+def tag_tickers(text, universe=None):
+    """
+    Cashtags in `text` plus any ticker from `universe` mentioned as an upper-case word.
+    """
+    tags = {tag.upper() for tag in CASHTAG_RE.findall(text or "")}
+    words = set(re.findall(r"\b[A-Z]{1,5}\b", text or ""))
+    tags.update(t.upper() for t in universe or [] if t.upper() in words)
+    return sorted(tags)
+
+
+def to_epoch(value):
+    """
+    Seconds since the epoch for a number, datetime or date string; None when it cannot be parsed.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    import pandas as pd
+    ts = pd.to_datetime(value, errors="coerce", utc=True)
+    return None if ts is None or pd.isna(ts) else ts.timestamp()
+
+
+class SemanticIndex:
+    """
+    add_items(items) embeds and indexes dicts with `text` plus optional kind, tickers, ts, title,
+    url and any extra JSON-serializable fields; search(...) returns the top-k matches.
+    """
+    def __init__(self, root, embeddings=None, m=32, ef_search=64, exact_threshold=4096, save_every=500):
+        self.root = root
+        self.embeddings = embeddings or get_embedding_cache()
+        self.m = m
+        self.ef_search = ef_search
+        self.exact_threshold = exact_threshold
+        self.save_every = save_every
+        self.index = None
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "items.sqlite"), check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._open()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, "index.faiss")
+
+    def _new_index(self, dim):
+        import faiss
+        graph = faiss.IndexHNSWFlat(dim, self.m, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexIDMap2(graph)
+
+    def _open(self):
+        import faiss
+        if os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path)
+            indexed = set(faiss.vector_to_array(self.index.id_map).tolist())
+        else:
+            indexed = set()
+        # Items committed after the last save are re-added from the embedding cache, or dropped
+        missing = [(i, key) for i, key in self.db.execute("SELECT id, embedding_id FROM items") if i not in indexed]
+        recoverable = [(i, key) for i, key in missing if key in self.embeddings]
+        lost = [i for i, key in missing if key not in self.embeddings]
+        if recoverable:
+            self._add_vectors([i for i, _ in recoverable], self.embeddings.vectors([key for _, key in recoverable]))
+        if lost:
+            logger.warning(f"Dropping {len(lost)} indexed items whose embeddings are no longer cached")
+            self.db.executemany("DELETE FROM items WHERE id = ?", [(i,) for i in lost])
+            self.db.executemany("DELETE FROM item_tickers WHERE item_id = ?", [(i,) for i in lost])
+            self.db.commit()
+
+    def _add_vectors(self, ids, vectors):
+        import faiss
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        if self.index is None:
+            self.index = self._new_index(vectors.shape[1])
+        self.index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        self._unsaved += len(ids)
+
+    def add_items(self, items):
+        """
+        Index items that are not indexed yet (by content); returns their embedding IDs in input order.
+        """
+        items = [item for item in items if item.get("text")]
+        keys = self.embeddings.embed_many([item["text"] for item in items])
+        with self._lock:
+            known = self._known(keys)
+            fresh = {}
+            for key, item in zip(keys, items):
+                if key not in known and key not in fresh:
+                    fresh[key] = item
+            if fresh:
+                rows = []
+                for key, item in fresh.items():
+                    extra = {k: v for k, v in item.items() if k not in ("text", "kind", "tickers", "ts", "title", "url")}
+                    ts = to_epoch(item.get("ts"))
+                    cursor = self.db.execute(
+                        "INSERT INTO items (embedding_id, kind, ts, title, url, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, item.get("kind"), ts if ts is not None else time.time(), item.get("title"),
+                         item.get("url"), json.dumps(extra, default=str)))
+                    rows.append(cursor.lastrowid)
+                    self.db.executemany("INSERT OR IGNORE INTO item_tickers (ticker, item_id) VALUES (?, ?)",
+                                        [(t.upper(), cursor.lastrowid) for t in item.get("tickers") or []])
+                self.db.commit()
+                self._add_vectors(rows, self.embeddings.vectors(list(fresh)))
+                if self._unsaved >= self.save_every:
+                    self.save()
+        return keys
+
+    def _known(self, keys):
+        known = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            query = f"SELECT embedding_id FROM items WHERE embedding_id IN ({','.join('?' * len(chunk))})"
+            known.update(key for (key,) in self.db.execute(query, chunk))
+        return known
+
+    def save(self):
+        import faiss
+        with self._lock:
+            if self.index is None:
+                return
+            faiss.write_index(self.index, self.index_path + ".tmp")
+            os.replace(self.index_path + ".tmp", self.index_path)
+            self._unsaved = 0
+
+    def _candidates(self, tickers, start, end, kinds):
+        clauses, params = [], []
+        if tickers:
+            clauses.append(f"id IN (SELECT item_id FROM item_tickers WHERE ticker IN ({','.join('?' * len(tickers))}))")
+            params.extend(t.upper() for t in tickers)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(to_epoch(start))
+        if end is not None:
+            clauses.append("ts <= ?")
+            params.append(to_epoch(end))
+        if kinds:
+            clauses.append(f"kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        if not clauses:
+            return None
+        rows = self.db.execute(f"SELECT id FROM items WHERE {' AND '.join(clauses)}", params)
+        return np.fromiter((i for (i,) in rows), dtype=np.int64)
+
+    def search(self, query=None, embedding_id=None, k=10, tickers=None, start=None, end=None, kinds=None):
+        """
+        Top-k items most similar to `query` text or to an already embedded item, best first.
+        The item an embedding_id query starts from is left out of its own results; an
+        embedding_id that is neither cached nor indexed raises KeyError.
+        """
+        import faiss
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return []
+            vector = self._query_vector(query, embedding_id)
+            faiss.normalize_L2(vector)
+            candidates = self._candidates(tickers, start, end, kinds)
+            wanted = k + 1
+            if candidates is None:
+                params = faiss.SearchParametersHNSW(efSearch=max(self.ef_search, wanted))
+                scores, ids = self.index.search(vector, wanted, params=params)
+                hits = list(zip(ids[0].tolist(), scores[0].tolist()))
+            elif len(candidates) <= self.exact_threshold:
+                if not len(candidates):
+                    return []
+                scores = self.index.reconstruct_batch(candidates) @ vector[0]
+                top = np.argsort(-scores)[:wanted]
+                hits = list(zip(candidates[top].tolist(), scores[top].tolist()))
+            else:
+                params = faiss.SearchParametersHNSW(sel=faiss.IDSelectorBatch(candidates),
+                                                    efSearch=max(self.ef_search, 4 * wanted))
+                scores, ids = self.index.search(vector, wanted, params=params)
+                hits = list(zip(ids[0].tolist(), scores[0].tolist()))
+            hits = [(i, score) for i, score in hits if i >= 0]
+            return [item for item in self._describe(hits) if item["embedding_id"] != embedding_id][:k]
+
+    def _query_vector(self, query, embedding_id):
+        # Query text is encoded without being stored in the embedding cache; an indexed item's
+        # vector comes from the cache or, when the cache no longer has it, from the index itself
+        if embedding_id is None:
+            key = embedding_id_for(query or "")
+            if key in self.embeddings:
+                return self.embeddings.vectors([key])
+            return np.asarray(self.embeddings.encode([query or ""]), dtype=np.float32).reshape(1, -1)
+        if embedding_id in self.embeddings:
+            return self.embeddings.vectors([embedding_id])
+        row = self.db.execute("SELECT id FROM items WHERE embedding_id = ?", (embedding_id,)).fetchone()
+        if row is None:
+            raise KeyError(embedding_id)
+        return self.index.reconstruct(row[0]).reshape(1, -1)
+
+    def _describe(self, hits):
+        if not hits:
+            return []
+        ids = [i for i, _ in hits]
+        marks = ",".join("?" * len(ids))
+        rows = {row[0]: row for row in self.db.execute(
+            f"SELECT id, embedding_id, kind, ts, title, url, payload FROM items WHERE id IN ({marks})", ids)}
+        tickers = {}
+        for ticker, item_id in self.db.execute(f"SELECT ticker, item_id FROM item_tickers WHERE item_id IN ({marks})", ids):
+            tickers.setdefault(item_id, []).append(ticker)
+        results = []
+        for i, score in hits:
+            _, key, kind, ts, title, url, payload = rows[i]
+            results.append({"embedding_id": key, "score": round(float(score), 4), "kind": kind, "ts": ts,
+                            "tickers": sorted(tickers.get(i, [])), "title": title, "url": url, **json.loads(payload or "{}")})
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"items": self.index.ntotal if self.index is not None else 0, "unsaved": self._unsaved}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_semantic_index():
+    """
+    Process-wide index, or None unless SEMANTIC_INDEX_DIR is set.
+    """
+    global _index
+    root = os.getenv("SEMANTIC_INDEX_DIR")
+    if not root:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SemanticIndex(root, save_every=int(os.getenv("SEMANTIC_INDEX_SAVE_EVERY", "500")))
+    return _index
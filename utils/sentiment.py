@@ -0,0 +1,230 @@
+"""
+Shared, batched lexicon sentiment scoring.
+Uses the same polarity lexicon and rules as TextBlob's default PatternAnalyzer (modifiers such as
+"very", negations such as "not", "!" boosts, emoticons, mean over assessed words), but scores a whole batch
+of texts with array operations over the flattened token stream instead of building one TextBlob
+per text. Scores are memoized by text hash in a bounded LRU shared by every agent in the process.
+"""
+import hashlib
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict
+from itertools import repeat
+import numpy as np
+
+NEGATIONS = ("no", "not", "n't", "never")
+CONTRACTION_RE = re.compile(r"(\w)n't\b")
+
+
+def emoticon_polarities():
+    from textblob._text import EMOTICONS
+    # TextBlob only scores emoticons that are not plain words ("xD" is skipped)
+    return {e.lower(): p for (_, p), forms in EMOTICONS.items() for e in forms if not e.isalpha()}
+
+
+def default_lexicon_path():
+    import textblob
+    return os.path.join(os.path.dirname(textblob.__file__), "en", "en-sentiment.xml")
+
+
+def load_lexicon(path):
+    """
+    Returns {word: (polarity, intensity, is_modifier)}. Senses are averaged per part-of-speech
+    tag and then across tags, as pattern's Sentiment.load does.
+    """
+    senses = {}
+    for node in ElementTree.parse(path).getroot().findall("word"):
+        word = node.attrib.get("form")
+        if not word:
+            continue
+        scores = (float(node.attrib.get("polarity", 0.0)), float(node.attrib.get("intensity", 1.0)))
+        senses.setdefault(word, {}).setdefault(node.attrib.get("pos"), []).append(scores)
+    lexicon = {}
+    adjectives = []
+    for word, by_pos in senses.items():
+        per_pos = {pos: np.mean(scores, axis=0) for pos, scores in by_pos.items()}
+        polarity, intensity = np.mean(list(per_pos.values()), axis=0)
+        lexicon[word] = (float(polarity), float(intensity), "RB" in by_pos)
+        if "JJ" in per_pos:
+            adjectives.append((word, per_pos["JJ"]))
+    # TextBlob also maps each adjective to its adverb ("terrible" -> "terribly")
+    for word, (polarity, intensity) in adjectives:
+        if word.endswith("y"):
+            word = word[:-1] + "i"
+        if word.endswith("le"):
+            word = word[:-2]
+        lexicon[word + "ly"] = (float(polarity), float(intensity), True)
+    return lexicon
+
+
+def token_pattern(emoticons):
+    # Apostrophes split tokens the way TextBlob's tokenizer does ("don't" -> "do n ' t"), so, as
+    # there, contractions never act as negations
+    alternatives = "|".join(re.escape(e) for e in sorted(emoticons, key=len, reverse=True))
+    return re.compile(r"(?<!\S)(?:%s)(?!\S)|[a-z0-9]+(?:-[a-z0-9]+)*|!" % alternatives)
+
+
+class SentimentService:
+    """
+    score_many(texts) returns polarities in [-1, 1] in input order; score(text) is the single-text form.
+    The lexicon is loaded on first use.
+    """
+    def __init__(self, lexicon_path=None, cache_size=100000):
+        self.lexicon_path = lexicon_path or default_lexicon_path()
+        self.cache_size = cache_size
+        self._vocab = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        with self._lock:
+            if self._vocab is None:
+                lexicon = load_lexicon(self.lexicon_path)
+                emoticons = emoticon_polarities()
+                lexicon.update({e: (p, 1.0, False) for e, p in emoticons.items()})
+                words = sorted(lexicon)
+                self._vocab = {word: i for i, word in enumerate(words)}
+                # Unknown tokens map to the trailing neutral slot
+                self._polarity = np.array([lexicon[w][0] for w in words] + [0.0])
+                self._intensity = np.array([lexicon[w][1] for w in words] + [1.0])
+                self._modifier = np.array([lexicon[w][2] for w in words] + [False])
+                self._ly = np.array([w.endswith("ly") for w in words] + [False])
+                self._emoticon = np.array([w in emoticons for w in words] + [False])
+                special = {w: i for i, w in enumerate(NEGATIONS)}
+                special["!"] = len(NEGATIONS)
+                self._special = special
+                self._token_re = token_pattern(emoticons)
+        return self._vocab
+
+    def tokenize(self, text):
+        self.load()
+        return self._token_re.findall(CONTRACTION_RE.sub(r"\1 n't", text.lower()))
+
+    def _score_uncached(self, texts):
+        vocab = self.load()
+        unknown = len(vocab)
+        findall = self._token_re.findall
+        token_lists = [findall(CONTRACTION_RE.sub(r"\1 n't", text.lower())) for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        tokens = [tok for toks in token_lists for tok in toks]
+        if not tokens:
+            return np.zeros(len(texts))
+        count = len(tokens)
+        ids = np.fromiter(map(vocab.get, tokens, repeat(unknown, count)), dtype=np.int64, count=count)
+        special = np.fromiter(map(self._special.get, tokens, repeat(-1, count)), dtype=np.int64, count=count)
+        size = np.fromiter(map(len, tokens), dtype=np.int64, count=count)
+        doc = np.repeat(np.arange(len(texts)), lengths)
+
+        def prev(values, fill):
+            # Shift right by one without crossing document boundaries
+            shifted = np.full_like(values, fill)
+            shifted[1:] = values[:-1]
+            shifted[1:][doc[1:] != doc[:-1]] = fill
+            return shifted
+
+        def last_before(mask):
+            # Index of the latest earlier token in the same document where mask holds, else -1
+            positions = np.where(mask, np.arange(len(mask)), -1)
+            latest = prev(np.maximum.accumulate(positions), -1)
+            latest[(latest >= 0) & (doc[np.maximum(latest, 0)] != doc)] = -1
+            return latest
+
+        def at(values, index):
+            return np.where(index >= 0, values[np.maximum(index, 0)], False)
+
+        known = ids != unknown
+        negation = (special >= 0) & (special < len(NEGATIONS))
+        bang = special == len(NEGATIONS)
+        polarity = self._polarity[ids]
+        modifier = known & self._modifier[ids]
+        # "really not good": a negation right after an "-ly" modifier negates the modifier's assessment
+        # instead of the next word, and leaves the modifier pending
+        consumed = negation & at(modifier & self._ly[ids], last_before(known | ((size > 2) & ~negation)))
+        # "not a good": otherwise a negation carries across one-letter words to the next known word
+        emoticon = self._emoticon[ids]
+        negated = at(negation & ~consumed, last_before(known | (size > 1))) & ~emoticon
+        # "very good" / "really is a good": a known word after a known modifier, skipping words of
+        # up to two letters, folds into the modifier's assessment
+        modifier_at = last_before(known | ((size > 2) & ~consumed))
+        merged = known & ~emoticon & at(modifier, modifier_at)
+        head = known & ~merged
+        # A negated modifier ("not very good") weakens instead of intensifies
+        factor = self._intensity[ids][np.maximum(modifier_at, 0)]
+        factor = np.where(at(known & negated, modifier_at), 1.0 / factor, factor)
+        value = np.where(merged, np.clip(polarity * factor, -1.0, 1.0), polarity)
+        chain = np.cumsum(head) - 1
+        # A negation anywhere in the chain ("very not good" included) negates the whole assessment
+        chain_negated = np.bincount(chain[known & negated], minlength=head.sum()) > 0
+        extended = np.zeros_like(merged)
+        extended[modifier_at[merged]] = True
+        assessed = known & ~extended
+        # Each "!" boosts the latest assessment of its own document by 25%; a word merged into the
+        # assessment after the "!" overwrites the boost
+        latest = np.cumsum(assessed) - 1
+        assessment_doc = doc[assessed]
+        assessment_chain = chain[assessed]
+        boosting = bang & (latest >= 0)
+        boosting[boosting] = (assessment_doc[latest[boosting]] == doc[boosting]) & \
+            (assessment_chain[latest[boosting]] == chain[boosting])
+        boosts = np.bincount(latest[boosting], minlength=len(assessment_doc))
+        scores = np.clip(value[assessed] * 1.25 ** boosts, -1.0, 1.0)
+        chain_negated[chain[modifier_at[consumed]]] = True
+        scores = np.where(chain_negated[assessment_chain], scores * -0.5, scores)
+        totals = np.bincount(assessment_doc, weights=scores, minlength=len(texts))
+        counts = np.bincount(assessment_doc, minlength=len(texts))
+        return totals / np.maximum(counts, 1)
+
+    def score_many(self, texts):
+        texts = ["" if text is None else str(text) for text in texts]
+        keys = [hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest() for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                    self.hits += 1
+                else:
+                    # Repeated texts within one batch are scored once
+                    missing.setdefault(key, []).append(i)
+            self.misses += len(missing)
+        if missing:
+            order = list(missing)
+            scores = self._score_uncached([texts[missing[key][0]] for key in order])
+            with self._lock:
+                for key, score in zip(order, scores):
+                    score = float(score)
+                    for i in missing[key]:
+                        results[i] = score
+                    self._cache[key] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def score(self, text):
+        return self.score_many([text])[0]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_sentiment_service():
+    """
+    Process-wide service; SENTIMENT_CACHE_SIZE bounds the memo (default 100000 texts).
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SentimentService(cache_size=int(os.getenv("SENTIMENT_CACHE_SIZE", "100000")))
+    return _service